@@ -5,8 +5,25 @@ from routes.user_routes import users_bp
 from routes.task_routes import tasks_bp
 from routes.chat_routes import chat_bp
 from routes.updates import updates_bp
+from routes.search_routes import search_bp
+from routes.stream_routes import stream_bp
+from routes.jobs_routes import jobs_bp
+from routes.analytics_routes import analytics_bp
 import db
 import os
+from compression import init_compression
+from serialization import init_json
+from tenancy import init_tenancy
+from services.digests import digest_worker
+from services.extraction import extraction_worker
+from services.cache import user_cache
+from services.invalidation import invalidation_bus
+from services.push import push_hub
+from services.jobs import job_worker
+from services.analytics import start_backfill
+from services.archive import archive_worker
+from services.sessions import request_session
+from services.vector_index import index_sync_worker
 
 print("🟩 DEBUG: MONGODB_URI =", os.environ.get("MONGODB_URI"))
 print("🟩 DEBUG: GEMINI_API_KEY =", os.environ.get("GEMINI_API_KEY"))
@@ -21,15 +38,35 @@ CORS(app,
          "https://rise-ai-frontend.onrender.com"  # ✅ No trailing spaces!
      ],
      supports_credentials=True,  # ← Critical for credentials mode
-     allow_headers=["Content-Type", "Authorization", "Accept"],
+     allow_headers=["Content-Type", "Authorization", "Accept", "Idempotency-Key"],
+     expose_headers=["Idempotent-Replayed", "Retry-After"],
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"]
 )
 
+init_json(app)
+init_compression(app)
+init_tenancy(app, request_session, public_endpoints=("users.login",))
+
 # Register blueprints
 app.register_blueprint(users_bp, url_prefix='/users')
 app.register_blueprint(tasks_bp)
 app.register_blueprint(chat_bp, url_prefix='/chat')
 app.register_blueprint(updates_bp)
+app.register_blueprint(search_bp)
+app.register_blueprint(stream_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(analytics_bp)
+
+# Background jobs
+digest_worker.start()
+extraction_worker.start()
+job_worker.start()
+archive_worker.start()
+index_sync_worker.start()
+start_backfill()
+invalidation_bus.register_cache("users", user_cache, key_fn=lambda user: [user.get("email")])
+push_hub.attach(invalidation_bus)
+invalidation_bus.start()
 
 @app.route('/')
 def health_check():
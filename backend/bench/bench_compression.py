@@ -0,0 +1,72 @@
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Benchmarks live in backend/bench/; the modules they measure are one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compression import available_codecs, compress_bytes
+
+# CPU cost vs bytes saved for representative payloads of the large JSON endpoints
+WORDS = ("payment integration stripe api login page redesign css bug fix database migration "
+         "reporting dashboard deploy pipeline blocked waiting review tests refactor cache "
+         "latency mobile release hotfix onboarding email notification search index").split()
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 9], "zstd": [1, 3, 9]}
+
+
+def sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def build_payloads():
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    tasks = [{
+        "_id": f"{rng.getrandbits(96):024x}",
+        "employee_username": f"employee_{rng.randint(1, 50)}",
+        "title": sentence(rng, 5),
+        "description": sentence(rng, 40),
+        "priority": rng.choice(["low", "medium", "high", "urgent"]),
+        "status": rng.choice(["pending", "in-progress", "completed"]),
+        "created_at": (now - timedelta(hours=i)).isoformat(),
+        "updated_at": (now - timedelta(hours=i)).isoformat(),
+    } for i in range(2000)]
+    updates = [{
+        "employee_username": f"employee_{rng.randint(1, 50)}",
+        "employee_name": "Employee",
+        "content": sentence(rng, 60),
+        "timestamp": (now - timedelta(hours=i)).isoformat(),
+    } for i in range(2000)]
+    history = {"success": True, "history": [{
+        "username": "employee@riseai.com",
+        "user_message": sentence(rng, 15),
+        "ai_response": sentence(rng, 120),
+        "timestamp": (now - timedelta(minutes=i)).isoformat(),
+    } for i in range(50)]}
+    return {
+        "/tasks": json.dumps(tasks).encode(),
+        "/get-updates": json.dumps(updates).encode(),
+        "/chat/history": json.dumps(history).encode(),
+    }
+
+
+def run_benchmark(repeat=10):
+    codecs = available_codecs()
+    print(f"📦 Codecs available: {', '.join(codecs)}\n")
+    print(f"{'endpoint':<16}{'codec':<7}{'level':>6}{'raw KB':>10}{'out KB':>10}{'ratio':>8}{'ms':>9}{'MB/s':>9}")
+    for endpoint, payload in build_payloads().items():
+        for codec in codecs:
+            for level in LEVELS[codec]:
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    out = compress_bytes(payload, codec, level)
+                elapsed = (time.perf_counter() - started) / repeat
+                print(f"{endpoint:<16}{codec:<7}{level:>6}{len(payload) / 1024:>10.1f}{len(out) / 1024:>10.1f}"
+                      f"{len(payload) / len(out):>8.1f}{elapsed * 1000:>9.2f}{len(payload) / elapsed / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
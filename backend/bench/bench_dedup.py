@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Benchmarks live in backend/bench/; the modules they measure are one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.dedup import DEDUP_THRESHOLD, NearDuplicateDetector, shingles, signature
+
+# Per-message cost of the near-duplicate check against in-memory signatures (no database)
+N_EMPLOYEES = 200
+RECENT_PER_EMPLOYEE = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+N_CHECKS = 5_000
+
+WORDS = ("payment integration stripe api login page redesign css bug fix database migration "
+         "reporting dashboard deploy pipeline docker kubernetes blocked waiting review tests "
+         "refactor cache latency mobile release hotfix onboarding email notification search "
+         "index query timeout memory leak crash analytics export invoice billing auth token").split()
+
+
+def make_update(rng):
+    return "Today I worked on " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 60)))
+
+
+def perturb(rng, text):
+    words = text.split()
+    for _ in range(max(1, len(words) // 20)):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def run_benchmark():
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    detector = NearDuplicateDetector(window_hours=24 * 365, max_recent=RECENT_PER_EMPLOYEE)
+    history = {}
+    for e in range(N_EMPLOYEES):
+        employee = f"employee_{e}"
+        history[employee] = [make_update(rng) for _ in range(RECENT_PER_EMPLOYEE)]
+        for i, text in enumerate(history[employee]):
+            detector.remember(employee, f"{employee}-{i}", text, now - timedelta(minutes=RECENT_PER_EMPLOYEE - i))
+
+    messages = []
+    for _ in range(N_CHECKS):
+        employee = f"employee_{rng.randrange(N_EMPLOYEES)}"
+        if rng.random() < 0.5:
+            messages.append((employee, perturb(rng, rng.choice(history[employee])), True))
+        else:
+            messages.append((employee, make_update(rng), False))
+
+    print(f"📊 {N_EMPLOYEES} employees x {RECENT_PER_EMPLOYEE} recent updates, threshold {DEDUP_THRESHOLD}\n")
+
+    started = time.perf_counter()
+    for _, text, _ in messages:
+        signature(text)
+    sig_us = (time.perf_counter() - started) / N_CHECKS * 1e6
+
+    timings, hits, misses, false_hits = [], 0, 0, 0
+    for employee, text, is_dup in messages:
+        started = time.perf_counter()
+        match = detector.check(employee, text, now=now)
+        timings.append((time.perf_counter() - started) * 1e6)
+        if is_dup:
+            hits += bool(match)
+            misses += not match
+        else:
+            false_hits += bool(match)
+    timings.sort()
+
+    # Brute-force Jaccard over every recent update from the same employee, for comparison
+    started = time.perf_counter()
+    for employee, text, _ in messages[:500]:
+        new = set(shingles(text))
+        for old in history[employee]:
+            old_set = set(shingles(old))
+            len(new & old_set) / max(len(new | old_set), 1)
+    brute_us = (time.perf_counter() - started) / 500 * 1e6
+
+    print(f"{'signature only':<32}{sig_us:>10.0f} µs")
+    print(f"{'check p50 (signature + LSH)':<32}{timings[len(timings) // 2]:>10.0f} µs")
+    print(f"{'check p95':<32}{timings[int(len(timings) * 0.95)]:>10.0f} µs")
+    print(f"{'brute-force exact Jaccard':<32}{brute_us:>10.0f} µs")
+    print(f"\nResends caught: {hits}/{hits + misses}, false matches: {false_hits}/{N_CHECKS - hits - misses}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,86 @@
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Benchmarks live in backend/bench/; the modules they measure are one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from bson.raw_bson import RawBSONDocument
+
+from models.task import Task
+
+# Memory held by 100k task results in each representation, and stored document size with null elision.
+# Nothing touches the database; run with STORAGE_BACKEND=memory to skip connecting to MongoDB.
+N_TASKS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+WORDS = ("payment integration login redesign bug fix migration dashboard deploy pipeline "
+         "review tests refactor cache mobile release onboarding notification search export").split()
+
+
+def make_tasks(rng):
+    now = datetime.utcnow()
+    tasks = []
+    for i in range(N_TASKS):
+        task = Task(f"employee_{i % 500}", " ".join(rng.choice(WORDS) for _ in range(4)),
+                    " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 30))),
+                    rng.choice(("low", "medium", "high", "urgent")),
+                    rng.choice(("pending", "in_progress", "completed")))
+        task._id = bson.ObjectId()
+        task.created_at = task.updated_at = now - timedelta(minutes=i)
+        # Most tasks are unassigned, undated and open, as in production
+        if rng.random() < 0.2:
+            task.assigned_manager = "mgr@x.com"
+        if rng.random() < 0.1:
+            task.due_date = now + timedelta(days=7)
+        tasks.append(task)
+    return tasks
+
+
+def measure(label, build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<36}{current / len(held):>10.0f} B/task{current / 2**20:>10.1f} MB{elapsed * 1000:>10.0f} ms")
+    return held
+
+
+def run_benchmark():
+    rng = random.Random(7)
+    tasks = make_tasks(rng)
+    full_docs = [{field: getattr(t, field) for field in ("_id",) + Task.FIELDS} for t in tasks]
+    elided_docs = [t.to_doc() for t in tasks]
+
+    full_bson = [bson.encode(d) for d in full_docs]
+    elided_bson = [bson.encode(d) for d in elided_docs]
+    full_size = sum(map(len, full_bson))
+    elided_size = sum(map(len, elided_bson))
+    print(f"📊 {N_TASKS} tasks\n")
+    print(f"{'BSON with nulls':<36}{full_size / N_TASKS:>10.0f} B/doc")
+    print(f"{'BSON with nulls elided (to_doc)':<36}{elided_size / N_TASKS:>10.0f} B/doc"
+          f"   ({(1 - elided_size / full_size) * 100:.1f}% smaller)\n")
+
+    print(f"{'Query results held as':<36}{'per task':>15}{'total':>13}{'decode':>10}")
+    measure("dicts (bson.decode)", lambda: [bson.decode(b) for b in elided_bson])
+    measure("Task.from_doc (slots)", lambda: [Task.from_doc(bson.decode(b)) for b in elided_bson])
+    lazy = measure("Task.from_raw (undecoded)", lambda: Task.from_cursor(RawBSONDocument(b) for b in elided_bson))
+
+    # Touch one field on a tenth of the lazy results, as a summary or filter would
+    started = time.perf_counter()
+    for task in lazy[::10]:
+        task.status
+    touched_ms = (time.perf_counter() - started) * 1000
+    print(f"\nHydrating 10% of lazy results on first access: {touched_ms:.0f} ms, "
+          f"{sum(not t.hydrated for t in lazy)} still undecoded")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,81 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
+
+# Seeds a separate benchmark database, never rise_ai_db
+load_dotenv()
+BENCH_DB = "rise_ai_bench"
+N_UPDATES = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+BATCH = 10_000
+
+WORDS = ("payment integration stripe api login page redesign css bug fix database migration "
+         "reporting dashboard deploy pipeline docker kubernetes blocked waiting review tests "
+         "refactor cache latency mobile release hotfix onboarding email notification search "
+         "index query timeout memory leak crash analytics export invoice billing auth token").split()
+EMPLOYEES = [f"employee_{i}" for i in range(200)]
+QUERIES = ["payment integration", "blocked stripe", "memory leak crash", "database migration", "login redesign"]
+
+
+def seed(collection):
+    print(f"🌱 Seeding {N_UPDATES:,} updates...")
+    rng = random.Random(42)
+    start_date = datetime.utcnow() - timedelta(days=730)
+    started = time.perf_counter()
+    for offset in range(0, N_UPDATES, BATCH):
+        docs = []
+        for _ in range(min(BATCH, N_UPDATES - offset)):
+            docs.append({
+                "employee_username": rng.choice(EMPLOYEES),
+                "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40))),
+                "timestamp": start_date + timedelta(minutes=rng.randint(0, 730 * 24 * 60)),
+            })
+        collection.insert_many(docs, ordered=False)
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    collection.create_index([("content", TEXT), ("update_text", TEXT)], name="updates_text")
+    collection.create_index([("employee_username", ASCENDING), ("timestamp", DESCENDING)])
+    print(f"✅ Indexes built in {time.perf_counter() - started:.1f}s")
+
+
+def time_query(collection, criteria, page_size=20, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(collection.find(criteria, {"score": {"$meta": "textScore"}})
+             .sort([("score", {"$meta": "textScore"})]).limit(page_size))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1]
+
+
+def run_benchmark():
+    client = MongoClient(os.environ.get("MONGODB_URI", "mongodb://localhost:27017/"))
+    collection = client[BENCH_DB]["updates"]
+
+    if collection.estimated_document_count() < N_UPDATES:
+        collection.drop()
+        seed(collection)
+
+    recent = datetime.utcnow() - timedelta(days=30)
+    scenarios = {
+        "text only": lambda q: {"$text": {"$search": q}},
+        "text + employee": lambda q: {"$text": {"$search": q}, "employee_username": "employee_7"},
+        "text + last 30 days": lambda q: {"$text": {"$search": q}, "timestamp": {"$gte": recent}},
+    }
+
+    print(f"\n📊 Search latency over {collection.estimated_document_count():,} updates (ms)")
+    print(f"{'scenario':<22}{'query':<22}{'p50':>8}{'p95':>8}")
+    for name, build in scenarios.items():
+        for query in QUERIES:
+            p50, p95 = time_query(collection, build(query))
+            print(f"{name:<22}{query:<22}{p50:>8.1f}{p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
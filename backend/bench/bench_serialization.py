@@ -0,0 +1,66 @@
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Benchmarks live in backend/bench/; the modules they measure are one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask import Flask
+
+import serialization
+from serialization import BSONJSONEncoder, jsonify
+
+# Serialization throughput on a 10k-task payload shaped like Task.get_all_tasks() output
+N_TASKS = 10_000
+
+
+def build_tasks():
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "employee_username": f"employee_{rng.randint(1, 50)}",
+        "title": f"Task {i}",
+        "description": "Investigate and fix the reported issue " * rng.randint(1, 5),
+        "priority": rng.choice(["low", "medium", "high", "urgent"]),
+        "status": rng.choice(["pending", "in-progress", "completed"]),
+        "assigned_manager": "demo_manager",
+        "estimate_hours": Decimal128(str(rng.randint(1, 40))),
+        "created_at": now - timedelta(hours=i),
+        "updated_at": now - timedelta(minutes=i),
+        "due_date": None,
+        "completion_date": None,
+    } for i in range(N_TASKS)]
+
+
+def measure(name, fn, repeat=10):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        size = len(fn())
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{name:<28}{elapsed * 1000:>10.1f}{N_TASKS / elapsed:>14,.0f}{size / elapsed / 1e6:>10.1f}")
+
+
+def run_benchmark():
+    tasks = build_tasks()
+    app = Flask(__name__)
+    app.json_encoder = BSONJSONEncoder
+
+    print(f"📊 Serializing {N_TASKS:,} tasks (orjson {'available' if serialization.orjson else 'not installed'})\n")
+    print(f"{'serializer':<28}{'ms':>10}{'tasks/s':>14}{'MB/s':>10}")
+    with app.app_context():
+        if serialization.orjson:
+            measure("serialization.jsonify", lambda: jsonify(tasks).get_data())
+        measure("stdlib json + default", lambda: json.dumps(tasks, default=serialization._default).encode())
+        measure("flask.jsonify + encoder", lambda: app.response_class(
+            json.dumps(tasks, cls=BSONJSONEncoder), mimetype="application/json").get_data())
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,138 @@
+import os
+import zlib
+
+from flask import request
+
+# Optional codecs: only offered when the package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/javascript",
+}
+# text/event-stream is left alone: frames are tiny and proxies buffer compressed streams
+
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 500))
+LEVELS = {
+    "br": int(os.environ.get("COMPRESS_BR_LEVEL", 4)),
+    "zstd": int(os.environ.get("COMPRESS_ZSTD_LEVEL", 3)),
+    "gzip": int(os.environ.get("COMPRESS_GZIP_LEVEL", 6)),
+}
+
+
+def available_codecs():
+    """Codecs in server preference order, filtered by COMPRESS_ALGORITHMS and installed packages"""
+    wanted = [c.strip() for c in os.environ.get("COMPRESS_ALGORITHMS", "br,zstd,gzip").split(",") if c.strip()]
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [c for c in wanted if installed.get(c)]
+
+
+class _Compressor:
+    """Uniform incremental interface over gzip/brotli/zstd"""
+
+    def __init__(self, codec: str, level: int):
+        self.codec = codec
+        if codec == "gzip":
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif codec == "br":
+            self._obj = brotli.Compressor(quality=level)
+        else:
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        """Flush buffered output so a streamed chunk reaches the client now"""
+        if self.codec == "gzip":
+            return self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.codec == "br":
+            return self._obj.flush()
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.codec == "gzip":
+            return self._obj.flush(zlib.Z_FINISH)
+        if self.codec == "br":
+            return self._obj.finish()
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def compress_bytes(data: bytes, codec: str, level: int = None) -> bytes:
+    compressor = _Compressor(codec, LEVELS[codec] if level is None else level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def negotiate_codec():
+    codecs = available_codecs()
+    if not codecs:
+        return None
+    return request.accept_encodings.best_match(codecs)
+
+
+def etag_variants(etag: str):
+    """The ETag of each encoded representation of the same resource"""
+    return [etag] + [f"{etag}-{codec}" for codec in ("br", "zstd", "gzip")]
+
+
+def _stream(iterable, compressor: _Compressor):
+    for chunk in iterable:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(response):
+    if response.status_code == 304:
+        # A 304 stands in for whichever encoded representation the client holds
+        if available_codecs():
+            response.vary.add("Accept-Encoding")
+        return response
+    if (response.status_code < 200 or response.status_code == 204
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    codec = negotiate_codec()
+    if not codec:
+        return response
+
+    compressor = _Compressor(codec, LEVELS[codec])
+    if response.is_streamed:
+        response.response = _stream(response.response, compressor)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_SIZE:
+            return response
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers["Content-Encoding"] = codec
+    # Each encoding is a different representation, so a strong ETag must differ too
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{codec}")
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
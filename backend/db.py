@@ -1,36 +1,128 @@
 import os
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
 from dotenv import load_dotenv
+from tenancy import SHARED_COLLECTIONS, ClientPool, TenantDatabase, TenantRouter
 
 # Load environment variables
 load_dotenv()
 
-# Get MongoDB URI from environment variables
-mongo_uri = os.environ.get('MONGODB_URI')
-
-if not mongo_uri:
-    print("⚠️ No MONGODB_URI found, using local MongoDB")
-    mongo_uri = "mongodb://localhost:27017/"
-
-# Connect to MongoDB
-try:
-    client = MongoClient(mongo_uri)
-    db = client["rise_ai_db"]
-    print("✅ MongoDB connection successful!")
-    
-    # List available databases (for debugging)
-    databases = client.list_database_names()
-    print(f"📊 Available databases: {databases}")
-    
-    # List collections
-    collections = db.list_collection_names()
-    print(f"📁 Collections in rise_ai_db: {collections}")
-    
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
+# "mongo" (default) or "memory" for an in-process mongomock client (tests and benchmarks, no mongod needed)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+
+if STORAGE_BACKEND == "memory":
+    # mongomock comes from requirements-dev.txt; it isn't installed in production
+    import mongomock
+
+    mongo_uri = "memory://"
+    client = mongomock.MongoClient()
+    pool = ClientPool(lambda uri: client, mongo_uri, client)
+    print("🧠 Using in-memory storage (mongomock)")
+else:
+    # Get MongoDB URI from environment variables
+    mongo_uri = os.environ.get('MONGODB_URI')
+
+    if not mongo_uri:
+        print("⚠️ No MONGODB_URI found, using local MongoDB")
+        mongo_uri = "mongodb://localhost:27017/"
+
+    # Connect to MongoDB
+    try:
+        client = MongoClient(mongo_uri)
+        pool = ClientPool(MongoClient, mongo_uri, client)
+        print("✅ MongoDB connection successful!")
+
+        # List available databases (for debugging)
+        databases = client.list_database_names()
+        print(f"📊 Available databases: {databases}")
+
+        # List collections
+        collections = client["rise_ai_db"].list_collection_names()
+        print(f"📁 Collections in rise_ai_db: {collections}")
+
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+
+# `db` and the collections below follow the current organization (see tenancy.py);
+# users, tenants and jobs always live in the shared rise_ai_db database
+router = TenantRouter(pool, mongo_uri, "rise_ai_db", prepare=lambda database, shared: ensure_indexes(database, shared))
+db = TenantDatabase(router)
+shared_db = router.shared
 
 # Define collections
 users_collection = db["users"]
 tasks_collection = db["tasks"]
 chat_history_collection = db["chat_sessions"]
-updates_collection = db["updates"]
\ No newline at end of file
+updates_collection = db["updates"]
+
+# Seconds a stored Idempotency-Key response is replayed for (services/idempotency.py)
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+
+# Indexes the app relies on, as (collection, keys, options)
+INDEXES = [
+    ("users", [("email", ASCENDING)], {"name": "users_email"}),
+    ("users", [("username", ASCENDING)], {"name": "users_username"}),
+    # Expired sessions are removed by MongoDB; purges delete a user's sessions by email
+    ("sessions", [("expires_at", ASCENDING)], {"name": "sessions_ttl", "expireAfterSeconds": 0}),
+    ("sessions", [("email", ASCENDING)], {"name": "sessions_email"}),
+    ("users", [("updated_at", ASCENDING)], {"name": "users_updated_at"}),
+    ("updates", [("content", TEXT), ("update_text", TEXT)], {"name": "updates_text", "default_language": "english"}),
+    ("updates", [("employee_username", ASCENDING), ("timestamp", DESCENDING)], {"name": "updates_employee_timestamp"}),
+    ("updates", [("timestamp", DESCENDING)], {"name": "updates_timestamp"}),
+    ("updates", [("updated_at", DESCENDING)], {"name": "updates_updated_at"}),
+    ("updates", [("employee_name", ASCENDING), ("timestamp", DESCENDING)], {"name": "updates_employee_name_timestamp"}),
+    # Structured fields written by the extraction worker
+    ("updates", [("extracted.has_blockers", ASCENDING), ("timestamp", DESCENDING)],
+     {"name": "updates_extracted_blockers_timestamp"}),
+    ("updates", [("extraction_status", ASCENDING), ("timestamp", ASCENDING)], {"name": "updates_extraction_status"}),
+    ("tasks", [("title", TEXT), ("description", TEXT)], {"name": "tasks_text", "weights": {"title": 5, "description": 1}}),
+    # Trailing title/status/priority let ?fields=title,status,priority list views be covered by the index
+    ("tasks", [("employee_username", ASCENDING), ("created_at", DESCENDING), ("title", ASCENDING),
+               ("status", ASCENDING), ("priority", ASCENDING)], {"name": "tasks_employee_created_summary"}),
+    ("tasks", [("created_at", DESCENDING), ("title", ASCENDING), ("status", ASCENDING),
+               ("priority", ASCENDING), ("employee_username", ASCENDING)], {"name": "tasks_created_summary"}),
+    ("tasks", [("updated_at", ASCENDING)], {"name": "tasks_updated_at"}),
+    ("tasks", [("status", ASCENDING), ("created_at", DESCENDING)], {"name": "tasks_status_created"}),
+    ("tasks", [("priority", ASCENDING), ("created_at", DESCENDING)], {"name": "tasks_priority_created"}),
+    ("tasks", [("assigned_manager", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)],
+     {"name": "tasks_manager_status_created"}),
+    ("tasks", [("due_date", ASCENDING)], {"name": "tasks_due_date"}),
+    ("tasks", [("employee_username", ASCENDING), ("updated_at", DESCENDING)], {"name": "tasks_employee_updated"}),
+    ("jobs", [("status", ASCENDING), ("created_at", ASCENDING)], {"name": "jobs_status_created"}),
+    # Daily task rollups: range scans by day, optionally narrowed to employees
+    ("task_rollups", [("day", ASCENDING), ("employee_username", ASCENDING)], {"name": "task_rollups_day_employee"}),
+    ("task_rollups", [("updated_at", ASCENDING)], {"name": "task_rollups_updated_at"}),
+    # Daily chat usage per user
+    ("usage_rollups", [("day", ASCENDING), ("username", ASCENDING)], {"name": "usage_rollups_day_username"}),
+    ("usage_rollups", [("updated_at", ASCENDING)], {"name": "usage_rollups_updated_at"}),
+    ("chat_sessions", [("usage.total_tokens", DESCENDING), ("timestamp", DESCENDING)], {"name": "chat_usage_tokens"}),
+    ("idempotency_keys", [("created_at", ASCENDING)], {"name": "idempotency_keys_ttl", "expireAfterSeconds": IDEMPOTENCY_TTL}),
+    # _id breaks ties between turns with the same timestamp for chat history cursors
+    ("chat_sessions", [("username", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+     {"name": "chat_username_timestamp_id"}),
+]
+
+# Indexes replaced by wider ones in INDEXES, dropped so writes stop maintaining them
+SUPERSEDED_INDEXES = [
+    ("tasks", "tasks_employee_created"),  # by tasks_employee_created_summary
+    ("updates", "updates_blockers_timestamp"),  # extraction output moved under extracted.*
+]
+
+def ensure_indexes(database=None, shared: bool = True):
+    """Create INDEXES on a database and drop SUPERSEDED_INDEXES; tenant databases skip the shared collections"""
+    database = shared_db if database is None else database
+    for collection_name, name in SUPERSEDED_INDEXES:
+        try:
+            if name in database[collection_name].index_information():
+                database[collection_name].drop_index(name)
+                print(f"🧹 Dropped superseded index {name}")
+        except Exception as e:
+            print(f"⚠️ Could not drop index {name}: {e}")
+    for collection_name, keys, options in INDEXES:
+        if not shared and collection_name in SHARED_COLLECTIONS:
+            continue
+        try:
+            database[collection_name].create_index(keys, **options)
+        except Exception as e:
+            print(f"⚠️ Could not create index {options.get('name')}: {e}")
+
+ensure_indexes()
@@ -24,13 +24,13 @@ def create_demo_users():
     
     # Check if users already exist
     if not User.find_by_username("demo_employee"):
-        User.create_user(employee.to_dict(include_password=True))
+        User.create_user(employee.to_doc())
         print("✅ Demo employee created")
     else:
         print("ℹ️ Demo employee already exists")
     
     if not User.find_by_username("demo_manager"):
-        User.create_user(manager.to_dict(include_password=True))
+        User.create_user(manager.to_doc())
         print("✅ Demo manager created")
     else:
         print("ℹ️ Demo manager already exists")
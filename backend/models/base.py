@@ -0,0 +1,101 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson.raw_bson import RawBSONDocument
+
+
+class Model:
+    """Base for the __slots__ document models.
+
+    Instances either hold their fields directly (from_doc / the constructor) or
+    wrap the undecoded BSON bytes of a query result (from_raw); raw instances are
+    decoded into their slots on first attribute access and the bytes are dropped.
+    Declared fields missing from a document read as None, which is what lets to_doc
+    leave None fields out of stored documents; any other name raises AttributeError.
+    """
+
+    __slots__ = ("_id", "_raw")
+
+    FIELDS: tuple = ()
+
+    @classmethod
+    def from_doc(cls, document: Dict[str, Any]):
+        instance = cls.__new__(cls)
+        for field in ("_id",) + cls.FIELDS:
+            if field in document:
+                setattr(instance, field, document[field])
+        return instance
+
+    @classmethod
+    def from_raw(cls, document):
+        """Wrap a RawBSONDocument without decoding it; plain dicts are loaded eagerly"""
+        if not isinstance(document, RawBSONDocument):
+            return cls.from_doc(document)
+        instance = cls.__new__(cls)
+        instance._raw = document
+        return instance
+
+    @classmethod
+    def from_cursor(cls, documents: Iterable) -> List["Model"]:
+        return [cls.from_raw(document) for document in documents]
+
+    @staticmethod
+    def raw_view(collection):
+        """The same collection, returning RawBSONDocument results for from_raw"""
+        try:
+            return collection.with_options(
+                codec_options=collection.codec_options.with_options(document_class=RawBSONDocument))
+        except NotImplementedError:
+            # mongomock (STORAGE_BACKEND=memory) only returns dicts, which from_raw loads eagerly
+            return collection
+
+    def _hydrate(self):
+        raw = self._raw
+        del self._raw
+        for field, value in raw.items():
+            if field == "_id" or field in self.FIELDS:
+                setattr(self, field, value)
+
+    def __getattr__(self, name: str):
+        # Only reached for slots that haven't been set yet
+        if name == "_raw" or (name != "_id" and name not in self.FIELDS):
+            raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+        if not self.hydrated:
+            self._hydrate()
+            if self._is_set(name):
+                return object.__getattribute__(self, name)
+        # A declared field the document doesn't have
+        return None
+
+    def _is_set(self, name: str) -> bool:
+        try:
+            object.__getattribute__(self, name)
+        except AttributeError:
+            return False
+        return True
+
+    @property
+    def hydrated(self) -> bool:
+        return not self._is_set("_raw")
+
+    def to_doc(self, include_id: bool = True) -> Dict[str, Any]:
+        """Document for MongoDB, leaving out fields that are None"""
+        fields = (("_id",) if include_id else ()) + self.FIELDS
+        document = {}
+        for field in fields:
+            value = getattr(self, field)
+            if value is not None:
+                document[field] = value
+        return document
+
+    def get(self, field: str, default: Optional[Any] = None) -> Any:
+        """dict-style access, so models can stand in for documents in existing code.
+
+        Like attribute access, only declared fields are allowed; anything else raises
+        AttributeError rather than quietly returning the default.
+        """
+        value = getattr(self, field)
+        return default if value is None else value
+
+    def __repr__(self) -> str:
+        state = "raw" if not self.hydrated else self.to_doc()
+        return f"<{type(self).__name__} {state}>"
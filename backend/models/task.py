@@ -1,8 +1,29 @@
 from datetime import datetime
+from typing import Optional
 from bson import ObjectId
+from pymongo.errors import OperationFailure
 from db import db
+from models.base import Model
+
+class Task(Model):
+    # Fields clients may select with ?fields=
+    FIELDS = (
+        "employee_username", "title", "description", "priority", "status", "assigned_manager",
+        "created_at", "updated_at", "due_date", "completion_date"
+    )
+    __slots__ = FIELDS
+
+    employee_username: str
+    title: str
+    description: str
+    priority: str
+    status: str
+    assigned_manager: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    due_date: Optional[datetime]
+    completion_date: Optional[datetime]
 
-class Task:
     def __init__(self, employee_username, title, description, priority="medium", status="pending", assigned_manager=None):
         self.employee_username = employee_username
         self.title = title
@@ -15,19 +36,11 @@ class Task:
         self.due_date = None
         self.completion_date = None
     
-    def to_dict(self):
-        return {
-            "employee_username": self.employee_username,
-            "title": self.title,
-            "description": self.description,
-            "priority": self.priority,
-            "status": self.status,
-            "assigned_manager": self.assigned_manager,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-            "due_date": self.due_date,
-            "completion_date": self.completion_date
-        }
+    @staticmethod
+    def find(query, projection=None, sort=None, limit=0):
+        """Tasks as lazily decoded models, for callers that only touch a few fields"""
+        cursor = Task.raw_view(db["tasks"]).find(query, projection).sort(sort or [("created_at", -1)]).limit(limit)
+        return Task.from_cursor(cursor)
     
     @staticmethod
     def create_task(task_data):
@@ -43,16 +56,14 @@ class Task:
             return None
     
     @staticmethod
-    def get_tasks_by_user(username):
+    def get_tasks_by_user(username, projection=None):
         tasks_collection = db["tasks"]
-        # Fixed: Remove {"_id": 1} to get all fields
-        return list(tasks_collection.find({"employee_username": username}).sort("created_at", -1))
+        return list(tasks_collection.find({"employee_username": username}, projection).sort("created_at", -1))
     
     @staticmethod
-    def get_all_tasks():
+    def get_all_tasks(projection=None):
         tasks_collection = db["tasks"]
-        # Fixed: Remove {"_id": 1} to get all fields
-        return list(tasks_collection.find({}).sort("created_at", -1))
+        return list(tasks_collection.find({}, projection).sort("created_at", -1))
     
     @staticmethod
     def get_tasks_by_status(status):
@@ -69,31 +80,54 @@ class Task:
         tasks_collection = db["tasks"]
         return list(tasks_collection.find({"assigned_manager": manager_username}).sort("created_at", -1))
     
+    @staticmethod
+    def query_tasks(query, sort, skip=0, limit=20, projection=None, hint=None):
+        """Filtered, sorted, paginated read; returns (tasks, total).
+
+        The hint is only a plan preference: if the index is missing (dropped, still
+        building, not yet created on a tenant database) the query runs without it.
+        """
+        tasks_collection = db["tasks"]
+        cursor = tasks_collection.find(query, projection).sort(sort).skip(skip).limit(limit)
+        count_options = {}
+        if hint:
+            cursor = cursor.hint(hint)
+            count_options["hint"] = hint
+        try:
+            return list(cursor), tasks_collection.count_documents(query, **count_options)
+        except OperationFailure as e:
+            if not hint:
+                raise
+            print(f"⚠️ Query hint {hint} failed ({e}), running without it")
+            return Task.query_tasks(query, sort, skip, limit, projection)
+    
     @staticmethod
     def update_task_status(task_id, status, completion_date=None):
+        """Set a task's status; returns the task as it was before, or None if it doesn't
+        exist or already has that status.
+
+        Completing a task stamps completion_date (now, unless given) and moving it
+        out of completed clears it.
+        """
         tasks_collection = db["tasks"]
-        update_data = {
-            "status": status, 
-            "updated_at": datetime.utcnow()
-        }
-        
-        if status == "completed" and completion_date:
-            update_data["completion_date"] = completion_date
-        
+        now = datetime.utcnow()
+        update = {"$set": {"status": status, "updated_at": now}}
+        if status == "completed":
+            update["$set"]["completion_date"] = completion_date or now
+        else:
+            update["$unset"] = {"completion_date": ""}
         try:
-            return tasks_collection.update_one(
-                {"_id": ObjectId(task_id)}, 
-                {"$set": update_data}
-            )
+            return tasks_collection.find_one_and_update({"_id": ObjectId(task_id), "status": {"$ne": status}}, update)
         except Exception:
             return None
     
     @staticmethod
     def update_task(task_id, update_data):
+        """Set fields on a task; returns the task as it was before, or None if it doesn't exist"""
         tasks_collection = db["tasks"]
         update_data["updated_at"] = datetime.utcnow()
         try:
-            return tasks_collection.update_one(
+            return tasks_collection.find_one_and_update(
                 {"_id": ObjectId(task_id)}, 
                 {"$set": update_data}
             )
@@ -102,9 +136,10 @@ class Task:
     
     @staticmethod
     def delete_task(task_id):
+        """Delete a task; returns the deleted task, or None if it didn't exist"""
         tasks_collection = db["tasks"]
         try:
-            return tasks_collection.delete_one({"_id": ObjectId(task_id)})
+            return tasks_collection.find_one_and_delete({"_id": ObjectId(task_id)})
         except Exception:
             return None
     
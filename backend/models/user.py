@@ -1,15 +1,31 @@
 from datetime import datetime
+from typing import Optional
 from db import db, users_collection
+from models.base import Model
 import hashlib
 
-class User:
-    def __init__(self, username, email, role, full_name, password=None):
+class User(Model):
+    FIELDS = ("username", "email", "role", "full_name", "organization", "password_hash", "created_at", "updated_at")
+    __slots__ = FIELDS
+
+    username: str
+    email: str
+    role: str
+    full_name: str
+    organization: Optional[str]
+    password_hash: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    def __init__(self, username, email, role, full_name, password=None, organization=None):
         self.username = username
         self.email = email
         self.role = role  # 'employee' or 'manager'
         self.full_name = full_name
+        self.organization = organization  # None keeps the user's data in the shared database
         self.password_hash = self._hash_password(password) if password else None
         self.created_at = datetime.utcnow()
+        self.updated_at = None
     
     def _hash_password(self, password):
         """Hash password using SHA-256"""
@@ -23,18 +39,6 @@ class User:
             return False
         return self.password_hash == hashlib.sha256(password.encode()).hexdigest()
     
-    def to_dict(self, include_password=False):
-        data = {
-            "username": self.username,
-            "email": self.email,
-            "role": self.role,
-            "full_name": self.full_name,
-            "created_at": self.created_at
-        }
-        if include_password and self.password_hash:
-            data["password_hash"] = self.password_hash
-        return data
-    
     @staticmethod
     def create_user(user_data):
         users_collection = db["users"]
@@ -90,5 +94,6 @@ class User:
     
     @staticmethod
     def delete_user(username):
+        """Delete the user document; returns it, or None if the user doesn't exist"""
         users_collection = db["users"]
-        return users_collection.delete_one({"username": username})
\ No newline at end of file
+        return users_collection.find_one_and_delete({"username": username})
\ No newline at end of file
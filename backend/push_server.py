@@ -0,0 +1,194 @@
+"""Server-sent events for managers on an asyncio event loop.
+
+The Flask /stream route holds a gunicorn thread per open stream, so the web
+process only takes a handful. This process serves the same streams from one
+event loop: an idle connection is a socket, a bounded queue and a suspended
+coroutine, so thousands fit in one process. Nothing here imports the Gemini
+SDK or runs the other background workers; it only tails the invalidation bus.
+
+Run it next to the web app (Procfile `push`) and point EventSource at it:
+    GET /stream?access_token=<token from /users/login>[&last_event_id=...]
+    GET /stream/status
+"""
+
+import asyncio
+import os
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from serialization import dumps
+from services.cache import find_user_by_email, user_cache
+from services.invalidation import invalidation_bus
+from services.push import PUSH_MAX_STREAM_SECONDS, PushHub, PushHubFull, parse_event_id
+from services.sessions import get_session
+
+PUSH_SERVER_MAX_CONNECTIONS = int(os.getenv("PUSH_SERVER_MAX_CONNECTIONS", "10000"))
+PUSH_SERVER_STREAM_SECONDS = float(os.getenv("PUSH_SERVER_STREAM_SECONDS", str(PUSH_MAX_STREAM_SECONDS * 12)))
+REQUEST_TIMEOUT = float(os.getenv("PUSH_REQUEST_TIMEOUT", "10"))
+ALLOWED_ORIGINS = os.getenv("PUSH_ALLOWED_ORIGINS", "http://localhost:3000,https://rise-ai-frontend.onrender.com").split(",")
+
+hub = PushHub(max_connections=PUSH_SERVER_MAX_CONNECTIONS, max_lifetime=PUSH_SERVER_STREAM_SECONDS)
+
+_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+            404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}
+
+
+class _Request:
+    def __init__(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str]):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[_Request]:
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    url = urlsplit(target)
+    query = {key: values[0] for key, values in parse_qs(url.query).items()}
+    return _Request(method, url.path, query, headers)
+
+
+def _head(status: int, request: _Request, content_type: str, extra: Tuple[Tuple[str, str], ...] = ()) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", f"Content-Type: {content_type}", "Connection: close"]
+    origin = request.headers.get("origin")
+    if origin in ALLOWED_ORIGINS:
+        lines += [f"Access-Control-Allow-Origin: {origin}", "Access-Control-Allow-Credentials: true"]
+    lines += [f"{name}: {value}" for name, value in extra]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _respond(writer: asyncio.StreamWriter, request: _Request, status: int, body: Dict,
+                   extra: Tuple[Tuple[str, str], ...] = ()):
+    payload = dumps(body)
+    writer.write(_head(status, request, "application/json", extra + (("Content-Length", str(len(payload))),)))
+    writer.write(payload)
+    await writer.drain()
+
+
+def _bearer_token(request: _Request) -> Optional[str]:
+    header = request.headers.get("authorization", "")
+    if header.startswith("Bearer "):
+        return header[len("Bearer "):].strip() or None
+    return request.query.get("access_token") or None
+
+
+def _authorize(token: Optional[str]):
+    """(status, error, session, user) for a stream request; blocking, so it runs off the loop"""
+    session = get_session(token)
+    if not session:
+        return 401, "Session expired or invalid, please log in again", None, None
+    user = find_user_by_email(session.get("email"))
+    if not user or user.get("role") != "manager":
+        return 403, "Only managers can subscribe to team events", None, None
+    return 200, None, session, user
+
+
+async def _stream(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: _Request):
+    loop = asyncio.get_running_loop()
+    status, error, session, user = await loop.run_in_executor(None, _authorize, _bearer_token(request))
+    if error:
+        await _respond(writer, request, status, {"success": False, "error": error})
+        return
+
+    last_event_id = request.headers.get("last-event-id") or request.query.get("last_event_id")
+    if last_event_id:
+        try:
+            parse_event_id(last_event_id)
+        except ValueError as e:
+            await _respond(writer, request, 400, {"success": False, "error": str(e)})
+            return
+
+    try:
+        frames = hub.astream(user.get("username"), session.get("organization"), last_event_id)
+    except PushHubFull:
+        await _respond(writer, request, 503, {"success": False, "error": "Too many open event streams, retry shortly"},
+                       (("Retry-After", "30"),))
+        return
+
+    async def pump():
+        writer.write(_head(200, request, "text/event-stream", (("Cache-Control", "no-cache"), ("X-Accel-Buffering", "no"))))
+        async for frame in frames:
+            writer.write(frame.encode("utf-8"))
+            await writer.drain()
+
+    # EventSource sends nothing after the request, so a read only returns once the client hangs up;
+    # that frees the slot right away instead of at the next heartbeat
+    sending = asyncio.ensure_future(pump())
+    hung_up = asyncio.ensure_future(reader.read(1))
+    try:
+        await asyncio.wait({sending, hung_up}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (sending, hung_up):
+            task.cancel()
+        await asyncio.gather(sending, hung_up, return_exceptions=True)
+        await frames.aclose()
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await _read_request(reader)
+        if request is None:
+            return
+        if request.method == "OPTIONS":
+            writer.write(_head(204, request, "text/plain", (
+                ("Access-Control-Allow-Methods", "GET, OPTIONS"),
+                ("Access-Control-Allow-Headers", "Authorization, Last-Event-ID, Accept"))))
+            await writer.drain()
+        elif request.method != "GET":
+            await _respond(writer, request, 405, {"success": False, "error": "Method not allowed"})
+        elif request.path == "/stream":
+            await _stream(reader, writer, request)
+        elif request.path == "/stream/status":
+            await _respond(writer, request, 200, {"success": True, **hub.status()})
+        elif request.path == "/":
+            await _respond(writer, request, 200, {"status": "Rise AI push server is running!"})
+        else:
+            await _respond(writer, request, 404, {"success": False, "error": "Not found"})
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int) -> asyncio.AbstractServer:
+    return await asyncio.start_server(handle, host, port, backlog=1024)
+
+
+def _raise_file_limit():
+    # Each connection is a file descriptor; the default soft limit (often 1024) would cap streams first
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and (hard == resource.RLIM_INFINITY or soft < hard):
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"⚠️ Could not raise the open file limit: {e}")
+
+
+async def main():
+    port = int(os.environ.get("PUSH_PORT") or os.environ.get("PORT", 5001))
+    server = await serve("0.0.0.0", port)
+    print(f"✅ Push server listening on :{port} (up to {hub.max_connections} streams)")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    _raise_file_limit()
+    invalidation_bus.register_cache("users", user_cache, key_fn=lambda user: [user.get("email")])
+    hub.attach(invalidation_bus)
+    invalidation_bus.start()
+    asyncio.run(main())
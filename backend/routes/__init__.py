@@ -2,10 +2,18 @@ from .user_routes import users_bp
 from .task_routes import tasks_bp
 from .chat_routes import chat_bp
 from .updates import updates_bp
+from .search_routes import search_bp
+from .stream_routes import stream_bp
+from .jobs_routes import jobs_bp
+from .analytics_routes import analytics_bp
 
 __all__ = [
     'users_bp',
     'tasks_bp',
     'chat_bp',
-    'updates_bp'
+    'updates_bp',
+    'search_bp',
+    'stream_bp',
+    'jobs_bp',
+    'analytics_bp'
 ]
\ No newline at end of file
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, request
+from serialization import jsonify
+from routes.conditional import collection_version, compute_etag, conditional_json
+from services.analytics import ANALYTICS_MAX_DAYS, rollups_collection, task_metrics
+from services.digests import team_members
+from services.search import parse_date
+from services.usage import expensive_turns, usage_report, usage_rollups_collection
+from db import chat_history_collection
+
+analytics_bp = Blueprint('analytics', __name__)
+
+USAGE_MAX_TOP = 100
+
+
+def _date_range():
+    """(from, to) from the query string, defaulting to the last 30 days; raises ValueError with a message"""
+    try:
+        date_to = parse_date(request.args.get('to')) or datetime.utcnow()
+        date_from = parse_date(request.args.get('from')) or date_to - timedelta(days=29)
+    except ValueError:
+        raise ValueError("from/to must be ISO dates")
+    if date_from > date_to:
+        raise ValueError("from must not be after to")
+    if (date_to - date_from).days > ANALYTICS_MAX_DAYS:
+        raise ValueError(f"Range is limited to {ANALYTICS_MAX_DAYS} days")
+    return date_from, date_to
+
+
+@analytics_bp.route("/analytics/tasks", methods=["GET"])
+def get_task_analytics():
+    """Tasks created/completed and cycle-time percentiles per day or week, per employee and overall"""
+    try:
+        date_from, date_to = _date_range()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    interval = request.args.get('interval', 'day')
+    if interval not in ("day", "week"):
+        return jsonify({"success": False, "error": "interval must be 'day' or 'week'"}), 400
+
+    employees = None
+    if request.args.get('employee'):
+        employees = [e.strip() for e in request.args['employee'].split(",") if e.strip()]
+    elif request.args.get('manager'):
+        employees = team_members(request.args['manager'])
+
+    etag = compute_etag("task_analytics", date_from.date(), date_to.date(), interval, employees,
+                        *collection_version(rollups_collection, {}, "updated_at"))
+    return conditional_json(etag, lambda: {"success": True, **task_metrics(date_from, date_to, interval, employees)})
+
+
+@analytics_bp.route("/analytics/usage", methods=["GET"])
+def get_usage_analytics():
+    """Chat turns, Gemini tokens and time per user and day, per role and overall.
+
+    ?username=a@x.com,b@x.com and ?role=manager narrow it down; ?top=N adds the N
+    turns that used the most tokens.
+    """
+    try:
+        date_from, date_to = _date_range()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    usernames = None
+    if request.args.get('username'):
+        usernames = [u.strip() for u in request.args['username'].split(",") if u.strip()]
+    role = request.args.get('role') or None
+    top = request.args.get('top', 0, type=int)
+    if not 0 <= top <= USAGE_MAX_TOP:
+        return jsonify({"success": False, "error": f"top must be between 0 and {USAGE_MAX_TOP}"}), 400
+
+    def build():
+        report = {"success": True, **usage_report(date_from, date_to, usernames, role)}
+        if top:
+            # A role filter narrows the top turns to the users the rollups found for that role
+            scope = usernames if usernames is not None or not role else list(report["users"])
+            report["top_turns"] = expensive_turns(chat_history_collection, report["from"], report["to"], top, scope)
+        return report
+
+    # Every turn bumps its rollup's updated_at, so this also covers top_turns
+    etag = compute_etag("usage_analytics", date_from.date(), date_to.date(), usernames, role, top,
+                        *collection_version(usage_rollups_collection, {}, "updated_at"))
+    return conditional_json(etag, build)
@@ -1,7 +1,18 @@
-from flask import Blueprint, request, jsonify
-from services.agent import AIAgent
-from db import users_collection, chat_history_collection
+from flask import Blueprint, request
+from serialization import jsonify
+from services.agent import AIAgent, CHAT_HISTORY_FIELDS, update_dedup
+from services.model_router import model_router
+from services.admission import admission, AdmissionRejected
+from services.cache import find_user_by_email
+from services.singleflight import llm_flight
+from services.extraction import extraction_worker
+from routes.conditional import collection_version, compute_etag, conditional_json
+from routes.fields import parse_fields
+from routes.idempotency import idempotent
+from services.idempotency import idempotency_store
+from db import chat_history_collection
 from datetime import datetime
+import math
 from flask_cors import cross_origin
 
 # Initialize blueprint and AI agent
@@ -10,6 +21,7 @@ ai_agent = AIAgent()
 
 # Notice we changed from "/" to this explicit path
 @chat_bp.route("", methods=["POST", "OPTIONS"])
+@idempotent
 def chat():
     """Main chat endpoint for AI conversations"""
     if request.method == "OPTIONS":
@@ -32,7 +44,7 @@ def chat():
             return jsonify({"success": False, "error": "Email and message are required"}), 400
         
         # Get the user record to provide context to AI
-        user = users_collection.find_one({"email": email})
+        user = find_user_by_email(email)
         if not user:
             print(f"User not found with email: {email}")
             return jsonify({
@@ -52,6 +64,16 @@ def chat():
                 "timestamp": timestamp
             }), 200
             
+        except AdmissionRejected as rejected:
+            resp = jsonify({
+                "success": False,
+                "error": f"Too many requests ({rejected.reason})",
+                "response": "I'm getting a lot of requests right now. Please try again in a moment.",
+                "timestamp": timestamp
+            })
+            resp.headers["Retry-After"] = str(max(1, math.ceil(rejected.retry_after)))
+            return resp, 429
+            
         except Exception as agent_error:
             print(f"AI Agent error: {str(agent_error)}")
             import traceback
@@ -81,18 +103,31 @@ def get_chat_history(username):
     """Get chat history for a specific user"""
     try:
         limit = request.args.get('limit', 10, type=int)
+        try:
+            projection = parse_fields(request.args.get('fields'), CHAT_HISTORY_FIELDS)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         
         # Find user by email
-        user = users_collection.find_one({"email": username})
+        user = find_user_by_email(username)
         if not user:
             return jsonify({"success": False, "error": "User not found"}), 404
             
-        history = ai_agent.get_chat_history(username, limit)
-        
-        return jsonify({
-            "success": True,
-            "history": history
-        }), 200
+        since = request.args.get('since')
+        before = request.args.get('before')
+
+        def build():
+            return {"success": True, **ai_agent.get_chat_history_page(username, limit, projection, since, before)}
+
+        try:
+            if since:
+                # Delta polls are a bounded index range scan; cheaper than computing an ETag
+                return jsonify(build()), 200
+            etag = compute_etag("history", username, limit, projection, before,
+                                *collection_version(chat_history_collection, {"username": username}, "timestamp"))
+            return conditional_json(etag, build)
+        except ValueError as e:
+            return jsonify({"success": False, "error": f"Invalid cursor: {e}"}), 400
         
     except Exception as e:
         print(f"Chat history error: {str(e)}")
@@ -103,16 +138,18 @@ def clear_chat_history(username):
     """Clear chat history for a specific user"""
     try:
         # Find user by email
-        user = users_collection.find_one({"email": username})
+        user = find_user_by_email(username)
         if not user:
             return jsonify({"success": False, "error": "User not found"}), 404
             
-        deleted_count = ai_agent.clear_chat_history(username)
+        job = ai_agent.clear_chat_history(username)
         
+        # Turns are deleted in the background; poll /jobs/<job_id> for progress
         return jsonify({
             "success": True,
-            "message": f"Deleted {deleted_count} messages"
-        }), 200
+            "message": "Chat history is being cleared",
+            "job_id": str(job["_id"])
+        }), 202
         
     except Exception as e:
         print(f"Clear chat history error: {str(e)}")
@@ -126,8 +163,14 @@ def chat_status():
         return jsonify({
             "success": True,
             "status": "Chat service is running",
-            "ai_simulation": ai_agent.use_simulation,
-            "api_key_configured": bool(ai_agent.api_key)
+            "ai_simulation": ai_agent.use_simulation or model_router.all_open(),
+            "model_routing": model_router.status(),
+            "api_key_configured": bool(ai_agent.api_key),
+            "admission": admission.metrics(),
+            "llm_coalescing": llm_flight.stats(),
+            "update_extraction": extraction_worker.stats(),
+            "update_dedup": update_dedup.stats(),
+            "idempotency": idempotency_store.stats()
         }), 200
         
     except Exception as e:
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Any, Callable, Dict
+
+from flask import request, make_response
+
+from compression import etag_variants
+from serialization import jsonify
+
+
+def collection_version(collection, query: Dict[str, Any], field: str) -> tuple:
+    """Cheap version of a query result: matching count plus the newest value of `field`.
+
+    Both parts come from indexes ((..., field) compound indexes in db.INDEXES), so
+    this never touches the documents themselves.
+    """
+    if query:
+        count = collection.count_documents(query)
+    else:
+        count = collection.estimated_document_count()
+    newest = collection.find_one(query, {field: 1, "_id": 0}, sort=[(field, -1)])
+    latest = newest.get(field) if newest else None
+    return count, latest.isoformat() if hasattr(latest, "isoformat") else latest
+
+
+def compute_etag(*parts: Any) -> str:
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def conditional_json(etag: str, build: Callable[[], Any]):
+    """Return 304 if the client already has `etag`, otherwise the JSON built by `build()`"""
+    # Compressed responses carry a per-encoding suffix; echo back whichever variant matched
+    matched = next((tag for tag in etag_variants(etag) if request.if_none_match.contains(tag)), None)
+    if matched:
+        response = make_response("", 304)
+        response.set_etag(matched)
+    else:
+        response = make_response(jsonify(build()), 200)
+        response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+from serialization import jsonify
 from db import client, db
 
 database_bp = Blueprint('database', __name__)
@@ -0,0 +1,22 @@
+from typing import Dict, Iterable, Optional
+
+
+def parse_fields(value: Optional[str], allowed: Iterable[str]) -> Optional[Dict[str, int]]:
+    """Turn a ?fields=a,b,c parameter into a Mongo projection.
+
+    _id is excluded unless requested, so that a projection over indexed fields can be
+    answered from the index alone. Raises ValueError on unknown fields.
+    """
+    if not value:
+        return None
+
+    fields = [f.strip() for f in value.split(",") if f.strip()]
+    unknown = sorted(set(fields) - set(allowed) - {"_id"})
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if not fields:
+        return None
+
+    projection = {field: 1 for field in fields}
+    projection.setdefault("_id", 0)
+    return projection
@@ -0,0 +1,62 @@
+import functools
+import hashlib
+
+from flask import current_app, g, make_response, request
+
+from serialization import jsonify
+from services.idempotency import IdempotencyConflict, IdempotencyInProgress, idempotency_store
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Recomputed on replay
+_UNSTORED_HEADERS = {"content-length", "set-cookie"}
+
+
+def idempotent(view):
+    """Run a POST view once per Idempotency-Key header and replay its response for retries.
+
+    Requests without the header run as usual. Keys are scoped to the logged-in user
+    (or to anonymous callers as a group), so two users picking the same key never
+    see each other's responses. Reusing a key with a different body is a 422; a
+    duplicate that outlasts IDEMPOTENCY_WAIT while the first is running gets a 409.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if request.method != "POST" or not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"success": False, "error": f"{IDEMPOTENCY_HEADER} must be at most 255 characters"}), 400
+
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        live = {}
+
+        def execute():
+            response = live["response"] = current_app.make_response(view(*args, **kwargs))
+            return {
+                "status": response.status_code,
+                "body": response.get_data(),
+                "headers": [[name, value] for name, value in response.headers
+                            if name.lower() not in _UNSTORED_HEADERS],
+            }
+
+        try:
+            session = g.get("session")
+            caller = session.get("email") if session else "anonymous"
+            stored, replayed = idempotency_store.run(f"{caller}|{request.path}|{key}", fingerprint, execute)
+        except IdempotencyConflict:
+            return jsonify({"success": False,
+                            "error": f"{IDEMPOTENCY_HEADER} was already used with a different request"}), 422
+        except IdempotencyInProgress:
+            resp = jsonify({"success": False, "error": "A request with this Idempotency-Key is still in progress"})
+            resp.headers["Retry-After"] = "1"
+            return resp, 409
+
+        if not replayed:
+            return live["response"]
+        response = make_response(stored["body"], stored["status"])
+        response.headers.clear()
+        for name, value in stored["headers"]:
+            response.headers.add(name, value)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+    return wrapper
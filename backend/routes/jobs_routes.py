@@ -0,0 +1,19 @@
+from flask import Blueprint, request
+from serialization import jsonify
+from services.jobs import get_job, list_jobs, job_progress
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """Progress of a background purge job"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    return jsonify({"success": True, **job_progress(job)}), 200
+
+@jobs_bp.route("/jobs", methods=["GET"])
+def get_jobs():
+    status = request.args.get('status')
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify({"success": True, "jobs": [job_progress(job) for job in list_jobs(status, limit)]}), 200
@@ -0,0 +1,35 @@
+from flask import Blueprint, request
+from serialization import jsonify
+from services.search import search_updates, search_tasks, parse_date_range
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route("/search", methods=["GET"])
+def search():
+    """Full-text search over updates or tasks with employee/date filters and pagination"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"success": False, "error": "Query parameter 'q' is required"}), 400
+
+    search_type = request.args.get('type', 'updates')
+    if search_type not in ("updates", "tasks"):
+        return jsonify({"success": False, "error": "type must be 'updates' or 'tasks'"}), 400
+
+    try:
+        date_range = parse_date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({"success": False, "error": "from/to must be ISO dates"}), 400
+
+    try:
+        search_fn = search_updates if search_type == "updates" else search_tasks
+        result = search_fn(
+            query,
+            employee=request.args.get('employee'),
+            date_range=date_range,
+            page=request.args.get('page', 1, type=int),
+            page_size=request.args.get('page_size', 20, type=int),
+        )
+        return jsonify({"success": True, "type": search_type, **result}), 200
+    except Exception as e:
+        print(f"Search error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
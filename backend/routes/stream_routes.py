@@ -0,0 +1,47 @@
+from flask import Blueprint, Response, g, request, stream_with_context
+from serialization import jsonify
+from services.cache import find_user_by_email
+from services.push import PUSH_MAX_STREAM_SECONDS, PushHubFull, push_hub, parse_event_id
+
+stream_bp = Blueprint('stream', __name__)
+
+@stream_bp.route("/stream", methods=["GET"])
+def stream():
+    """Server-sent events with new employee updates and task changes for the logged-in manager.
+
+    Each open stream holds a worker thread here, so this route only takes PUSH_MAX_CONNECTIONS
+    at a time; deployments with many managers point EventSource at push_server.py instead.
+    """
+    # EventSource can't set headers, so the token usually arrives as ?access_token=
+    session = g.get("session")
+    if not session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+    user = find_user_by_email(session.get("email"))
+    if not user or user.get("role") != "manager":
+        return jsonify({"success": False, "error": "Only managers can subscribe to team events"}), 403
+
+    # Browsers send Last-Event-ID on reconnect; the query parameter lets a fresh page resume too
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    if last_event_id:
+        try:
+            parse_event_id(last_event_id)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        frames = push_hub.stream(user.get("username"), last_event_id)
+    except PushHubFull:
+        response = jsonify({"success": False, "error": "Too many open event streams, retry shortly"})
+        # Streams rotate every PUSH_MAX_STREAM_SECONDS, so a slot frees up within that
+        response.headers["Retry-After"] = str(int(min(PUSH_MAX_STREAM_SECONDS, 30)))
+        return response, 503
+
+    response = Response(stream_with_context(frames), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@stream_bp.route("/stream/status", methods=["GET"])
+def stream_status():
+    return jsonify({"success": True, **push_hub.status()}), 200
@@ -1,11 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
+from serialization import jsonify
 from models.task import Task
 from models.user import User
-from db import tasks_collection
+from db import tasks_collection, INDEXES
+from routes.conditional import collection_version, compute_etag, conditional_json
+from routes.fields import parse_fields
+from routes.idempotency import idempotent
+from services.query_planner import plan_query
+from services.search import parse_date_range
+from services import tasks as task_service
 
 tasks_bp = Blueprint('tasks', __name__)
 
 @tasks_bp.route("/submit-task", methods=["POST"])
+@idempotent
 def submit_task():
     data = request.json
     required_fields = ["employee_username", "title", "description"]
@@ -25,18 +33,95 @@ def submit_task():
         data.get("priority", "medium")
     )
     
-    Task.create_task(task.to_dict())
+    task_service.create_task(task.to_doc())
     return jsonify({"message": "Task submitted successfully"}), 201
 
 @tasks_bp.route("/tasks", methods=["GET"])
 def get_all_tasks():
-    tasks = Task.get_all_tasks()
-    return jsonify(tasks), 200
+    try:
+        projection = parse_fields(request.args.get('fields'), Task.FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = compute_etag("tasks", projection, *collection_version(tasks_collection, {}, "updated_at"))
+    return conditional_json(etag, lambda: Task.get_all_tasks(projection))
 
 @tasks_bp.route("/tasks/<username>", methods=["GET"])
 def get_user_tasks(username):
-    tasks = Task.get_tasks_by_user(username)
-    return jsonify(tasks), 200
+    try:
+        projection = parse_fields(request.args.get('fields'), Task.FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = compute_etag("tasks", username, projection,
+                        *collection_version(tasks_collection, {"employee_username": username}, "updated_at"))
+    return conditional_json(etag, lambda: Task.get_tasks_by_user(username, projection))
+
+# query parameter -> task field for equality filters
+QUERY_EQUALITY_FILTERS = {
+    "status": "status",
+    "priority": "priority",
+    "employee": "employee_username",
+    "manager": "assigned_manager",
+}
+# query parameter prefix -> task field for range filters (<prefix>_from / <prefix>_to)
+QUERY_RANGE_FILTERS = {
+    "created": "created_at",
+    "due": "due_date",
+}
+QUERY_SORT_FIELDS = ("created_at", "updated_at", "due_date")
+MAX_PAGE_SIZE = 100
+
+@tasks_bp.route("/query-tasks", methods=["GET"])
+def query_tasks():
+    """Combine task filters with sort/pagination, using the index the planner picks"""
+    query = {}
+    for param, field in QUERY_EQUALITY_FILTERS.items():
+        value = request.args.get(param)
+        if value:
+            values = [v.strip() for v in value.split(",") if v.strip()]
+            query[field] = values[0] if len(values) == 1 else {"$in": values}
+
+    try:
+        for prefix, field in QUERY_RANGE_FILTERS.items():
+            date_range = parse_date_range(request.args.get(f"{prefix}_from"), request.args.get(f"{prefix}_to"))
+            if date_range:
+                query[field] = date_range
+        projection = parse_fields(request.args.get('fields'), Task.FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    sort_param = request.args.get('sort', '-created_at')
+    sort_field = sort_param.lstrip('-')
+    if sort_field not in QUERY_SORT_FIELDS:
+        return jsonify({"error": f"sort must be one of {', '.join(QUERY_SORT_FIELDS)}"}), 400
+    sort = [(sort_field, -1 if sort_param.startswith('-') else 1)]
+
+    task_indexes = [(keys, options) for collection, keys, options in INDEXES if collection == "tasks"]
+    plan = plan_query(task_indexes,
+                      equality=[f for f in QUERY_EQUALITY_FILTERS.values() if f in query],
+                      ranges=[f for f in QUERY_RANGE_FILTERS.values() if f in query],
+                      sort_field=sort_field)
+    strict = request.args.get('strict', '').lower() in ("1", "true", "yes")
+    if plan.scans_everything and strict:
+        return jsonify({"error": "Filter combination is not backed by an index", "plan": plan.to_dict()}), 400
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = min(max(request.args.get('page_size', 20, type=int), 1), MAX_PAGE_SIZE)
+    tasks, total = Task.query_tasks(query, sort, skip=(page - 1) * page_size, limit=page_size,
+                                    projection=projection, hint=plan.index_name)
+
+    response = jsonify({
+        "tasks": tasks,
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "has_more": page * page_size < total,
+        "plan": plan.to_dict(),
+    })
+    if plan.warnings:
+        response.headers["X-Query-Plan-Warning"] = "; ".join(plan.warnings)
+    return response, 200
 
 @tasks_bp.route("/tasks/<task_id>/status", methods=["PUT"])
 def update_task_status(task_id):
@@ -46,8 +131,9 @@ def update_task_status(task_id):
     
     from bson import ObjectId
     try:
-        result = Task.update_task_status(ObjectId(task_id), data["status"])
-        if result.modified_count:
+        # None when the task doesn't exist or already has this status
+        previous = task_service.update_task_status(ObjectId(task_id), data["status"])
+        if previous:
             return jsonify({"message": "Task status updated"}), 200
         else:
             return jsonify({"error": "Task not found"}), 404
@@ -1,22 +1,72 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request
+from serialization import jsonify
 from db import updates_collection
+from services.digests import digest_worker
+from services.extraction import extraction_worker
+from services.vector_index import index_sync_worker
+from services.archive import cold_archive, project
+from services.search import in_range, parse_date_range
+from routes.conditional import collection_version, compute_etag, conditional_json
+from routes.fields import parse_fields
+from routes.idempotency import idempotent
 from datetime import datetime
 
 updates_bp = Blueprint('updates', __name__)
 
+UPDATE_FIELDS = ("employee_username", "employee_name", "content", "update_text", "timestamp",
+                 "tasks_worked_on", "progress", "blockers", "plans", "extracted")
+
 @updates_bp.route("/submit-update", methods=["POST"])
+@idempotent
 def submit_update():
     data = request.json
     if not data.get("employee_name") or not data.get("update_text"):
         return jsonify({"error": "Missing fields"}), 400
 
-    # Add timestamp
+    # The submitter's identity comes from the login session; employee_name is just what the client typed
+    session = g.get("session")
+    data["employee_username"] = session.get("username") if session else None
+
+    # Add timestamp; updated_at moves on every later write (extraction, merges) for ETags
     data["timestamp"] = datetime.utcnow()
+    data["updated_at"] = data["timestamp"]
+    data["extraction_status"] = "pending"
     
     updates_collection.insert_one(data)
+    digest_worker.notify_update(data)
+    extraction_worker.notify()
+    index_sync_worker.notify()
     return jsonify({"message": "Update saved successfully!"}), 201
 
 @updates_bp.route("/get-updates", methods=["GET"])
 def get_updates():
-    updates = list(updates_collection.find({}, {"_id": 0}).sort("timestamp", -1))
-    return jsonify(updates), 200
\ No newline at end of file
+    try:
+        projection = parse_fields(request.args.get('fields'), UPDATE_FIELDS) or {"_id": 0}
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        date_range = parse_date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO dates"}), 400
+
+    query = {}
+    if date_range:
+        query["timestamp"] = date_range
+    date_from = date_range.get("$gte")
+    # Archived updates are only read when the requested range starts before the newest archived one
+    archived_newest = cold_archive.newest("updates")
+    use_archive = bool(date_from and archived_newest and date_from <= archived_newest)
+
+    def build():
+        updates = list(updates_collection.find(query, projection).sort("timestamp", -1))
+        if use_archive:
+            archived = [u for u in cold_archive.find("updates", since=date_from, limit=None)
+                        if in_range(u["timestamp"], date_range)]
+            updates += [project(u, projection) for u in archived]
+        return updates
+
+    etag = compute_etag("updates", projection, sorted(date_range.items()),
+                        cold_archive.version("updates") if use_archive else None,
+                        *collection_version(updates_collection, query, "updated_at"))
+    return conditional_json(etag, build)
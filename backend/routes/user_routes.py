@@ -1,9 +1,12 @@
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request
+from serialization import jsonify
 from models.user import User
 from db import users_collection, db
+from services.cache import find_user_by_email, user_cache
+from services.jobs import purge_user_job
+from services.sessions import bearer_token, create_session, end_session
 import hashlib
-import time
 from datetime import datetime
 
 users_bp = Blueprint('users', __name__)
@@ -44,7 +47,8 @@ def login():
             "role": user_data["role"]
         }
 
-        token = hashlib.sha256(f"{email}{time.time()}".encode()).hexdigest()
+        # The session binds this user's later requests to their organization's database
+        token = create_session(user_data)
         print(f"Login successful for: {email}")
 
         # ✅ Set credentials + origin explicitly in response
@@ -63,6 +67,14 @@ def login():
         return jsonify({"success": False, "error": "An error occurred during login"}), 500
 
 
+@users_bp.route("/logout", methods=["POST"])
+def logout():
+    token = bearer_token(request)
+    if token:
+        end_session(token)
+    return jsonify({"success": True, "message": "Logged out"}), 200
+
+
 @users_bp.route("/register", methods=["POST"])
 def register():
     try:
@@ -84,17 +96,15 @@ def register():
         if users_collection.find_one({"username": data['username']}):
             return jsonify({"success": False, "error": "Username already taken"}), 409
 
-        password_hash = hashlib.sha256(data['password'].encode()).hexdigest()
-        user_data = {
-            "username": data['username'],
-            "password_hash": password_hash,
-            "full_name": data['full_name'],
-            "email": data['email'],
-            "role": data['role'],
-            "created_at": datetime.utcnow()
-        }
+        # New users join the organization of whoever registers them; self-registration has none
+        session = g.get("session")
+        organization = session.get("organization") if session else None
+        if data.get('organization') and data['organization'] != organization:
+            return jsonify({"success": False, "error": "Users can only be registered into your own organization"}), 403
 
-        result = users_collection.insert_one(user_data)
+        user = User(data['username'], data['email'], data['role'], data['full_name'], password=data['password'],
+                    organization=organization)
+        result = users_collection.insert_one(user.to_doc())
         if result.inserted_id:
             resp = jsonify({"success": True, "message": "User registered successfully"})
             resp.headers.add("Access-Control-Allow-Origin", "https://rise-ai-frontend.onrender.com")
@@ -110,6 +120,42 @@ def register():
         return jsonify({"success": False, "error": "An error occurred during registration"}), 500
 
 
+@users_bp.route("/<username>", methods=["DELETE"])
+def delete_user(username):
+    """Delete a user; their tasks, updates and chat history are purged by a background job.
+
+    Managers and admins can delete users in their own organization; anyone else only their own account.
+    """
+    session = g.get("session")
+    if not session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+    try:
+        if session.get("username") != username:
+            caller = find_user_by_email(session.get("email"))
+            if not caller or caller.get("role") not in ("manager", "admin"):
+                return jsonify({"success": False, "error": "Only managers can delete other users"}), 403
+            target = users_collection.find_one({"username": username}, {"organization": 1})
+            if target and target.get("organization") != session.get("organization"):
+                return jsonify({"success": False, "error": "Only managers can delete other users"}), 403
+
+        user_data = User.delete_user(username)
+        if not user_data:
+            return jsonify({"success": False, "error": "User not found"}), 404
+
+        job = purge_user_job(username, user_data.get("email"), user_data.get("full_name"))
+        email = user_data.get("email")
+        if email:
+            user_cache.invalidate(email)
+        return jsonify({
+            "success": True,
+            "message": f"User {username} deleted; their data is being purged",
+            "job_id": str(job["_id"])
+        }), 202
+    except Exception as e:
+        print(f"Delete user error: {str(e)}")
+        return jsonify({"success": False, "error": "An error occurred while deleting the user"}), 500
+
+
 # 🔧 Test routes (optional — can be removed in production)
 @users_bp.route("/test-password/<username>/<password>", methods=["GET"])
 def test_password(username, password):
@@ -0,0 +1,75 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask import current_app
+from flask.json import JSONEncoder
+
+
+# orjson is several times faster than the stdlib encoder; fall back if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """Encode the BSON/Python types that show up in Mongo documents"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, datetime):
+        # Stored datetimes are naive UTC; say so, like orjson's OPT_NAIVE_UTC
+        return (obj if obj.tzinfo else obj.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    # models.base.Model, matched by shape: importing models pulls in db and a MongoDB connection
+    if callable(getattr(type(obj), "to_doc", None)):
+        return obj.to_doc()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class BSONJSONEncoder(JSONEncoder):
+    """Encoder for Flask's own jsonify (e.g. views returning a dict)"""
+
+    def default(self, obj):
+        try:
+            return _default(obj)
+        except TypeError:
+            return super().default(obj)
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def jsonify(*args, **kwargs):
+    """Drop-in replacement for flask.jsonify that understands ObjectId, datetime and Decimal128"""
+    if args and kwargs:
+        raise TypeError("jsonify() behavior undefined when passed both args and kwargs")
+    if len(args) == 1:
+        data = args[0]
+    else:
+        data = args or kwargs
+    return current_app.response_class(dumps(data) + b"\n", mimetype="application/json")
+
+
+def init_json(app):
+    if hasattr(app, "json_provider_class"):
+        # Flask >= 2.2 replaced json_encoder with JSON providers
+        from flask.json.provider import DefaultJSONProvider
+
+        class BSONJSONProvider(DefaultJSONProvider):
+            def dumps(self, obj, **kwargs):
+                return dumps(obj).decode("utf-8")
+
+        app.json = BSONJSONProvider(app)
+    else:
+        app.json_encoder = BSONJSONEncoder
@@ -0,0 +1,184 @@
+# admission.py
+
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when an LLM call is shed; retry_after is in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"LLM call rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Per-user token buckets plus a global LLM concurrency cap with a bounded wait queue.
+
+    State lives in a small SQLite file so every gunicorn worker on the host shares the
+    same buckets, slots and queue. Slots and waiters carry an expiry, so entries left
+    behind by a killed worker free themselves.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("ADMISSION_DB_PATH", os.path.join(tempfile.gettempdir(), "rise_ai_admission.sqlite3"))
+        self.rate_per_minute = float(os.getenv("LLM_RATE_PER_MINUTE", "10"))
+        self.burst = float(os.getenv("LLM_BURST", "5"))
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.max_queue = int(os.getenv("LLM_MAX_QUEUE", "16"))
+        self.queue_timeout = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))
+        self.slot_lease = float(os.getenv("LLM_SLOT_LEASE", "60"))
+        # "degrade" answers with the rule-based responder, "reject" returns 429
+        self.overflow_mode = os.getenv("LLM_OVERFLOW", "degrade")
+        self._initialized = False
+
+    # --- storage -------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL);
+                CREATE TABLE IF NOT EXISTS slots (id INTEGER PRIMARY KEY AUTOINCREMENT, pid INTEGER, expires REAL);
+                CREATE TABLE IF NOT EXISTS waiters (id INTEGER PRIMARY KEY AUTOINCREMENT, pid INTEGER, expires REAL);
+                CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER);
+            """)
+            self._initialized = True
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _incr(conn, name: str, amount: int = 1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def record(self, name: str, amount: int = 1):
+        with self._transaction() as conn:
+            self._incr(conn, name, amount)
+
+    # --- per-user token bucket -----------------------------------------------
+
+    def try_consume(self, user_key: str) -> float:
+        """Take one token from the user's bucket. Returns 0 on success, else seconds until a token is available."""
+        refill_per_second = self.rate_per_minute / 60.0
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (user_key,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + (now - row[1]) * refill_per_second)
+            if tokens >= 1:
+                conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                             (user_key, tokens - 1, now))
+                return 0.0
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (user_key, tokens, now))
+            self._incr(conn, "shed_rate_limited")
+            return (1 - tokens) / refill_per_second if refill_per_second > 0 else 60.0
+
+    # --- global concurrency --------------------------------------------------
+
+    def _try_take_slot(self, conn, waiter_id: Optional[int]) -> Optional[int]:
+        now = time.time()
+        conn.execute("DELETE FROM slots WHERE expires < ?", (now,))
+        conn.execute("DELETE FROM waiters WHERE expires < ?", (now,))
+        active = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+        free = self.max_concurrency - active
+        if free <= 0:
+            return None
+        if waiter_id is not None:
+            # FIFO: only the oldest `free` waiters may take a slot
+            ahead = conn.execute("SELECT COUNT(*) FROM waiters WHERE id < ?", (waiter_id,)).fetchone()[0]
+            if ahead >= free:
+                return None
+            conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+        elif conn.execute("SELECT COUNT(*) FROM waiters").fetchone()[0] >= free:
+            return None
+        cursor = conn.execute("INSERT INTO slots (pid, expires) VALUES (?, ?)", (os.getpid(), now + self.slot_lease))
+        self._incr(conn, "admitted")
+        return cursor.lastrowid
+
+    def _acquire_slot(self) -> int:
+        with self._transaction() as conn:
+            slot_id = self._try_take_slot(conn, None)
+            if slot_id is not None:
+                return slot_id
+            depth = conn.execute("SELECT COUNT(*) FROM waiters").fetchone()[0]
+            waiter_id = None
+            if depth >= self.max_queue:
+                self._incr(conn, "shed_overloaded")
+            else:
+                waiter_id = conn.execute("INSERT INTO waiters (pid, expires) VALUES (?, ?)",
+                                         (os.getpid(), time.time() + self.queue_timeout + 1)).lastrowid
+        if waiter_id is None:
+            raise AdmissionRejected("overloaded", self.queue_timeout)
+
+        deadline = time.monotonic() + self.queue_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            with self._transaction() as conn:
+                slot_id = self._try_take_slot(conn, waiter_id)
+                if slot_id is not None:
+                    return slot_id
+
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+            self._incr(conn, "shed_queue_timeout")
+        raise AdmissionRejected("queue timeout", self.queue_timeout)
+
+    def _release_slot(self, slot_id: int):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM slots WHERE id = ?", (slot_id,))
+
+    @contextmanager
+    def admit(self, user_key: str):
+        """Rate-limit the user, then hold one global LLM slot for the duration of the block"""
+        retry_after = self.try_consume(user_key)
+        if retry_after:
+            raise AdmissionRejected("rate limited", retry_after)
+        slot_id = self._acquire_slot()
+        try:
+            yield
+        finally:
+            self._release_slot(slot_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        try:
+            conn = self._connect()
+            try:
+                now = time.time()
+                counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+                return {
+                    "active_llm_calls": conn.execute("SELECT COUNT(*) FROM slots WHERE expires >= ?", (now,)).fetchone()[0],
+                    "queue_depth": conn.execute("SELECT COUNT(*) FROM waiters WHERE expires >= ?", (now,)).fetchone()[0],
+                    "max_concurrency": self.max_concurrency,
+                    "max_queue": self.max_queue,
+                    "overflow_mode": self.overflow_mode,
+                    **counters,
+                }
+            finally:
+                conn.close()
+        except Exception as e:
+            return {"error": str(e)}
+
+
+admission = AdmissionController()
@@ -2,10 +2,25 @@
 
 import os
 import re
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from db import users_collection, chat_history_collection, tasks_collection, updates_collection
+from db import users_collection, chat_history_collection, updates_collection
+from models.task import Task
+from services.admission import admission, AdmissionRejected
+from services.cache import find_user_by_email
+from services.singleflight import llm_flight
+from services.resilience import CircuitOpenError, call_with_deadline
+from services.model_router import MODEL_TIERS, model_router
+from services.vector_index import current_update_index, index_sync_worker
+from services.search import parse_date
+from services.digests import digest_worker, get_digest, refresh_digest, render_digest
+from services.extraction import extraction_worker, open_blockers
+from services.dedup import DEDUP_MODE, NearDuplicateDetector
+from services.jobs import clear_chat_job
+from services.archive import cold_archive, project
+from services.usage import TurnUsage, record_turn
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,6 +31,45 @@ print(f"🟩 DEBUG: MONGODB_URI = {os.getenv('MONGODB_URI')}")
 print(f"🟩 DEBUG: GEMINI_API_KEY = {os.getenv('GEMINI_API_KEY')}")
 print(f"🟩 DEBUG: PORT = {os.getenv('PORT', '10000')}")
 
+# Gemini call limits: per-call deadline and optional hedged retry after the model's rolling p95
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# "Any open blockers?" style questions, answered from extracted fields; "who is blocked on X" stays a search
+OPEN_BLOCKERS_RE = re.compile(
+    r"\b(open|all|any|current|team|active|outstanding)\s+blockers\b"
+    r"|\b(who(?:'s| is| are)|anyone|anybody)\s+(?:currently\s+|still\s+)?(?:blocked|stuck)\s*\??$"
+)
+
+# Catches employees resending (almost) the same daily update
+update_dedup = NearDuplicateDetector(updates_collection)
+
+# Fields returned by get_chat_history (and selectable with ?fields=)
+CHAT_HISTORY_FIELDS = ("username", "user_message", "ai_response", "timestamp")
+TASK_SUMMARY_FIELDS = {"employee_username": 1, "title": 1, "status": 1}
+
+def encode_chat_cursor(turn: Dict[str, Any]) -> str:
+    return f"{turn['timestamp'].isoformat()}~{turn['_id']}"
+
+
+def decode_chat_cursor(value: str, collection, username: str):
+    """Accept our timestamp~id cursor, a bare chat turn ObjectId, or an ISO timestamp"""
+    from bson import ObjectId
+    if "~" in value:
+        timestamp, _, oid = value.partition("~")
+        if not ObjectId.is_valid(oid):
+            raise ValueError(f"Invalid chat cursor: {value}")
+        return parse_date(timestamp), ObjectId(oid)
+    if ObjectId.is_valid(value):
+        turn = collection.find_one({"_id": ObjectId(value), "username": username}, {"timestamp": 1})
+        if not turn:
+            raise ValueError(f"Unknown chat turn id: {value}")
+        return turn["timestamp"], turn["_id"]
+    # A bare timestamp sorts before every id at that instant
+    return parse_date(value), ObjectId(b"\x00" * 12)
+
+
 class AIAgent:
     """AI Agent powered by Google Generative AI (Gemini 1.5)"""
     
@@ -38,48 +92,29 @@ class AIAgent:
                 model_names = [m.name for m in available_models]
                 print(f"📋 Available models: {model_names}")
                 
-                # Preferred models (Gemini 1.5 line)
-                preferred_models = [
-                    "gemini-1.5-pro-latest",
-                    "gemini-1.5-pro",
-                    "gemini-1.5-flash-latest",
-                    "gemini-1.5-flash"
-                ]
+                # Keep one model per tier (Flash for quick replies, Pro for reasoning)
+                model_router.clear()
+                for tier, preferred_models in MODEL_TIERS.items():
+                    chosen_model = None
+                    for model_name in preferred_models:
+                        full_name = f"models/{model_name}"
+                        if full_name in model_names:
+                            # Double-check it supports generateContent
+                            model_info = next((m for m in available_models if m.name == full_name), None)
+                            if model_info and "generateContent" in model_info.supported_generation_methods:
+                                chosen_model = full_name
+                                break
+                    if chosen_model:
+                        print(f"✅ Using model for {tier} requests: {chosen_model}")
+                        model_router.register(tier, self._build_model(genai, chosen_model))
                 
-                # Find first available model that supports text generation
-                chosen_model = None
-                for model_name in preferred_models:
-                    full_name = f"models/{model_name}"
-                    if full_name in model_names:
-                        # Double-check it supports generateContent
-                        model_info = next((m for m in available_models if m.name == full_name), None)
-                        if model_info and "generateContent" in model_info.supported_generation_methods:
-                            chosen_model = full_name
-                            break
-                
-                if not chosen_model:
+                if not model_router.tiers:
                     print("⚠️ No compatible Gemini model found.")
                     self.use_simulation = True
                     return
                 
-                print(f"✅ Using model: {chosen_model}")
-                
-                # Initialize the model
-                self.model = genai.GenerativeModel(
-                    model_name=chosen_model,
-                    generation_config={
-                        "temperature": 0.7,
-                        "top_p": 0.95,
-                        "top_k": 40,
-                        "max_output_tokens": 1024,
-                    },
-                    safety_settings={
-                        "HARM_CATEGORY_HARASSMENT": "BLOCK_MEDIUM_AND_ABOVE",
-                        "HARM_CATEGORY_HATE_SPEECH": "BLOCK_MEDIUM_AND_ABOVE",
-                        "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_MEDIUM_AND_ABOVE",
-                        "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_MEDIUM_AND_ABOVE",
-                    }
-                )
+                # Default model for callers that don't go through the router
+                self.model = (model_router.tiers.get("large") or model_router.tiers["fast"]).model
                 
                 # Test the model
                 print("🧪 Testing model with simple prompt...")
@@ -99,12 +134,32 @@ class AIAgent:
         else:
             print("⚠️ No Gemini API key found, using simulation mode")
 
+    @staticmethod
+    def _build_model(genai, model_name: str):
+        return genai.GenerativeModel(
+            model_name=model_name,
+            generation_config={
+                "temperature": 0.7,
+                "top_p": 0.95,
+                "top_k": 40,
+                "max_output_tokens": 1024,
+            },
+            safety_settings={
+                "HARM_CATEGORY_HARASSMENT": "BLOCK_MEDIUM_AND_ABOVE",
+                "HARM_CATEGORY_HATE_SPEECH": "BLOCK_MEDIUM_AND_ABOVE",
+                "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_MEDIUM_AND_ABOVE",
+                "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_MEDIUM_AND_ABOVE",
+            }
+        )
+
     def process_message(self, message: str, email: str) -> str:
         """Process a user message and return an AI response"""
         try:
             print(f"Processing message from {email}: {message}")
+            usage = TurnUsage()
             
-            user = users_collection.find_one({"email": email})
+            with usage.timed("db"):
+                user = find_user_by_email(email)
             if not user:
                 return "I couldn't find your user account. Please try logging out and back in."
             
@@ -128,25 +183,46 @@ class AIAgent:
                 has_update_content = any(keyword in message_lower for keyword in update_keywords)
                 is_long_enough = len(message.strip()) > 20
 
+                duplicate = None
+                if has_update_content and is_long_enough and DEDUP_MODE != "off":
+                    try:
+                        with usage.timed("db"):
+                            duplicate = update_dedup.check(username, message.strip())
+                    except Exception as e:
+                        print(f"⚠️ Duplicate check failed: {e}")
+
+                if duplicate:
+                    usage.handler = "duplicate_update"
+                    with usage.timed("persist"):
+                        response = self._handle_duplicate_update(duplicate, message.strip(), username, user_name)
+                    return self._save_turn(chat_entry, response, usage, user_role)
+
                 if has_update_content and is_long_enough:
+                    submitted_at = datetime.utcnow()
                     update_entry = {
                         "employee_username": username,
                         "employee_name": user_name,
                         "content": message.strip(),
-                        "timestamp": datetime.utcnow()
+                        "timestamp": submitted_at,
+                        "updated_at": submitted_at,
+                        "extraction_status": "pending"
                     }
+                    usage.handler = "daily_update"
                     try:
-                        updates_collection.insert_one(update_entry)
-                        print(f"✅ Daily update saved for {username}")
+                        with usage.timed("persist"):
+                            result = updates_collection.insert_one(update_entry)
+                            print(f"✅ Daily update saved for {username}")
+                            update_dedup.remember(username, result.inserted_id, update_entry["content"], update_entry["timestamp"])
+                        digest_worker.notify_update(update_entry)
+                        extraction_worker.notify()
+                        index_sync_worker.notify()
                         
                         success_msg = (
                             f"Got it, {user_name}! ✅\n\n"
                             "Your daily update has been successfully submitted.\n"
                             "Your manager will be able to view it in the updates section."
                         )
-                        chat_entry["ai_response"] = success_msg
-                        chat_history_collection.insert_one(chat_entry)
-                        return success_msg
+                        return self._save_turn(chat_entry, success_msg, usage, user_role)
 
                     except Exception as e:
                         print(f"❌ Error saving update to DB: {e}")
@@ -154,9 +230,7 @@ class AIAgent:
                             f"Thanks for sharing, {user_name}, but I couldn't submit your update right now. "
                             "Please try again later or use the app to submit it directly."
                         )
-                        chat_entry["ai_response"] = error_msg
-                        chat_history_collection.insert_one(chat_entry)
-                        return error_msg
+                        return self._save_turn(chat_entry, error_msg, usage, user_role)
 
             # === MANAGER: NATURAL LANGUAGE HANDLING ===
             if user_role == "manager":
@@ -169,12 +243,19 @@ class AIAgent:
                     "team status", "all updates", "employee reports"
                 ]
                 if any(trigger in message_lower for trigger in team_update_triggers):
-                    response = self._get_updates_summary(username, user_role)
-                    chat_entry["ai_response"] = response
-                    chat_history_collection.insert_one(chat_entry)
-                    return response
+                    usage.handler = "team_updates"
+                    with usage.timed("db"):
+                        response = self._get_updates_summary(username, user_role)
+                    return self._save_turn(chat_entry, response, usage, user_role)
+
+                if OPEN_BLOCKERS_RE.search(message_lower):
+                    usage.handler = "open_blockers"
+                    with usage.timed("db"):
+                        response = self._get_open_blockers(username)
+                    return self._save_turn(chat_entry, response, usage, user_role)
 
                 patterns = [
+                    r"what (?:is |was )?(\w+) (?:is |was |has been )?working on",
                     r"show me (\w+)'?s?\b",
                     r"updates? from (\w+)",
                     r"what did (\w+) (report|submit|work|do|update)",
@@ -185,7 +266,8 @@ class AIAgent:
                 reserved_keywords = {
                     "recent", "latest", "all", "team", "employee", "employees",
                     "any", "the", "my", "our", "this", "that", "new", "daily",
-                    "status", "report", "update", "progress"
+                    "status", "report", "update", "progress", "what", "who", "anyone",
+                    "anybody", "everyone", "someone"
                 }
                 
                 for pattern in patterns:
@@ -194,17 +276,35 @@ class AIAgent:
                         employee_name = match.group(1).lower()
                         if employee_name in reserved_keywords:
                             continue
-                        response = self._get_employee_updates(username, employee_name)
-                        chat_entry["ai_response"] = response
-                        chat_history_collection.insert_one(chat_entry)
-                        return response
+                        usage.handler = "employee_updates"
+                        with usage.timed("db"):
+                            response = self._get_employee_updates(username, employee_name)
+                        return self._save_turn(chat_entry, response, usage, user_role)
+
+                # Questions about work rather than a named employee go to the vector index; checked
+                # after the per-employee patterns so "what bob is working on" still summarizes bob
+                semantic_triggers = [
+                    "who is", "who's", "who are", "anyone", "anybody", "blocked on",
+                    "stuck on", "working on", "search updates", "find updates", "mentioned"
+                ]
+                if any(trigger in message_lower for trigger in semantic_triggers):
+                    usage.handler = "search_updates"
+                    with usage.timed("db"):
+                        response = self._search_updates(message)
+                    return self._save_turn(chat_entry, response, usage, user_role)
 
             # === REGULAR AI RESPONSE GENERATION ===
-            if self.use_simulation:
-                response = self._generate_rule_based_response(message, user_role, user_name, username)
+            # An open circuit means Gemini is failing: answer like simulation mode until a probe succeeds
+            if self.use_simulation or model_router.all_open():
+                usage.handler = "simulation" if self.use_simulation else "circuit_open"
+                with usage.timed("db"):
+                    response = self._generate_rule_based_response(message, user_role, user_name, username)
             else:
                 if message.lower().startswith("/"):
-                    response = self._process_command(message.lower(), username, user_role)
+                    usage.branch = "command"
+                    usage.handler = message.lower().split()[0][1:] or None
+                    with usage.timed("db"):
+                        response = self._process_command(message.lower(), username, user_role)
                 else:
                     try:
                         system_prompt = """You are Rise AI, an assistant for a task management system.
@@ -224,26 +324,125 @@ Rules:
                             f"User message: {message}"
                         )
                         
-                        response = self.model.generate_content(contextual_message).text
+                        response = self._generate_llm_response(contextual_message, user_role, email, message, usage)
                         
                         # Safety check
                         if not response or len(response.strip()) == 0:
                             raise ValueError("Empty AI response")
                             
+                    except AdmissionRejected as e:
+                        if admission.overflow_mode == "reject":
+                            raise
+                        print(f"⚠️ Gemini call shed ({e.reason}), using rule-based response")
+                        admission.record("degraded")
+                        usage.branch, usage.handler = "rule_based", "llm_shed"
+                        with usage.timed("db"):
+                            response = self._generate_rule_based_response(message, user_role, user_name, username)
                     except Exception as e:
                         print(f"⚠️ Error with Gemini: {e}")
-                        response = self._generate_rule_based_response(message, user_role, user_name, username)
+                        usage.branch, usage.handler = "rule_based", "llm_fallback"
+                        with usage.timed("db"):
+                            response = self._generate_rule_based_response(message, user_role, user_name, username)
 
-            chat_entry["ai_response"] = response
-            chat_history_collection.insert_one(chat_entry)
-            return response
+            return self._save_turn(chat_entry, response, usage, user_role)
 
+        except AdmissionRejected:
+            raise
         except Exception as e:
             print(f"❌ Error in process_message: {e}")
             import traceback
             print(traceback.format_exc())
             return "I'm having trouble processing your request. Please try again later."
 
+    @staticmethod
+    def _save_turn(chat_entry: Dict[str, Any], response: str, usage: TurnUsage, role: str) -> str:
+        """Store the turn with its usage and fold it into the daily usage rollup"""
+        chat_entry["ai_response"] = response
+        chat_entry["usage"] = usage_doc = usage.to_doc()
+        started = time.perf_counter()
+        chat_history_collection.insert_one(chat_entry)
+        record_turn(chat_entry["username"], role, chat_entry["timestamp"], usage_doc,
+                    (time.perf_counter() - started) * 1000)
+        return response
+
+    def _handle_duplicate_update(self, duplicate: Dict[str, Any], content: str, username: str, user_name: str) -> str:
+        """Merge a resent update into the earlier one, or drop it in reject mode"""
+        timestamp = duplicate["timestamp"]
+        sent_at = timestamp.strftime("%Y-%m-%d %H:%M") if timestamp else "earlier"
+        print(f"♻️ Near-duplicate update from {username} ({duplicate['similarity']:.0%} similar to {duplicate['update_id']})")
+        if DEDUP_MODE == "reject":
+            return (f"Thanks, {user_name}! This looks like the update you already sent at {sent_at}, "
+                    "so I didn't save it again.")
+
+        from bson import ObjectId
+        now = datetime.utcnow()
+        # Keep the newest wording; the extraction worker re-reads it
+        updates_collection.update_one({"_id": ObjectId(duplicate["update_id"])}, {
+            "$set": {"content": content, "last_resent_at": now, "extraction_status": "pending", "updated_at": now},
+            "$inc": {"resend_count": 1},
+        })
+        update_dedup.remember(username, duplicate["update_id"], content, timestamp)
+        extraction_worker.notify()
+        # The digests and the search index still hold the old wording
+        digest_worker.notify_rewrite(username)
+        index_sync_worker.notify_rewrite(ObjectId(duplicate["update_id"]))
+        return (f"Got it, {user_name}! ✅\n\n"
+                f"This matches the update you sent at {sent_at}, so I've refreshed that update "
+                "with your latest wording instead of saving a duplicate.")
+
+    def _generate_llm_response(self, prompt: str, role: str, email: str, message: str,
+                               usage: Optional[TurnUsage] = None) -> str:
+        """Route to Flash or Pro behind admission control, failing over between them.
+
+        Identical in-flight prompts share one upstream call; callers that reuse it are
+        recorded as "cached" in usage and don't count its tokens.
+        """
+        tiers = model_router.candidates(message, role)
+        if not tiers:
+            raise CircuitOpenError("No Gemini model available")
+
+        def call_models():
+            with admission.admit(email):
+                last_error = None
+                for tier in tiers:
+                    if not tier.breaker.allow():
+                        last_error = CircuitOpenError(f"{tier.model_name} circuit is open")
+                        continue
+                    started = time.monotonic()
+                    hedge_after = None
+                    if LLM_HEDGE and len(tier.latency) >= LLM_HEDGE_MIN_SAMPLES:
+                        hedge_after = tier.latency.percentile(95)
+                    try:
+                        result = call_with_deadline(lambda: tier.model.generate_content(prompt),
+                                                    LLM_TIMEOUT, hedge_after=hedge_after)
+                        text = result.text
+                        if not text or not text.strip():
+                            raise ValueError("Empty AI response")
+                    except AdmissionRejected:
+                        # Shed locally, not a model failure
+                        raise
+                    except Exception as e:
+                        tier.record(False)
+                        print(f"⚠️ {tier.model_name} failed ({e}), trying next model")
+                        last_error = e
+                        continue
+                    tier.record(True, time.monotonic() - started)
+                    return text, tier.model_name, getattr(result, "usage_metadata", None)
+                raise last_error
+
+        key = llm_flight.make_key(prompt, role, tiers[0].model_name)
+        usage = usage or TurnUsage()
+        with usage.timed("llm"):
+            (text, model_name, usage_metadata), shared = llm_flight.do(key, call_models)
+        if shared:
+            print(f"♻️ Reused in-flight Gemini response for {email}")
+            usage.branch, usage.model = "cached", model_name
+        else:
+            usage.branch = "llm"
+            model = next((tier.model for tier in tiers if tier.model_name == model_name), None)
+            usage.record_llm(model_name, usage_metadata, prompt, text, model=model)
+        return text
+
     # Keep the rest of your methods unchanged
     def _process_command(self, command: str, username: str, role: str) -> str:
         if command.startswith("/tasks"):
@@ -274,6 +473,9 @@ Rules:
             actual_username = employee["username"]
             updates = list(updates_collection.find({"employee_username": actual_username})
                            .sort("timestamp", -1).limit(5))
+            if len(updates) < 5:
+                edge = (updates[-1]["timestamp"], updates[-1]["_id"]) if updates else None
+                updates += cold_archive.find("updates", actual_username, before=edge, limit=5 - len(updates))
             if not updates:
                 return f"{actual_username} hasn't submitted any updates yet."
 
@@ -288,10 +490,54 @@ Rules:
             print(f"Error fetching updates for {employee_username}: {e}")
             return f"Sorry, I couldn't retrieve updates for {employee_username} right now."
 
+    def _search_updates(self, query: str, k: int = 5) -> str:
+        try:
+            # The sync worker indexes new updates in the background; hits are re-read from MongoDB below
+            hits = current_update_index().search(query, k=k)
+            if not hits:
+                return "I couldn't find any updates related to that."
+
+            from bson import ObjectId
+            ids = [ObjectId(doc["id"]) for doc, _ in hits]
+            updates_by_id = {str(u["_id"]): u for u in updates_collection.find({"_id": {"$in": ids}})}
+
+            response = "Updates most relevant to your question:\n\n"
+            for doc, score in hits:
+                update = updates_by_id.get(doc["id"])
+                if not update:
+                    continue
+                emp = update.get("employee_username") or update.get("employee_name", "Unknown")
+                timestamp = update.get("timestamp")
+                date_str = timestamp.strftime("%Y-%m-%d %H:%M") if timestamp else "Unknown date"
+                content = update.get("content") or update.get("update_text", "No content")
+                response += f"**{emp}** ({date_str}, match {score:.0%}):\n{content}\n\n"
+            return response
+        except Exception as e:
+            print(f"Error in _search_updates: {e}")
+            return "I encountered an error while searching updates."
+
+    def _get_open_blockers(self, manager_username: str) -> str:
+        try:
+            blocked = open_blockers(manager_username)
+            if not blocked:
+                return "No open blockers reported by your team. 🎉"
+            response = "**Open blockers** reported by your team:\n\n"
+            for entry in blocked:
+                timestamp = entry.get("timestamp")
+                date_str = timestamp.strftime("%Y-%m-%d %H:%M") if timestamp else "Unknown date"
+                response += f"**{entry['employee_username']}** ({date_str}):\n"
+                for blocker in entry["blockers"]:
+                    response += f"- {blocker}\n"
+                response += "\n"
+            return response
+        except Exception as e:
+            print(f"Error in _get_open_blockers: {e}")
+            return "I encountered an error while looking up blockers."
+
     def _get_tasks_summary(self, username: str, role: str) -> str:
         try:
             if role == "manager":
-                tasks = list(tasks_collection.find({"assigned_manager": username}))
+                tasks = Task.find({"assigned_manager": username}, TASK_SUMMARY_FIELDS, sort=[("created_at", 1)])
                 if not tasks:
                     return "You haven't assigned any tasks yet."
                 tasks_by_employee = {}
@@ -309,7 +555,7 @@ Rules:
                     response += "\n"
                 return response
             else:
-                tasks = list(tasks_collection.find({"employee_username": username}))
+                tasks = Task.find({"employee_username": username}, TASK_SUMMARY_FIELDS, sort=[("created_at", 1)])
                 if not tasks:
                     return "You don't have any assigned tasks yet."
                 pending = [t for t in tasks if t.get("status") == "pending"]
@@ -338,6 +584,11 @@ Rules:
     def _get_updates_summary(self, username: str, role: str) -> str:
         try:
             if role == "manager":
+                try:
+                    digest = get_digest(username) or refresh_digest(username)
+                    return render_digest(digest)
+                except Exception as e:
+                    print(f"⚠️ Digest unavailable for {username}, querying updates directly: {e}")
                 updates = list(updates_collection.find().sort("timestamp", -1).limit(10))
                 if not updates:
                     return "There are no updates from your team yet."
@@ -352,6 +603,9 @@ Rules:
             else:
                 updates = list(updates_collection.find({"employee_username": username})
                                .sort("timestamp", -1).limit(5))
+                if len(updates) < 5:
+                    edge = (updates[-1]["timestamp"], updates[-1]["_id"]) if updates else None
+                    updates += cold_archive.find("updates", username, before=edge, limit=5 - len(updates))
                 if not updates:
                     return "You haven't submitted any updates yet."
                 response = "Your recent updates:\n\n"
@@ -380,6 +634,8 @@ You can also ask me:
 - "Show recent team updates"
 - "How is the team doing?"
 - "Status of David"
+- "Who is blocked on the payment integration?"
+- "Any open blockers?"
 """
         else:
             return "Employee Help:\n" + common_commands + """
@@ -437,26 +693,80 @@ You can also ask me:
 
         return f"Hi {name}, share what you worked on today."
 
-    def get_chat_history(self, username: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_chat_history(self, username: str, limit: int = 10,
+                         projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
         try:
+            if projection is None:
+                projection = {"_id": 0, **{field: 1 for field in CHAT_HISTORY_FIELDS}}
             history = list(
-                chat_history_collection.find(
-                    {"username": username},
-                    {"_id": 0, "username": 1, "user_message": 1, "ai_response": 1, "timestamp": 1}
-                ).sort("timestamp", -1).limit(limit)
+                chat_history_collection.find({"username": username}, projection)
+                .sort("timestamp", -1).limit(limit)
             )
-            for entry in history:
-                if "timestamp" in entry and isinstance(entry["timestamp"], datetime):
-                    entry["timestamp"] = entry["timestamp"].isoformat()
             return history
         except Exception as e:
             print(f"Error in get_chat_history: {e}")
             return []
 
-    def clear_chat_history(self, username: str) -> int:
-        try:
-            result = chat_history_collection.delete_many({"username": username})
-            return result.deleted_count
-        except Exception as e:
-            print(f"Error in clear_chat_history: {e}")
-            return 0
\ No newline at end of file
+    def get_chat_history_page(self, username: str, limit: int = 10, projection: Optional[Dict[str, int]] = None,
+                              since: Optional[str] = None, before: Optional[str] = None) -> Dict[str, Any]:
+        """Delta sync and backward paging over the (username, timestamp) index.
+
+        `since` returns turns newer than the watermark, oldest first; `before` returns
+        older turns, newest first; with neither it returns the latest turns like
+        get_chat_history. Raises ValueError for a malformed cursor.
+        """
+        if projection is None:
+            projection = {"_id": 0, **{field: 1 for field in CHAT_HISTORY_FIELDS}}
+        # The cursor needs _id and timestamp even when the caller didn't ask for them
+        query_projection = {k: v for k, v in projection.items() if k != "_id"}
+        query_projection.update({"_id": 1, "timestamp": 1})
+
+        criteria: Dict[str, Any] = {"username": username}
+        direction = 1 if since else -1
+        timestamp = oid = None
+        if since or before:
+            timestamp, oid = decode_chat_cursor(since or before, chat_history_collection, username)
+            op = "$gt" if since else "$lt"
+            # Turns sharing the cursor's timestamp are ordered by _id
+            criteria["$or"] = [{"timestamp": {op: timestamp}}, {"timestamp": timestamp, "_id": {op: oid}}]
+
+        turns = list(chat_history_collection.find(criteria, query_projection)
+                     .sort([("timestamp", direction), ("_id", direction)]).limit(limit + 1))
+
+        # Read through to the cold archive when the request reaches past the hot window
+        if since:
+            archived_newest = cold_archive.newest("chat_sessions")
+            if archived_newest and timestamp <= archived_newest:
+                older = [project(t, query_projection) for t in cold_archive.find(
+                    "chat_sessions", username, since=timestamp, limit=limit + 1, oldest_first=True)
+                    if (t["timestamp"], t["_id"]) > (timestamp, oid)]
+                hot_ids = {t["_id"] for t in turns}
+                turns = [t for t in older if t["_id"] not in hot_ids] + turns
+        elif len(turns) <= limit:
+            edge = (turns[-1]["timestamp"], turns[-1]["_id"]) if turns else ((timestamp, oid) if before else None)
+            turns += [project(t, query_projection) for t in cold_archive.find(
+                "chat_sessions", username, before=edge, limit=limit + 1 - len(turns))]
+        has_more = len(turns) > limit
+        turns = turns[:limit]
+
+        watermark, cursor = since, before
+        if turns:
+            newest, oldest = (turns[-1], turns[0]) if since else (turns[0], turns[-1])
+            if not before:
+                watermark = encode_chat_cursor(newest)
+            cursor = encode_chat_cursor(oldest)
+        for turn in turns:
+            for field in ("_id", "timestamp"):
+                if not projection.get(field):
+                    turn.pop(field, None)
+        return {
+            "history": turns,
+            # Nothing new keeps the client's watermark as is
+            "watermark": watermark,
+            "before": cursor,
+            "has_more": has_more,
+        }
+
+    def clear_chat_history(self, username: str) -> Dict[str, Any]:
+        """Queue a background purge of the user's chat turns and return the job"""
+        return clear_chat_job(username)
@@ -0,0 +1,288 @@
+# analytics.py
+
+import bisect
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from db import db, router, tasks_collection
+
+rollups_collection = db["task_rollups"]
+
+# Upper bounds (hours) of the cycle-time histogram buckets; the last bucket is open-ended
+CYCLE_BUCKETS_HOURS = (1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 504, 720, 1440, 2160)
+ANALYTICS_MAX_DAYS = int(os.getenv("ANALYTICS_MAX_DAYS", "731"))
+_BACKFILL_MARKER = "__backfill__"
+# A backfill whose lease lapses (process died or restarted) is picked up by another process
+ANALYTICS_BACKFILL_LEASE = float(os.getenv("ANALYTICS_BACKFILL_LEASE", "300"))
+
+
+def _day(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def _rollup_id(employee: str, day: datetime) -> str:
+    return f"{employee}|{day:%Y-%m-%d}"
+
+
+def cycle_bucket(hours: float) -> int:
+    return bisect.bisect_left(CYCLE_BUCKETS_HOURS, hours)
+
+
+def _cycle_hours(task: Dict[str, Any], completion_date: datetime) -> Optional[float]:
+    created_at = task.get("created_at")
+    if not isinstance(created_at, datetime):
+        return None
+    return max((completion_date - created_at).total_seconds() / 3600, 0.0)
+
+
+def _bump(employee: str, moment: datetime, inc: Dict[str, Any]):
+    day = _day(moment)
+    rollups_collection.update_one(
+        {"_id": _rollup_id(employee, day)},
+        {"$inc": inc, "$set": {"employee_username": employee, "day": day, "updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def _completion_inc(task: Dict[str, Any], completion_date: datetime, sign: int) -> Dict[str, Any]:
+    inc: Dict[str, Any] = {"completed": sign}
+    hours = _cycle_hours(task, completion_date)
+    if hours is not None:
+        inc[f"cycle_hist.{cycle_bucket(hours)}"] = sign
+        inc["cycle_count"] = sign
+        inc["cycle_hours_sum"] = sign * hours
+    return inc
+
+
+def _contributions(task: Optional[Dict[str, Any]]) -> List[tuple]:
+    """(employee, moment, counters) a task adds to the rollups: its creation, and its completion if completed"""
+    if not task or not task.get("employee_username"):
+        return []
+    employee = task["employee_username"]
+    created_at = task.get("created_at")
+    found = [(employee, created_at, {"created": 1})] if isinstance(created_at, datetime) else []
+    completion_date = task.get("completion_date")
+    if task.get("status") == "completed" and isinstance(completion_date, datetime):
+        found.append((employee, completion_date, _completion_inc(task, completion_date, 1)))
+    return found
+
+
+def record_change(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """Move a task's counts in the rollups from its old state to its new one.
+
+    before is None for a new task and after is None for a deleted one. Only the
+    parts that changed are written, so an edit to the title costs nothing.
+    """
+    old, new = _contributions(before), _contributions(after)
+    try:
+        for employee, moment, inc in old:
+            if (employee, moment, inc) not in new:
+                _bump(employee, moment, {field: -value for field, value in inc.items()})
+        for employee, moment, inc in new:
+            if (employee, moment, inc) not in old:
+                _bump(employee, moment, inc)
+    except Exception as e:
+        print(f"⚠️ Task rollup update failed: {e}")
+
+
+def pin_backfill_cutoff() -> datetime:
+    """The current database's backfill cutoff, fixed by whichever process asks first.
+
+    Every process calls this before it serves requests, so no incremental hook can
+    fire before the cutoff and be counted again by the backfill.
+    """
+    now = datetime.utcnow()
+    marker = rollups_collection.find_one_and_update(
+        {"_id": _BACKFILL_MARKER},
+        {"$setOnInsert": {"cutoff": now, "created_at": now}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return marker["cutoff"]
+
+
+def claim_backfill(owner: str) -> Optional[Dict[str, Any]]:
+    """Take the backfill lease for the current database; None if it's done or another process holds it"""
+    now = datetime.utcnow()
+    return rollups_collection.find_one_and_update(
+        {"_id": _BACKFILL_MARKER, "finished_at": {"$exists": False},
+         "$or": [{"lease_owner": {"$exists": False}}, {"lease_expires": {"$lt": now}}]},
+        {"$set": {"lease_owner": owner, "lease_expires": now + timedelta(seconds=ANALYTICS_BACKFILL_LEASE),
+                  "started_at": now}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _renew_backfill(owner: str) -> bool:
+    expires = datetime.utcnow() + timedelta(seconds=ANALYTICS_BACKFILL_LEASE)
+    result = rollups_collection.update_one({"_id": _BACKFILL_MARKER, "lease_owner": owner},
+                                           {"$set": {"lease_expires": expires}})
+    return result.matched_count == 1
+
+
+def rebuild_rollups(owner: Optional[str] = None) -> int:
+    """Fold tasks created/completed before the pinned cutoff into the rollups, once per database.
+
+    Everything after the cutoff is counted by the incremental hooks, so the two never
+    overlap; all writes are $inc, so hooks firing during the backfill aren't lost.
+    The run holds a lease on the marker; if the process dies another one takes over,
+    and rollup days it already folded in are flagged so they aren't added twice.
+    """
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    pin_backfill_cutoff()
+    marker = claim_backfill(owner)
+    if not marker:
+        return 0
+    cutoff = marker["cutoff"]
+
+    rollups: Dict[tuple, Dict[str, Any]] = {}
+
+    def add(employee, moment, inc):
+        counters = rollups.setdefault((employee, _day(moment)), {})
+        for field, value in inc.items():
+            counters[field] = counters.get(field, 0) + value
+
+    projection = {"employee_username": 1, "created_at": 1, "completion_date": 1, "status": 1}
+    for task in tasks_collection.find({"created_at": {"$lt": cutoff}}, projection):
+        employee = task.get("employee_username")
+        if not employee:
+            continue
+        add(employee, task["created_at"], {"created": 1})
+        completion_date = task.get("completion_date")
+        if task.get("status") == "completed" and isinstance(completion_date, datetime) and completion_date < cutoff:
+            add(employee, completion_date, _completion_inc(task, completion_date, 1))
+
+    now = datetime.utcnow()
+    for written, ((employee, day), inc) in enumerate(rollups.items(), 1):
+        try:
+            rollups_collection.update_one(
+                {"_id": _rollup_id(employee, day), "backfilled": {"$ne": True}},
+                {"$inc": inc, "$set": {"employee_username": employee, "day": day, "updated_at": now,
+                                       "backfilled": True}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            pass  # folded in by an earlier run that lost its lease
+        if written % 500 == 0 and not _renew_backfill(owner):
+            print("⚠️ Lost the task rollup backfill lease, stopping")
+            return 0
+    rollups_collection.update_one({"_id": _BACKFILL_MARKER, "lease_owner": owner}, {
+        "$set": {"finished_at": datetime.utcnow(), "days": len(rollups)},
+        "$unset": {"lease_owner": "", "lease_expires": ""},
+    })
+    print(f"📈 Backfilled {len(rollups)} task rollup days")
+    return len(rollups)
+
+
+def start_backfill():
+    """Build rollups for tasks that predate the analytics module, in the background"""
+    # Pinned before this process serves a request, so its hooks only see changes after the cutoff
+    for organization in router.each():
+        try:
+            pin_backfill_cutoff()
+        except Exception as e:
+            print(f"⚠️ Could not pin the task rollup cutoff for {organization or 'shared database'}: {e}")
+
+    def run():
+        for organization in router.each():
+            try:
+                rebuild_rollups()
+            except Exception as e:
+                print(f"⚠️ Task rollup backfill failed for {organization or 'shared database'}: {e}")
+
+    threading.Thread(target=run, name="rollup-backfill", daemon=True).start()
+
+
+def percentile(histogram: List[int], fraction: float) -> Optional[float]:
+    """Approximate percentile in hours, interpolating linearly inside the bucket"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = CYCLE_BUCKETS_HOURS[index - 1] if index else 0
+            if index >= len(CYCLE_BUCKETS_HOURS):
+                return float(lower)
+            upper = CYCLE_BUCKETS_HOURS[index]
+            return round(lower + (upper - lower) * (rank - seen) / count, 1)
+        seen += count
+    return float(CYCLE_BUCKETS_HOURS[-1])
+
+
+def _period_start(day: datetime, interval: str) -> datetime:
+    return day - timedelta(days=day.weekday()) if interval == "week" else day
+
+
+class _Point:
+    __slots__ = ("created", "completed", "histogram", "cycle_count", "cycle_hours_sum")
+
+    def __init__(self):
+        self.created = 0
+        self.completed = 0
+        self.histogram = [0] * (len(CYCLE_BUCKETS_HOURS) + 1)
+        self.cycle_count = 0
+        self.cycle_hours_sum = 0.0
+
+    def add(self, rollup: Dict[str, Any]):
+        self.created += rollup.get("created", 0)
+        self.completed += rollup.get("completed", 0)
+        self.cycle_count += rollup.get("cycle_count", 0)
+        self.cycle_hours_sum += rollup.get("cycle_hours_sum", 0.0)
+        for bucket, count in (rollup.get("cycle_hist") or {}).items():
+            self.histogram[int(bucket)] += count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "created": self.created,
+            "completed": self.completed,
+            "cycle_p50_hours": percentile(self.histogram, 0.5),
+            "cycle_p90_hours": percentile(self.histogram, 0.9),
+            "cycle_mean_hours": round(self.cycle_hours_sum / self.cycle_count, 1) if self.cycle_count else None,
+        }
+
+
+def task_metrics(date_from: datetime, date_to: datetime, interval: str = "day",
+                 employees: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Throughput and cycle-time series per employee and for everyone, from one range query on the rollups"""
+    start, end = _day(date_from), _day(date_to)
+    criteria: Dict[str, Any] = {"day": {"$gte": start, "$lte": end}}
+    if employees is not None:
+        criteria["employee_username"] = {"$in": employees}
+
+    per_employee: Dict[str, Dict[datetime, _Point]] = {}
+    overall: Dict[datetime, _Point] = {}
+    summary = _Point()
+    for rollup in rollups_collection.find(criteria, {"_id": 0, "updated_at": 0}):
+        period = _period_start(rollup["day"], interval)
+        per_employee.setdefault(rollup["employee_username"], {}).setdefault(period, _Point()).add(rollup)
+        overall.setdefault(period, _Point()).add(rollup)
+        summary.add(rollup)
+
+    periods = []
+    cursor = _period_start(start, interval)
+    step = timedelta(days=7 if interval == "week" else 1)
+    while cursor <= end:
+        periods.append(cursor)
+        cursor += step
+
+    def series(points: Dict[datetime, _Point]) -> List[Dict[str, Any]]:
+        empty = _Point().to_dict()
+        return [{"period": p, **(points[p].to_dict() if p in points else empty)} for p in periods]
+
+    return {
+        "interval": interval,
+        "from": start,
+        "to": end,
+        "summary": summary.to_dict(),
+        "series": series(overall),
+        "employees": {employee: series(points) for employee, points in sorted(per_employee.items())},
+    }
@@ -0,0 +1,337 @@
+# archive.py
+
+import fcntl
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bson import json_util
+
+from db import db, router
+from tenancy import current_organization
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "archive")
+# Archival is opt-in and deletes from MongoDB, so it needs ARCHIVE_DIR on durable storage.
+# Setting ARCHIVE_DIR alone archives after 90 days; 0 disables archival, and reads still
+# fall through to whatever is already archived
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS") or ("90" if ARCHIVE_DIR else "0"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "86400"))
+
+# Collection -> (time field, field readers look documents up by)
+ARCHIVED_COLLECTIONS = {
+    "updates": ("timestamp", "employee_username"),
+    "chat_sessions": ("timestamp", "username"),
+}
+
+_JSON_OPTIONS = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED, tz_aware=False)
+
+
+def _archive_key(collection_name: str, document: Dict[str, Any]) -> Optional[str]:
+    key_field = ARCHIVED_COLLECTIONS[collection_name][1]
+    if collection_name == "updates":
+        # Updates from /submit-update only carry employee_name
+        return document.get("employee_username") or document.get("employee_name")
+    return document.get(key_field)
+
+
+class ColdArchive:
+    """Date-partitioned, compressed JSONL files holding documents moved out of MongoDB.
+
+    Layout under the archive directory:
+      <collection>/<YYYY-MM>/part-<id>.jsonl.zst   (or .jsonl.gz without zstandard)
+      <collection>/manifest.json                   one entry per part: time range, count, keys
+    Readers use the manifest to open only the parts whose time range and keys can
+    match. Writers take an flock on archive.lock. Organizations routed to their
+    own database get their own tree under <archive dir>/<database name>.
+    """
+
+    def __init__(self, archive_dir: Optional[str] = None):
+        self.archive_dir = archive_dir or ARCHIVE_DIR or DEFAULT_ARCHIVE_DIR
+        self.codec = "zstd" if zstandard is not None else "gzip"
+        self._manifests: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    # --- storage -------------------------------------------------------------
+
+    def _root(self) -> str:
+        route = router.route(current_organization())
+        return self.archive_dir if route == router.default_route else os.path.join(self.archive_dir, route[1])
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self._root(), *parts)
+
+    @contextmanager
+    def _file_lock(self, blocking: bool = True):
+        os.makedirs(self._root(), exist_ok=True)
+        with open(self._path("archive.lock"), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def manifest(self, collection_name: str) -> List[Dict[str, Any]]:
+        path = self._path(collection_name, "manifest.json")
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._manifests.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with open(path) as f:
+            parts = json.load(f)["parts"]
+        for part in parts:
+            part["min_ts"] = datetime.fromisoformat(part["min_ts"])
+            part["max_ts"] = datetime.fromisoformat(part["max_ts"])
+            part["keys"] = set(part["keys"])
+        with self._lock:
+            self._manifests[path] = (mtime, parts)
+        return parts
+
+    def _write_manifest(self, collection_name: str, parts: List[Dict[str, Any]]):
+        serializable = [{**p, "min_ts": p["min_ts"].isoformat(), "max_ts": p["max_ts"].isoformat(),
+                         "keys": sorted(p["keys"])} for p in parts]
+        tmp_path = self._path(collection_name, "manifest.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"codec": self.codec, "parts": serializable}, f)
+        os.replace(tmp_path, self._path(collection_name, "manifest.json"))
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _read_part(self, collection_name: str, part: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        with open(self._path(collection_name, part["file"]), "rb") as f:
+            raw = f.read()
+        if part["file"].endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read zstd archive parts")
+            data = zstandard.ZstdDecompressor().decompress(raw)
+        else:
+            data = gzip.decompress(raw)
+        for line in data.splitlines():
+            if line:
+                yield json_util.loads(line, json_options=_JSON_OPTIONS)
+
+    # --- archival ------------------------------------------------------------
+
+    def _write_part(self, collection_name: str, month: str, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        time_field = ARCHIVED_COLLECTIONS[collection_name][0]
+        relative = os.path.join(month, f"part-{uuid.uuid4().hex[:12]}.jsonl.{'zst' if self.codec == 'zstd' else 'gz'}")
+        os.makedirs(self._path(collection_name, month), exist_ok=True)
+        payload = "\n".join(json_util.dumps(d, json_options=_JSON_OPTIONS) for d in docs).encode("utf-8")
+        tmp_path = self._path(collection_name, relative + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self._compress(payload))
+        os.replace(tmp_path, self._path(collection_name, relative))
+        return {
+            "file": relative,
+            "month": month,
+            "min_ts": min(d[time_field] for d in docs),
+            "max_ts": max(d[time_field] for d in docs),
+            "count": len(docs),
+            "keys": {k for k in (_archive_key(collection_name, d) for d in docs) if k},
+        }
+
+    def write_batch(self, collection_name: str, documents: List[Dict[str, Any]]) -> int:
+        """Append documents as one part per month; call with the archive lock held"""
+        time_field = ARCHIVED_COLLECTIONS[collection_name][0]
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for document in documents:
+            by_month.setdefault(document[time_field].strftime("%Y-%m"), []).append(document)
+
+        parts = list(self.manifest(collection_name))
+        for month, docs in sorted(by_month.items()):
+            parts.append(self._write_part(collection_name, month, docs))
+        self._write_manifest(collection_name, parts)
+        return len(documents)
+
+    def forget(self, collection_name: str, keys: List[str]) -> int:
+        """Delete every archived document filed under one of `keys`; returns how many were removed.
+
+        Parts holding such documents are rewritten without them (or dropped when
+        nothing is left), so purges and cleared histories don't come back through
+        read-through. The manifest is switched before old files are unlinked.
+        """
+        keys = set(keys)
+        removed = 0
+        with self._file_lock():
+            parts = list(self.manifest(collection_name))
+            kept_parts, stale_files = [], []
+            for part in parts:
+                if not keys & part["keys"]:
+                    kept_parts.append(part)
+                    continue
+                docs = list(self._read_part(collection_name, part))
+                # Only the key field itself counts here, never the employee_name fallback
+                kept = [d for d in docs if d.get(ARCHIVED_COLLECTIONS[collection_name][1]) not in keys]
+                removed += len(docs) - len(kept)
+                if kept:
+                    kept_parts.append(self._write_part(collection_name, part["month"], kept))
+                stale_files.append(part["file"])
+            if not stale_files:
+                return 0
+            self._write_manifest(collection_name, kept_parts)
+            for relative in stale_files:
+                try:
+                    os.remove(self._path(collection_name, relative))
+                except OSError:
+                    pass
+        return removed
+
+    def archive_collection(self, collection_name: str, cutoff: datetime) -> int:
+        """Move documents older than cutoff into the archive, one batch at a time.
+
+        Each batch is written (and the manifest updated) before it is deleted from
+        MongoDB, so a crash can leave a document in both places but never in neither;
+        reads de-duplicate by _id.
+        """
+        collection = db[collection_name]
+        time_field = ARCHIVED_COLLECTIONS[collection_name][0]
+        moved = 0
+        with self._file_lock(blocking=False) as locked:
+            if not locked:
+                print(f"ℹ️ Archival of {collection_name} already running in another process")
+                return 0
+            while True:
+                batch = list(collection.find({time_field: {"$lt": cutoff}})
+                             .sort(time_field, 1).limit(ARCHIVE_BATCH_SIZE))
+                if not batch:
+                    break
+                self.write_batch(collection_name, batch)
+                collection.delete_many({"_id": {"$in": [d["_id"] for d in batch]}})
+                moved += len(batch)
+                if len(batch) < ARCHIVE_BATCH_SIZE:
+                    break
+        if moved:
+            print(f"🗄️ Archived {moved} {collection_name} documents older than {cutoff:%Y-%m-%d}")
+        return moved
+
+    # --- reads ---------------------------------------------------------------
+
+    def newest(self, collection_name: str) -> Optional[datetime]:
+        parts = self.manifest(collection_name)
+        return max((p["max_ts"] for p in parts), default=None)
+
+    def find(self, collection_name: str, key: Optional[str] = None, before: Optional[Tuple[datetime, Any]] = None,
+             since: Optional[datetime] = None, limit: Optional[int] = 50, oldest_first: bool = False) -> List[Dict[str, Any]]:
+        """Archived documents for `key` (all keys when None), newest first unless oldest_first.
+
+        `before` is a (timestamp, _id) cursor like the chat history one, or a bare
+        (timestamp, None); `since` is an inclusive lower bound.
+        """
+        time_field = ARCHIVED_COLLECTIONS[collection_name][0]
+        candidates = [p for p in self.manifest(collection_name)
+                      if (key is None or key in p["keys"])
+                      and (before is None or p["min_ts"] <= before[0])
+                      and (since is None or p["max_ts"] >= since)]
+        candidates.sort(key=lambda p: p["max_ts"], reverse=True)
+
+        found: Dict[Any, Dict[str, Any]] = {}
+        for part in candidates:
+            # Parts are newest-first; once we have enough and this part is entirely older, stop
+            if not oldest_first and limit is not None and len(found) >= limit and part["max_ts"] < min(d[time_field] for d in found.values()):
+                break
+            for document in self._read_part(collection_name, part):
+                if key is not None and _archive_key(collection_name, document) != key:
+                    continue
+                stamp = document.get(time_field)
+                if since is not None and stamp < since:
+                    continue
+                if before is not None and (stamp > before[0] or (stamp == before[0] and (
+                        before[1] is None or document["_id"] >= before[1]))):
+                    continue
+                found[document["_id"]] = document
+        ordered = sorted(found.values(), key=lambda d: (d[time_field], d["_id"]), reverse=not oldest_first)
+        return ordered if limit is None else ordered[:limit]
+
+    def version(self, collection_name: str) -> tuple:
+        """Changes whenever parts are added; for ETags over read-through results"""
+        parts = self.manifest(collection_name)
+        return len(parts), sum(p["count"] for p in parts)
+
+    def status(self) -> Dict[str, Any]:
+        summary = {}
+        for name in ARCHIVED_COLLECTIONS:
+            parts = self.manifest(name)
+            summary[name] = {
+                "parts": len(parts),
+                "documents": sum(p["count"] for p in parts),
+                "newest": max((p["max_ts"] for p in parts), default=None),
+            }
+        return {"codec": self.codec, "after_days": ARCHIVE_AFTER_DAYS, "collections": summary}
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """Apply an inclusion projection (as built by parse_fields) to an archived document"""
+    if not projection:
+        return document
+    included = [field for field, flag in projection.items() if flag and field != "_id"]
+    result = {field: document[field] for field in included if field in document} if included else dict(document)
+    if projection.get("_id", 1):
+        result["_id"] = document["_id"]
+    else:
+        result.pop("_id", None)
+    return result
+
+
+class ArchiveWorker:
+    """Moves documents older than ARCHIVE_AFTER_DAYS into the cold archive every ARCHIVE_INTERVAL seconds"""
+
+    def __init__(self, archive: ColdArchive):
+        self.archive = archive
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if ARCHIVE_AFTER_DAYS <= 0:
+            return
+        # Archived documents are deleted from MongoDB; on the container's ephemeral disk they'd be lost
+        if not ARCHIVE_DIR:
+            raise RuntimeError("ARCHIVE_AFTER_DAYS needs ARCHIVE_DIR set to durable storage (e.g. a mounted volume)")
+        os.makedirs(self.archive.archive_dir, exist_ok=True)
+        if not os.access(self.archive.archive_dir, os.W_OK):
+            raise RuntimeError(f"ARCHIVE_DIR {self.archive.archive_dir} is not writable")
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="archive-worker", daemon=True)
+            self._thread.start()
+            print(f"✅ Archive worker started (archiving after {ARCHIVE_AFTER_DAYS} days)")
+
+    def run_once(self) -> Dict[str, int]:
+        cutoff = datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+        return {name: self.archive.archive_collection(name, cutoff) for name in ARCHIVED_COLLECTIONS}
+
+    def _run(self):
+        while True:
+            try:
+                for _ in router.each():
+                    self.run_once()
+            except Exception as e:
+                print(f"⚠️ Archival failed: {e}")
+            time.sleep(ARCHIVE_INTERVAL)
+
+
+cold_archive = ColdArchive()
+archive_worker = ArchiveWorker(cold_archive)
@@ -0,0 +1,122 @@
+# cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from db import users_collection
+
+_MISSING = object()
+
+
+class LocalCache:
+    """Small thread-safe in-process LRU cache with a per-entry TTL.
+
+    Entries are also dropped by the invalidation bus when the backing documents
+    change in MongoDB, so the TTL only bounds staleness if the bus is down. With
+    id_fn, cached values are indexed by their document _id, so a change can drop
+    every key that holds that document (e.g. the old email after an email change).
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300,
+                 id_fn: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.id_fn = id_fn
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._keys_by_id: Dict[Any, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING or item[1] < time.monotonic():
+                if item is not _MISSING:
+                    self._pop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def _document_id(self, value):
+        try:
+            return self.id_fn(value) if self.id_fn and value is not None else None
+        except Exception:
+            return None
+
+    def _pop(self, key):
+        value, _ = self._data.pop(key)
+        doc_id = self._document_id(value)
+        if doc_id is not None:
+            keys = self._keys_by_id.get(doc_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_id[doc_id]
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            doc_id = self._document_id(value)
+            if doc_id is not None:
+                self._keys_by_id.setdefault(doc_id, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._pop(next(iter(self._data)))
+
+    def get_or_load(self, key, loader: Callable[[], Any]):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+                self.invalidations += 1
+
+    def invalidate_document(self, document_id):
+        """Drop every key whose cached value is the document with this _id (needs id_fn)"""
+        with self._lock:
+            for key in list(self._keys_by_id.get(document_id, ())):
+                self._pop(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+            self._keys_by_id.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+user_cache = LocalCache("users", maxsize=4096, ttl=float(os.getenv("USER_CACHE_TTL", "300")),
+                        id_fn=lambda user: user.get("_id"))
+
+
+def find_user_by_email(email: str) -> Optional[Dict[str, Any]]:
+    """Cached users_collection.find_one({"email": email})"""
+    if not email:
+        return None
+    user = user_cache.get_or_load(email, lambda: users_collection.find_one({"email": email}))
+    return dict(user) if user else None
@@ -0,0 +1,165 @@
+# dedup.py
+
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# Estimated Jaccard similarity at or above which a new update counts as a resend
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+# "merge" folds the resend into the earlier update, "reject" drops it, "off" disables detection
+DEDUP_MODE = os.getenv("DEDUP_MODE", "merge").lower()
+# Only same-day updates are compared: tomorrow's standup is a new update, not a resend of today's
+DEDUP_WINDOW_HOURS = float(os.getenv("DEDUP_WINDOW_HOURS", "24"))
+DEDUP_MAX_RECENT = int(os.getenv("DEDUP_MAX_RECENT", "50"))
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs around 0.5 similarity or more become candidates
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, _PRIME, size=(NUM_PERM, 1)).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=(NUM_PERM, 1)).astype(np.uint64)
+
+
+def shingles(text: str) -> List[str]:
+    """Character 5-grams over lowercased, whitespace-collapsed text, so typos only touch a few shingles"""
+    normalized = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+    if len(normalized) <= SHINGLE_SIZE:
+        return [normalized] if normalized else []
+    return [normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)]
+
+
+def signature(text: str) -> np.ndarray:
+    hashed = np.array([zlib.crc32(s.encode("utf-8")) % _PRIME for s in set(shingles(text))] or [0], dtype=np.uint64)
+    return ((_A * hashed + _B) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _band_keys(sig: np.ndarray) -> List[bytes]:
+    return [sig[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+
+
+class _EmployeeIndex:
+    def __init__(self):
+        self.entries: "deque[Tuple[str, np.ndarray, datetime]]" = deque()
+        self.buckets: List[Dict[bytes, set]] = [defaultdict(set) for _ in range(BANDS)]
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.watermark: Optional[datetime] = None
+
+    def add(self, update_id: str, sig: np.ndarray, timestamp: datetime):
+        if update_id in self.signatures:
+            self._unlink(update_id)
+        self.signatures[update_id] = sig
+        self.entries.append((update_id, sig, timestamp))
+        for band, key in enumerate(_band_keys(sig)):
+            self.buckets[band][key].add(update_id)
+
+    def _unlink(self, update_id: str):
+        sig = self.signatures.pop(update_id)
+        for band, key in enumerate(_band_keys(sig)):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(update_id)
+                if not bucket:
+                    del self.buckets[band][key]
+        self.entries = deque(e for e in self.entries if e[0] != update_id)
+
+    def evict(self, cutoff: datetime, max_entries: int):
+        while self.entries and (len(self.entries) > max_entries or self.entries[0][2] < cutoff):
+            self._unlink(self.entries[0][0])
+
+    def candidates(self, sig: np.ndarray) -> set:
+        found = set()
+        for band, key in enumerate(_band_keys(sig)):
+            found |= self.buckets[band].get(key, set())
+        return found
+
+
+class NearDuplicateDetector:
+    """Per-employee MinHash signatures of recent updates with a banded LSH index.
+
+    Lookups only compare against the few updates that share an LSH band, so the
+    per-message cost stays flat as history grows. When backed by a collection, each
+    check first pulls in updates newer than the local watermark, which keeps gunicorn
+    workers consistent without scanning history.
+    """
+
+    def __init__(self, collection=None, threshold: float = DEDUP_THRESHOLD,
+                 window_hours: float = DEDUP_WINDOW_HOURS, max_recent: int = DEDUP_MAX_RECENT):
+        self.collection = collection
+        self.threshold = threshold
+        self.window = timedelta(hours=window_hours)
+        self.max_recent = max_recent
+        self._employees: Dict[str, _EmployeeIndex] = defaultdict(_EmployeeIndex)
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+
+    def _cutoff(self, now: datetime) -> datetime:
+        """Start of the dedup window, never earlier than the start of now's UTC day"""
+        return max(now - self.window, datetime(now.year, now.month, now.day))
+
+    def _refresh(self, employee: str, index: _EmployeeIndex, now: datetime):
+        since = self._cutoff(now)
+        if index.watermark is not None and index.watermark > since:
+            since = index.watermark
+        query = {"employee_username": employee, "timestamp": {"$gte": since}}
+        projection = {"content": 1, "update_text": 1, "timestamp": 1}
+        # Newest first so the limit keeps the most recent updates, then add them oldest first
+        recent = list(self.collection.find(query, projection).sort("timestamp", -1).limit(self.max_recent))
+        for update in reversed(recent):
+            update_id = str(update["_id"])
+            if update_id not in index.signatures:
+                text = update.get("content") or update.get("update_text") or ""
+                index.add(update_id, signature(text), update["timestamp"])
+            index.watermark = max(index.watermark or update["timestamp"], update["timestamp"])
+
+    def check(self, employee: str, text: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Closest recent update from this employee at or above the threshold, or None"""
+        now = now or datetime.utcnow()
+        sig = signature(text)
+        with self._lock:
+            self.checked += 1
+            index = self._employees[employee]
+            if self.collection is not None:
+                self._refresh(employee, index, now)
+            index.evict(self._cutoff(now), self.max_recent)
+
+            best_id, best_score = None, 0.0
+            for update_id in index.candidates(sig):
+                score = similarity(sig, index.signatures[update_id])
+                if score > best_score:
+                    best_id, best_score = update_id, score
+            if best_id is None or best_score < self.threshold:
+                return None
+            self.duplicates += 1
+            timestamp = next(e[2] for e in index.entries if e[0] == best_id)
+            return {"update_id": best_id, "similarity": best_score, "timestamp": timestamp}
+
+    def remember(self, employee: str, update_id, text: str, timestamp: datetime):
+        with self._lock:
+            index = self._employees[employee]
+            index.add(str(update_id), signature(text), timestamp)
+            index.watermark = max(index.watermark or timestamp, timestamp)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": DEDUP_MODE,
+                "threshold": self.threshold,
+                "checked": self.checked,
+                "duplicates": self.duplicates,
+                "employees": len(self._employees),
+                "signatures": sum(len(i.signatures) for i in self._employees.values()),
+            }
@@ -0,0 +1,299 @@
+# digests.py
+
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from db import db, router, users_collection, tasks_collection, updates_collection
+from tenancy import current_organization, use_organization
+
+digests_collection = db["team_digests"]
+
+RECENT_LIMIT = 10
+EMPLOYEE_RECENT_LIMIT = 5
+BLOCKER_LIMIT = 5
+BLOCKER_WINDOW_DAYS = 14
+# Ids of updates folded in since the last rebuild, so a resent notification isn't counted twice
+APPLIED_LIMIT = 200
+_REFRESH_MARKER = "__refresh__"
+BLOCKER_RE = re.compile(r"\b(block(ed|er|ers|ing)?|stuck|waiting on|can'?t proceed)\b", re.IGNORECASE)
+
+
+def update_author(update: Dict[str, Any]) -> str:
+    # Chat-submitted updates carry employee_username, /submit-update ones only employee_name
+    return update.get("employee_username") or update.get("employee_name") or "Unknown"
+
+
+def update_text(update: Dict[str, Any]) -> str:
+    return update.get("content") or update.get("update_text") or ""
+
+
+def is_blocker(text: str) -> bool:
+    return bool(BLOCKER_RE.search(text))
+
+
+def team_members(manager_username: str) -> Optional[List[str]]:
+    """Employees with tasks assigned by this manager, or None when the manager sees everyone"""
+    members = [m for m in tasks_collection.distinct("employee_username", {"assigned_manager": manager_username}) if m]
+    return members or None
+
+
+def _entry(update: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "employee_username": update_author(update),
+        "content": update_text(update),
+        "timestamp": update.get("timestamp"),
+    }
+
+
+def _team_match(members: Optional[List[str]]) -> Dict[str, Any]:
+    if members is None:
+        return {}
+    return {"$or": [{"employee_username": {"$in": members}}, {"employee_name": {"$in": members}}]}
+
+
+def build_digest(manager_username: str) -> Dict[str, Any]:
+    """Rebuild a manager's digest from the updates collection.
+
+    Only updates up to the newest _id at the start are read; that _id becomes the
+    digest's watermark, and apply_update() skips anything at or below it.
+    """
+    members = team_members(manager_username)
+    newest = updates_collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    watermark = newest["_id"] if newest else None
+    bound = {"_id": {"$lte": watermark}} if watermark else {}
+    match = {**_team_match(members), **bound}
+
+    recent = [_entry(u) for u in updates_collection.find(match).sort("timestamp", -1).limit(RECENT_LIMIT)]
+
+    employees = []
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"$ifNull": ["$employee_username", "$employee_name"]},
+            "count": {"$sum": 1},
+            "last_timestamp": {"$max": "$timestamp"},
+        }},
+        {"$sort": {"last_timestamp": -1}},
+    ]
+    for row in updates_collection.aggregate(pipeline):
+        username = row["_id"] or "Unknown"
+        emp_updates = updates_collection.find(
+            {"$or": [{"employee_username": username}, {"employee_name": username}], **bound}
+        ).sort("timestamp", -1).limit(EMPLOYEE_RECENT_LIMIT)
+        employees.append({
+            "username": username,
+            "count": row["count"],
+            "last_timestamp": row["last_timestamp"],
+            "recent": [_entry(u) for u in emp_updates],
+        })
+
+    since = datetime.utcnow() - timedelta(days=BLOCKER_WINDOW_DAYS)
+    blockers = []
+    for update in updates_collection.find({**match, "timestamp": {"$gte": since}}).sort("timestamp", -1):
+        if is_blocker(update_text(update)):
+            blockers.append(_entry(update))
+            if len(blockers) >= BLOCKER_LIMIT:
+                break
+
+    now = datetime.utcnow()
+    return {
+        "_id": manager_username,
+        "manager_username": manager_username,
+        "scope": "all" if members is None else "team",
+        "members": members or [],
+        "recent": recent,
+        "employees": employees,
+        "blockers": blockers,
+        "total_updates": sum(e["count"] for e in employees),
+        "watermark": watermark,
+        "applied": [],
+        "refreshed_at": now,
+        "updated_at": now,
+    }
+
+
+def refresh_digest(manager_username: str) -> Dict[str, Any]:
+    digest = build_digest(manager_username)
+    digests_collection.replace_one({"_id": manager_username}, digest, upsert=True)
+    # Updates that arrived while building were folded into the old document, which the replace dropped
+    newer: Dict[str, Any] = {"_id": {"$gt": digest["watermark"]}} if digest["watermark"] else {}
+    for update in updates_collection.find({**_team_match(digest["members"] or None), **newer}).sort("_id", 1):
+        apply_update(update, manager_username)
+    return get_digest(manager_username) or digest
+
+
+def refresh_all_digests() -> int:
+    """Rebuild the digests of the managers whose organization lives in the current database"""
+    managers = [u["username"] for u in users_collection.find({"role": "manager"}, {"username": 1, "organization": 1})
+                if u.get("username") and router.serves(u.get("organization"))]
+    for manager_username in managers:
+        try:
+            refresh_digest(manager_username)
+        except Exception as e:
+            print(f"⚠️ Error refreshing digest for {manager_username}: {e}")
+    return len(managers)
+
+
+def refresh_author_digests(author: str) -> int:
+    """Rebuild the digests that show this employee's updates, after one was rewritten in place"""
+    managers = [d["_id"] for d in digests_collection.find(
+        {"_id": {"$ne": _REFRESH_MARKER}, "$or": [{"scope": "all"}, {"members": author}]}, {"_id": 1})]
+    for manager_username in managers:
+        try:
+            refresh_digest(manager_username)
+        except Exception as e:
+            print(f"⚠️ Error refreshing digest for {manager_username}: {e}")
+    return len(managers)
+
+
+def apply_update(update: Dict[str, Any], manager_username: Optional[str] = None):
+    """Fold one new update into every digest (or just one manager's) whose team includes its author.
+
+    Digests whose watermark is at or past the update's _id already counted it when
+    they were built, and ones listing it in `applied` have already folded it in.
+    """
+    author = update_author(update)
+    entry = _entry(update)
+    now = datetime.utcnow()
+    audience: List[Dict[str, Any]] = [{"$or": [{"scope": "all"}, {"members": author}]}]
+    if manager_username:
+        audience.append({"_id": manager_username})
+    applied: Dict[str, Any] = {}
+    update_id = update.get("_id")
+    if update_id is not None:
+        audience += [{"$or": [{"watermark": None}, {"watermark": {"$lt": update_id}}]},
+                     {"applied": {"$ne": update_id}}]
+        applied = {"applied": {"$each": [update_id], "$slice": -APPLIED_LIMIT}}
+
+    push = {"recent": {"$each": [entry], "$position": 0, "$slice": RECENT_LIMIT}, **applied}
+    if is_blocker(entry["content"]):
+        push["blockers"] = {"$each": [entry], "$position": 0, "$slice": BLOCKER_LIMIT}
+
+    # One write per digest, so the watermark/applied check and the counts change together.
+    # Employee already present in the digest: bump their entry in place
+    digests_collection.update_many({"$and": audience + [{"employees.username": author}]}, {
+        "$push": {**push, "employees.$[emp].recent": {"$each": [entry], "$position": 0,
+                                                      "$slice": EMPLOYEE_RECENT_LIMIT}},
+        "$inc": {"total_updates": 1, "employees.$[emp].count": 1},
+        "$set": {"updated_at": now, "employees.$[emp].last_timestamp": entry["timestamp"]},
+    }, array_filters=[{"emp.username": author}])
+    # First update from this employee for these digests
+    digests_collection.update_many({"$and": audience + [{"employees.username": {"$ne": author}}]}, {
+        "$push": {**push, "employees": {"$each": [{
+            "username": author,
+            "count": 1,
+            "last_timestamp": entry["timestamp"],
+            "recent": [entry],
+        }], "$position": 0}},
+        "$inc": {"total_updates": 1},
+        "$set": {"updated_at": now},
+    })
+
+
+def claim_refresh(interval: float) -> bool:
+    """Whether this process should rebuild the current database's digests now.
+
+    A marker document holds the next refresh time, so one gunicorn worker per
+    interval does the rebuild instead of all of them.
+    """
+    now = datetime.utcnow()
+    try:
+        digests_collection.update_one(
+            {"_id": _REFRESH_MARKER, "next_refresh_at": {"$lte": now}},
+            {"$set": {"next_refresh_at": now + timedelta(seconds=interval), "claimed_at": now}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def get_digest(manager_username: str) -> Optional[Dict[str, Any]]:
+    return digests_collection.find_one({"_id": manager_username})
+
+
+def _format_date(timestamp) -> str:
+    return timestamp.strftime("%Y-%m-%d %H:%M") if isinstance(timestamp, datetime) else "Unknown date"
+
+
+def render_digest(digest: Dict[str, Any]) -> str:
+    if not digest.get("recent"):
+        return "There are no updates from your team yet."
+
+    response = "Recent updates from your team:\n\n"
+    for entry in digest["recent"]:
+        response += f"**{entry['employee_username']}** ({_format_date(entry.get('timestamp'))}):\n{entry.get('content') or 'No content'}\n\n"
+
+    if digest.get("blockers"):
+        response += "**Latest blockers**:\n"
+        for entry in digest["blockers"]:
+            response += f"- {entry['employee_username']} ({_format_date(entry.get('timestamp'))}): {entry.get('content')}\n"
+        response += "\n"
+
+    if digest.get("employees"):
+        response += f"**Team activity** ({digest.get('total_updates', 0)} updates):\n"
+        for emp in digest["employees"]:
+            response += f"- {emp['username']}: {emp['count']} updates, last {_format_date(emp.get('last_timestamp'))}\n"
+    return response
+
+
+class DigestWorker:
+    """Background thread that keeps team digests current.
+
+    New updates are queued by notify_update() and folded in incrementally, and
+    notify_rewrite() rebuilds the digests showing an update edited in place; every
+    DIGEST_REFRESH_INTERVAL seconds one process rebuilds all digests to pick up
+    team changes and updates written by other processes.
+    """
+
+    def __init__(self, interval: Optional[int] = None):
+        self.interval = interval or int(os.getenv("DIGEST_REFRESH_INTERVAL", "300"))
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._next_refresh = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="digest-worker", daemon=True)
+            self._thread.start()
+            print(f"✅ Digest worker started (refresh every {self.interval}s)")
+
+    def notify_update(self, update: Dict[str, Any]):
+        self._queue.put((current_organization(), apply_update, update))
+
+    def notify_rewrite(self, author: str):
+        self._queue.put((current_organization(), refresh_author_digests, author))
+
+    def _run(self):
+        while True:
+            if time.monotonic() >= self._next_refresh:
+                try:
+                    for _ in router.each():
+                        if claim_refresh(self.interval):
+                            refresh_all_digests()
+                except Exception as e:
+                    print(f"⚠️ Digest refresh failed: {e}")
+                self._next_refresh = time.monotonic() + self.interval
+
+            try:
+                organization, handler, payload = self._queue.get(timeout=max(self._next_refresh - time.monotonic(), 0.1))
+            except queue.Empty:
+                continue
+            try:
+                with use_organization(organization):
+                    handler(payload)
+            except Exception as e:
+                print(f"⚠️ Could not apply update to digests: {e}")
+
+
+digest_worker = DigestWorker()
@@ -0,0 +1,292 @@
+# extraction.py
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+from db import router, updates_collection
+from services.admission import admission, AdmissionRejected
+from services.digests import BLOCKER_WINDOW_DAYS, team_members, update_author, update_text
+from services.model_router import model_router
+from services.resilience import call_with_deadline
+
+# "auto" uses Gemini when a model is configured and healthy, "llm" always tries it first, "rules" never calls it
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "auto").lower()
+EXTRACTION_BATCH_SIZE = int(os.getenv("EXTRACTION_BATCH_SIZE", "20"))
+EXTRACTION_POLL_INTERVAL = float(os.getenv("EXTRACTION_POLL_INTERVAL", "30"))
+EXTRACTION_LLM_TIMEOUT = float(os.getenv("EXTRACTION_LLM_TIMEOUT", "30"))
+# Claims older than this belong to a worker that died mid-batch
+EXTRACTION_CLAIM_LEASE = float(os.getenv("EXTRACTION_CLAIM_LEASE", "300"))
+# Updates stored before extraction shipped (no extraction_status) are backfilled with the rules only,
+# this many per pass, so turning auto mode on never sends the whole history to Gemini
+EXTRACTION_BACKFILL_BATCH = int(os.getenv("EXTRACTION_BACKFILL_BATCH", "100"))
+
+EXTRACTED_FIELDS = ("tasks_worked_on", "progress", "blockers", "plans")
+
+NO_BLOCKER_RE = re.compile(r"\b(no|zero|nothing|none|not)\b[^.;\n]{0,20}\b(block(ed|er|ers|ing)?|stuck|issues?)\b"
+                           r"|\bblockers?\s*:\s*(none|n/?a|nothing|no)\b", re.IGNORECASE)
+SECTION_RE = re.compile(r"^\s*(?:\d+[.)]\s*)?(tasks?(?: worked on)?|worked on|progress|blockers?|plans?"
+                        r"(?: for tomorrow)?|tomorrow|next)\s*[:\-]\s*", re.IGNORECASE)
+RULES = {
+    "blockers": re.compile(r"\b(block(ed|er|ers|ing)?|stuck|waiting (on|for)|can'?t proceed|depend(s|ing)? on)\b", re.IGNORECASE),
+    "plans": re.compile(r"\b(tomorrow|next|plan(ning)? to|will|going to|gonna)\b", re.IGNORECASE),
+    "progress": re.compile(r"\b(\d+\s?%|progress|done|completed?|finished|merged|shipped|deployed|half ?way|almost)\b", re.IGNORECASE),
+    "tasks_worked_on": re.compile(r"\b(worked on|working on|fix(ed|ing)?|implement(ed|ing)?|built|build(ing)?|"
+                                  r"wrote|writing|review(ed|ing)?|refactor(ed|ing)?|debug(ged|ging)?|added|adding|"
+                                  r"updated?|task|bug|feature)\b", re.IGNORECASE),
+}
+SECTION_FIELDS = {
+    "task": "tasks_worked_on", "tasks": "tasks_worked_on", "tasks worked on": "tasks_worked_on",
+    "worked on": "tasks_worked_on", "progress": "progress", "blocker": "blockers", "blockers": "blockers",
+    "plan": "plans", "plans": "plans", "plans for tomorrow": "plans", "tomorrow": "plans", "next": "plans",
+}
+
+
+def _clauses(text: str) -> List[str]:
+    parts = re.split(r"(?<=[.!?;])\s+|\n+|\s+(?:but|and then|also)\s+", text)
+    return [p.strip(" -•*\t") for p in parts if p and p.strip(" -•*\t")]
+
+
+def extract_rule_based(text: str) -> Dict[str, List[str]]:
+    """Keyword extraction used offline and whenever the LLM is unavailable.
+
+    Explicit "Blockers: ..." style sections win; otherwise each clause goes to the
+    first matching category (blockers before plans before progress before tasks).
+    """
+    result: Dict[str, List[str]] = {field: [] for field in EXTRACTED_FIELDS}
+    for clause in _clauses(text):
+        section = SECTION_RE.match(clause)
+        if section:
+            field = SECTION_FIELDS.get(section.group(1).lower())
+            body = clause[section.end():].strip()
+            if field == "blockers" and (not body or NO_BLOCKER_RE.search(clause)):
+                continue
+            if field and body:
+                result[field].append(body)
+                continue
+        for field in ("blockers", "plans", "progress", "tasks_worked_on"):
+            if field == "blockers" and NO_BLOCKER_RE.search(clause):
+                continue
+            if RULES[field].search(clause):
+                result[field].append(clause)
+                break
+    return result
+
+
+def _normalize(fields: Dict[str, Any]) -> Dict[str, List[str]]:
+    result = {}
+    for field in EXTRACTED_FIELDS:
+        value = fields.get(field) or []
+        if isinstance(value, str):
+            value = [value]
+        result[field] = [str(v).strip() for v in value if str(v).strip()]
+    return result
+
+
+def _llm_tier():
+    if EXTRACTION_MODE == "rules":
+        return None
+    # Background work goes to the cheap model when it's up
+    for name in ("fast", "large"):
+        tier = model_router.tiers.get(name)
+        if tier and (EXTRACTION_MODE == "llm" or tier.healthy()):
+            return tier
+    return None
+
+
+def extract_with_llm(tier, updates: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[str]]]:
+    """One Gemini call for the whole batch; returns fields keyed by update id"""
+    items = [{"id": str(u["_id"]), "text": update_text(u)} for u in updates]
+    prompt = (
+        "Extract structured fields from each employee daily update below.\n"
+        "Return ONLY a JSON array with one object per update, in any order, each with keys "
+        "\"id\", \"tasks_worked_on\", \"progress\", \"blockers\", \"plans\". Every field except id is a list of "
+        "short strings quoted or paraphrased from the update. Use [] when nothing applies; "
+        "\"no blockers\" means blockers is []. Never invent content.\n\n"
+        f"Updates:\n{json.dumps(items, ensure_ascii=False)}"
+    )
+    # Shares the global LLM concurrency cap with chat traffic under its own rate bucket
+    with admission.admit("extraction-worker"):
+        if not tier.breaker.allow():
+            raise RuntimeError(f"{tier.model_name} circuit is open")
+        started = time.monotonic()
+        try:
+            text = call_with_deadline(lambda: tier.model.generate_content(prompt).text, EXTRACTION_LLM_TIMEOUT)
+            text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+            parsed = json.loads(text)
+            if not isinstance(parsed, list):
+                raise ValueError("expected a JSON array")
+        except AdmissionRejected:
+            raise
+        except Exception:
+            tier.record(False)
+            raise
+        tier.record(True, time.monotonic() - started)
+    return {str(item.get("id")): _normalize(item) for item in parsed if isinstance(item, dict)}
+
+
+def claim_batch(limit: int = EXTRACTION_BATCH_SIZE, backfill: bool = False) -> List[Dict[str, Any]]:
+    """Mark up to `limit` unprocessed updates as ours so other workers skip them.
+
+    New updates are written with extraction_status "pending"; backfill=True claims
+    the historical ones that have no status at all.
+    """
+    now = datetime.utcnow()
+    stale = {"extraction_claimed_at": {"$lt": now - timedelta(seconds=EXTRACTION_CLAIM_LEASE)}}
+    # Release batches abandoned by a crashed worker, back to where each kind was claimed from
+    updates_collection.update_many({"extraction_status": "processing", **stale},
+                                   {"$set": {"extraction_status": "pending", "updated_at": now}})
+    updates_collection.update_many({"extraction_status": "backfilling", **stale},
+                                   {"$unset": {"extraction_status": ""}, "$set": {"updated_at": now}})
+
+    pending = {"extraction_status": None if backfill else "pending"}
+    ids = [u["_id"] for u in updates_collection.find(pending, {"_id": 1}).sort("timestamp", 1).limit(limit)]
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    updates_collection.update_many(
+        {"_id": {"$in": ids}, **pending},
+        {"$set": {"extraction_status": "backfilling" if backfill else "processing", "extraction_claim": token,
+                  "extraction_claimed_at": now, "updated_at": now}},
+    )
+    return list(updates_collection.find({"extraction_claim": token}))
+
+
+def process_batch(updates: List[Dict[str, Any]], use_llm: bool = True) -> Dict[str, int]:
+    """Extract fields for a claimed batch and write them to each update's `extracted` subdocument"""
+    counts = {"llm": 0, "rules": 0, "failed": 0}
+    llm_results: Dict[str, Dict[str, List[str]]] = {}
+    tier = _llm_tier() if use_llm else None
+    if tier and updates:
+        try:
+            llm_results = extract_with_llm(tier, updates)
+        except Exception as e:
+            print(f"⚠️ LLM extraction failed for {len(updates)} updates, using rules: {e}")
+
+    for update in updates:
+        try:
+            fields = llm_results.get(str(update["_id"]))
+            method = "llm"
+            if fields is None:
+                fields = extract_rule_based(update_text(update))
+                method = "rules"
+            now = datetime.utcnow()
+            # Under their own subdocument: /submit-update stores client fields like "blockers" as sent
+            updates_collection.update_one({"_id": update["_id"]}, {
+                "$set": {
+                    "extracted": {**fields, "has_blockers": bool(fields["blockers"]), "method": method, "at": now},
+                    "extraction_status": "done",
+                    "updated_at": now,
+                },
+                "$unset": {"extraction_claim": "", "extraction_claimed_at": ""},
+            })
+            counts[method] += 1
+        except Exception as e:
+            print(f"⚠️ Could not extract fields for update {update.get('_id')}: {e}")
+            updates_collection.update_one({"_id": update["_id"]}, {
+                "$set": {"extraction_status": "failed", "updated_at": datetime.utcnow()},
+                "$unset": {"extraction_claim": "", "extraction_claimed_at": ""},
+            })
+            counts["failed"] += 1
+    return counts
+
+
+def open_blockers(manager_username: str, days: int = BLOCKER_WINDOW_DAYS) -> List[Dict[str, Any]]:
+    """Latest reported blockers per employee, skipping employees whose newer update reports none.
+
+    Served by the extracted.has_blockers and employee/timestamp indexes instead of a text scan.
+    """
+    members = team_members(manager_username)
+    query: Dict[str, Any] = {"extracted.has_blockers": True,
+                             "timestamp": {"$gte": datetime.utcnow() - timedelta(days=days)}}
+    if members is not None:
+        query["$or"] = [{"employee_username": {"$in": members}}, {"employee_name": {"$in": members}}]
+
+    latest: Dict[str, Dict[str, Any]] = {}
+    for update in updates_collection.find(query).sort("timestamp", -1):
+        latest.setdefault(update_author(update), update)
+
+    results = []
+    for author, update in latest.items():
+        newer = updates_collection.find_one({
+            "$or": [{"employee_username": author}, {"employee_name": author}],
+            "extraction_status": "done",
+            "timestamp": {"$gt": update["timestamp"]},
+        }, sort=[("timestamp", -1)])
+        if newer and not (newer.get("extracted") or {}).get("has_blockers"):
+            continue
+        results.append({
+            "employee_username": author,
+            "blockers": update["extracted"].get("blockers", []),
+            "timestamp": update.get("timestamp"),
+        })
+    return results
+
+
+class ExtractionWorker:
+    """Background thread that fills in structured fields on new updates.
+
+    notify() wakes it right after an insert; it also polls every
+    EXTRACTION_POLL_INTERVAL seconds to pick up updates written by other processes
+    and to backfill older ones (rules only, EXTRACTION_BACKFILL_BATCH per pass).
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or EXTRACTION_POLL_INTERVAL
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.processed = {"llm": 0, "rules": 0, "failed": 0}
+        self.batches = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="extraction-worker", daemon=True)
+            self._thread.start()
+            print(f"✅ Update extraction worker started (mode {EXTRACTION_MODE}, batch {EXTRACTION_BATCH_SIZE})")
+
+    def notify(self):
+        self._wake.set()
+
+    def run_once(self) -> int:
+        """Process pending updates until none are left, then one backfill batch; returns how many were handled"""
+        handled = 0
+        while True:
+            batch = claim_batch()
+            if not batch:
+                break
+            handled += self._process(batch)
+        backfill = claim_batch(EXTRACTION_BACKFILL_BATCH, backfill=True)
+        if backfill:
+            handled += self._process(backfill, use_llm=False)
+        return handled
+
+    def _process(self, batch: List[Dict[str, Any]], use_llm: bool = True) -> int:
+        counts = process_batch(batch, use_llm)
+        self.batches += 1
+        for method, count in counts.items():
+            self.processed[method] += count
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                for _ in router.each():
+                    self.run_once()
+            except Exception as e:
+                print(f"⚠️ Update extraction failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": EXTRACTION_MODE, "batches": self.batches, "processed": dict(self.processed)}
+
+
+extraction_worker = ExtractionWorker()
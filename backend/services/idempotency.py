@@ -0,0 +1,175 @@
+# idempotency.py
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from db import db, IDEMPOTENCY_TTL
+from services.cache import LocalCache
+from tenancy import current_organization
+
+idempotency_collection = db["idempotency_keys"]
+
+# How long a duplicate waits for the first request before getting a 409
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "30"))
+# A claim older than this (its process died mid-request) may be taken over by a retry
+IDEMPOTENCY_LEASE = float(os.getenv("IDEMPOTENCY_LEASE", "120"))
+IDEMPOTENCY_POLL_INTERVAL = 0.1
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a request with a different body"""
+
+
+class IdempotencyInProgress(Exception):
+    """The first request with this key is still running after IDEMPOTENCY_WAIT seconds"""
+
+
+class IdempotencyStore:
+    """Runs a request once per idempotency key and replays its stored response.
+
+    The first request claims the key with an insert into idempotency_keys (unique
+    _id, TTL on created_at), runs, and stores its response. The claim's lease is
+    renewed while the request runs, so a slow request isn't taken over by a retry
+    as if its process had died. Duplicates in the same
+    process wait on an event; duplicates in other processes poll the claim. Finished
+    responses are also kept in a LocalCache so replays don't touch MongoDB.
+    Server errors and 429s are not stored: the claim is released so a retry runs again.
+    """
+
+    def __init__(self, collection, ttl: int = IDEMPOTENCY_TTL, wait: float = IDEMPOTENCY_WAIT,
+                 lease: float = IDEMPOTENCY_LEASE):
+        self.collection = collection
+        self.wait = wait
+        self.lease = lease
+        self._cache = LocalCache("idempotency", maxsize=4096, ttl=min(ttl, 600))
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.conflicts = 0
+
+    @staticmethod
+    def storable(response: Dict[str, Any]) -> bool:
+        return response["status"] < 500 and response["status"] != 429
+
+    def _replay(self, record: Dict[str, Any], fingerprint: str) -> Tuple[Dict[str, Any], bool]:
+        if record["fingerprint"] != fingerprint:
+            self.conflicts += 1
+            raise IdempotencyConflict()
+        self.replayed += 1
+        return record["response"], True
+
+    def run(self, key: str, fingerprint: str, fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """fn returns {"status", "body", "headers"}; returns (response, replayed)"""
+        cache_key = (current_organization(), key)
+        deadline = time.monotonic() + self.wait
+        waiting = False
+        while True:
+            record = self._cache.get(cache_key)
+            if record:
+                return self._replay(record, fingerprint)
+            with self._lock:
+                event = self._inflight.get(cache_key)
+                leader = event is None
+                if leader:
+                    event = self._inflight[cache_key] = threading.Event()
+            if leader:
+                break
+            if not waiting:
+                waiting = True
+                self.waited += 1
+            # Loop again afterwards: replay what the first request stored, or run if it released the key
+            if not event.wait(max(deadline - time.monotonic(), 0)):
+                raise IdempotencyInProgress()
+
+        try:
+            return self._run_claimed(cache_key, key, fingerprint, fn, deadline)
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+            event.set()
+
+    def _claim(self, key: str, fingerprint: str, deadline: float):
+        """Claim the key in MongoDB; returns a finished record instead if another process already ran it"""
+        while True:
+            now = datetime.utcnow()
+            try:
+                self.collection.insert_one({"_id": key, "fingerprint": fingerprint, "state": "pending",
+                                            "created_at": now, "lease_expires": now + timedelta(seconds=self.lease)})
+                return None
+            except DuplicateKeyError:
+                record = self.collection.find_one({"_id": key})
+            if record is None:
+                continue
+            if record["state"] == "done" or record["fingerprint"] != fingerprint:
+                return record
+            if record["lease_expires"] < now:
+                taken = self.collection.update_one(
+                    {"_id": key, "state": "pending", "lease_expires": record["lease_expires"]},
+                    {"$set": {"lease_expires": now + timedelta(seconds=self.lease)}})
+                if taken.modified_count:
+                    return None
+                continue
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress()
+            time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    def _run_claimed(self, cache_key: tuple, key: str, fingerprint: str, fn, deadline: float):
+        record = self._claim(key, fingerprint, deadline)
+        if record is not None:
+            if record["state"] == "done":
+                self._cache.set(cache_key, record)
+            return self._replay(record, fingerprint)
+
+        stop = threading.Event()
+        renewer = threading.Thread(target=self._renew_lease, args=(key, stop), name="idempotency-lease", daemon=True)
+        renewer.start()
+        try:
+            response = fn()
+        except BaseException:
+            self.collection.delete_one({"_id": key, "state": "pending"})
+            raise
+        finally:
+            stop.set()
+        self.executed += 1
+        if not self.storable(response):
+            self.collection.delete_one({"_id": key, "state": "pending"})
+            return response, False
+
+        record = {"_id": key, "fingerprint": fingerprint, "state": "done", "response": response}
+        self.collection.update_one({"_id": key}, {
+            "$set": {"state": "done", "response": response, "completed_at": datetime.utcnow()},
+            "$unset": {"lease_expires": ""},
+        })
+        self._cache.set(cache_key, record)
+        return response, False
+
+    def _renew_lease(self, key: str, stop: threading.Event):
+        """Push the claim's lease_expires forward every third of a lease until stop is set"""
+        while not stop.wait(self.lease / 3):
+            try:
+                now = datetime.utcnow()
+                self.collection.update_one({"_id": key, "state": "pending"},
+                                           {"$set": {"lease_expires": now + timedelta(seconds=self.lease)}})
+            except Exception as e:
+                print(f"⚠️ Could not renew idempotency lease: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._inflight)
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "conflicts": self.conflicts,
+            "in_flight": in_flight,
+        }
+
+
+idempotency_store = IdempotencyStore(idempotency_collection)
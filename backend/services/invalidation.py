@@ -0,0 +1,180 @@
+# invalidation.py
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from db import db, router
+from tenancy import SHARED_COLLECTIONS
+
+# Field each collection bumps on every write; used when change streams are unavailable
+POLL_FIELDS = {
+    "users": "updated_at",
+    "tasks": "updated_at",
+    "updates": "updated_at",
+}
+
+
+class InvalidationBus:
+    """Publishes MongoDB changes on users, tasks and updates to in-process subscribers.
+
+    One thread per collection and tenant database tails a change stream. Standalone mongod does not
+    support change streams, so on OperationFailure the thread falls back to polling
+    the collection's POLL_FIELDS field every INVALIDATION_POLL_INTERVAL seconds.
+    Polling sees deletes only as a drop in the document count, published as a
+    "delete" with no document_key, which makes registered caches clear.
+
+    Subscribers receive a change dict: collection, organization, operation,
+    document_key and document (None when the full document is not known, e.g.
+    deletes). start() is idempotent; call it again to pick up new tenants.
+
+    To exercise the change-stream path locally, run a single-node replica set:
+        mongod --replSet rs0 --dbpath /tmp/rs0 && mongosh --eval "rs.initiate()"
+    and point MONGODB_URI at mongodb://localhost:27017/?replicaSet=rs0.
+    """
+
+    def __init__(self, poll_interval: Optional[float] = None):
+        self.poll_interval = poll_interval or float(os.getenv("INVALIDATION_POLL_INTERVAL", "2"))
+        self._listeners: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {name: [] for name in POLL_FIELDS}
+        self._threads: Dict[tuple, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.mode: Dict[str, str] = {}
+        self.published = 0
+
+    def subscribe(self, collection_name: str, listener: Callable[[Dict[str, Any]], None]):
+        if collection_name not in self._listeners:
+            raise ValueError(f"Unknown collection for invalidation: {collection_name}")
+        self._listeners[collection_name].append(listener)
+
+    def register_cache(self, collection_name: str, cache, key_fn: Callable[[Dict[str, Any]], List[Any]]):
+        """Invalidate the cache keys of changed documents; clear the cache when they can't be found.
+
+        key_fn only sees the new version of a document, so keys it derived from the
+        old version (a changed email) are found through the cache's id_fn index
+        by document_key, which is also all a delete carries.
+        """
+        def listener(change):
+            document = change.get("document")
+            document_key = change.get("document_key")
+            keys = [key for key in (key_fn(document) if document else []) if key is not None]
+            if not keys and (document_key is None or cache.id_fn is None):
+                cache.clear()
+                return
+            if document_key is not None and cache.id_fn is not None:
+                cache.invalidate_document(document_key)
+            for key in keys:
+                cache.invalidate(key)
+        self.subscribe(collection_name, listener)
+
+    def publish(self, change: Dict[str, Any]):
+        self.published += 1
+        for listener in list(self._listeners.get(change["collection"], [])):
+            try:
+                listener(change)
+            except Exception as e:
+                print(f"⚠️ Invalidation listener failed for {change['collection']}: {e}")
+
+    def start(self):
+        organizations = router.organizations()
+        with self._lock:
+            for organization in organizations:
+                for name in POLL_FIELDS:
+                    if organization and name in SHARED_COLLECTIONS:
+                        continue
+                    thread = self._threads.get((organization, name))
+                    if thread and thread.is_alive():
+                        continue
+                    label = f"{name}@{organization}" if organization else name
+                    thread = threading.Thread(target=self._run, args=(name, organization),
+                                              name=f"invalidation-{label}", daemon=True)
+                    self._threads[(organization, name)] = thread
+                    thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, collection_name: str, organization: Optional[str] = None):
+        if collection_name in SHARED_COLLECTIONS:
+            collection = db[collection_name]
+        else:
+            collection = router.database(organization)[collection_name]
+        label = f"{collection_name}@{organization}" if organization else collection_name
+        try:
+            self._watch(collection, organization, label)
+        except OperationFailure as e:
+            print(f"⚠️ Change streams unavailable on {label} ({e}), polling instead")
+        except Exception as e:
+            print(f"⚠️ Change stream on {label} failed ({e}), polling instead")
+        if not self._stop.is_set():
+            self._poll(collection, organization, label)
+
+    def _watch(self, collection, organization: Optional[str], label: str):
+        self.mode[label] = "change_stream"
+        resume_token = None
+        while not self._stop.is_set():
+            try:
+                with collection.watch(full_document="updateLookup", resume_after=resume_token,
+                                      max_await_time_ms=1000) as stream:
+                    while stream.alive and not self._stop.is_set():
+                        event = stream.try_next()
+                        if event is None:
+                            continue
+                        resume_token = stream.resume_token
+                        self.publish({
+                            "collection": collection.name,
+                            "organization": organization,
+                            "operation": event.get("operationType"),
+                            "document_key": event.get("documentKey", {}).get("_id"),
+                            "document": event.get("fullDocument"),
+                        })
+            except OperationFailure:
+                raise
+            except PyMongoError as e:
+                print(f"⚠️ Change stream on {label} interrupted ({e}), resuming")
+                time.sleep(self.poll_interval)
+
+    def _poll(self, collection, organization: Optional[str], label: str):
+        self.mode[label] = "polling"
+        field = POLL_FIELDS[collection.name]
+        watermark = datetime.utcnow()
+        seen_at_watermark = set()
+        count = collection.estimated_document_count()
+        while not self._stop.wait(self.poll_interval):
+            try:
+                previous_count, count = count, collection.estimated_document_count()
+                if count < previous_count:
+                    self.publish({
+                        "collection": collection.name,
+                        "organization": organization,
+                        "operation": "delete",
+                        "document_key": None,
+                        "document": None,
+                    })
+                # $gte plus the ids already seen at the watermark, so same-millisecond writes aren't lost
+                for document in collection.find({field: {"$gte": watermark}}).sort(field, 1):
+                    if document[field] == watermark and document["_id"] in seen_at_watermark:
+                        continue
+                    if document[field] > watermark:
+                        watermark = document[field]
+                        seen_at_watermark = set()
+                    seen_at_watermark.add(document["_id"])
+                    self.publish({
+                        "collection": collection.name,
+                        "organization": organization,
+                        "operation": "update",
+                        "document_key": document.get("_id"),
+                        "document": document,
+                    })
+            except Exception as e:
+                print(f"⚠️ Polling {label} for invalidations failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return {"mode": dict(self.mode), "published": self.published}
+
+
+invalidation_bus = InvalidationBus()
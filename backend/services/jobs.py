@@ -0,0 +1,232 @@
+# jobs.py
+
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from db import db
+from services.archive import cold_archive
+from tenancy import current_organization, use_organization
+
+jobs_collection = db["jobs"]
+
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "500"))
+# Pause between batches so a large purge never saturates MongoDB
+JOB_BATCH_DELAY = float(os.getenv("JOB_BATCH_DELAY", "0.2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+# A running job whose lease lapses (worker died or restarted) is picked up again
+JOB_LEASE = float(os.getenv("JOB_LEASE", "60"))
+
+JOB_FIELDS = ("type", "organization", "params", "status", "steps", "deleted", "error",
+              "created_at", "started_at", "finished_at", "updated_at")
+
+
+def _step(collection: str, criteria: Dict[str, Any]) -> Dict[str, Any]:
+    # Filters are stored as JSON text; MongoDB field names can't safely start with "$"
+    return {"collection": collection, "filter": json.dumps(criteria), "deleted": 0, "done": False}
+
+
+def _archive_step(collection: str, keys: List[str]) -> Dict[str, Any]:
+    # Deletes from the cold archive files rather than MongoDB; runs last, after the hot documents
+    return {"collection": collection, "archive_keys": keys, "deleted": 0, "done": False}
+
+
+def enqueue_purge(job_type: str, params: Dict[str, Any], steps: List[Tuple[str, Dict[str, Any]]],
+                  archived: Optional[List[Tuple[str, List[str]]]] = None) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    job = {
+        "type": job_type,
+        # Jobs are queued in the shared database and run against the enqueuing organization's
+        "organization": current_organization(),
+        "params": params,
+        "status": "queued",
+        "steps": [_step(collection, criteria) for collection, criteria in steps]
+                 + [_archive_step(collection, keys) for collection, keys in archived or []],
+        "deleted": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    job["_id"] = jobs_collection.insert_one(job).inserted_id
+    job_worker.notify()
+    return job
+
+
+def _key_prefix(key: str) -> Dict[str, Any]:
+    # Rollup _ids are "<key>|<YYYY-MM-DD>", so an anchored prefix uses the _id index
+    return {"_id": {"$regex": f"^{re.escape(key)}\\|"}}
+
+
+def purge_user_job(username: str, email: Optional[str], full_name: Optional[str] = None) -> Dict[str, Any]:
+    """Cascade for a deleted user: their tasks, updates, chat turns, rollups and digest, archived ones included.
+
+    Updates are matched on employee_username only: display names aren't unique and
+    employee_name is whatever the client sent, so it never identifies an author here.
+    """
+    archived = [("updates", [username])]
+    steps = [
+        ("tasks", {"employee_username": username}),
+        ("updates", {"employee_username": username}),
+        ("task_rollups", _key_prefix(username)),
+        ("team_digests", {"_id": username}),
+    ]
+    if email:
+        steps.append(("sessions", {"email": email}))
+        steps.append(("chat_sessions", {"username": email}))
+        # Usage is recorded per chat user, which is the email
+        steps.append(("usage_rollups", _key_prefix(email)))
+        archived.append(("chat_sessions", [email]))
+    return enqueue_purge("purge_user", {"username": username, "email": email, "full_name": full_name},
+                         steps, archived)
+
+
+def clear_chat_job(email: str) -> Dict[str, Any]:
+    return enqueue_purge("clear_chat", {"username": email}, [("chat_sessions", {"username": email})],
+                         [("chat_sessions", [email])])
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    if not ObjectId.is_valid(job_id):
+        return None
+    # Same tenant scoping as list_jobs: a job id alone doesn't reveal another organization's job
+    return jobs_collection.find_one({"_id": ObjectId(job_id), "organization": current_organization()})
+
+
+def list_jobs(status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    criteria: Dict[str, Any] = {"organization": current_organization()}
+    if status:
+        criteria["status"] = status
+    return list(jobs_collection.find(criteria).sort("created_at", -1).limit(limit))
+
+
+def job_progress(job: Dict[str, Any]) -> Dict[str, Any]:
+    steps = job.get("steps", [])
+    return {
+        "job_id": str(job["_id"]),
+        **{field: job.get(field) for field in JOB_FIELDS if field != "steps"},
+        "steps": [{"collection": s["collection"], "archive": "archive_keys" in s, "deleted": s["deleted"],
+                   "done": s["done"]} for s in steps],
+        "steps_done": sum(1 for s in steps if s["done"]),
+        "steps_total": len(steps),
+    }
+
+
+class JobWorker:
+    """Runs purge jobs one at a time in throttled batches of JOB_BATCH_SIZE documents.
+
+    Progress is written to the job document after every batch, and a claimed job
+    holds a lease that each batch renews. If the process restarts mid-job the lease
+    lapses and whichever worker polls next resumes from the remaining documents;
+    each batch just deletes whatever still matches, so re-running is safe.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+            self._thread.start()
+            print(f"✅ Job worker started (batches of {JOB_BATCH_SIZE}, {JOB_BATCH_DELAY}s apart)")
+
+    def notify(self):
+        self._wake.set()
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return jobs_collection.find_one_and_update(
+            {"$or": [{"status": "queued"}, {"status": "running", "lease_expires": {"$lt": now}}]},
+            {"$set": {"status": "running", "lease_owner": self.owner,
+                      "lease_expires": now + timedelta(seconds=JOB_LEASE), "updated_at": now}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _renew(self, job_id, updates: Dict[str, Any], inc: Optional[Dict[str, int]] = None) -> bool:
+        """Persist progress; False when another worker has taken the job over"""
+        now = datetime.utcnow()
+        change: Dict[str, Any] = {"$set": {**updates, "updated_at": now,
+                                           "lease_expires": now + timedelta(seconds=JOB_LEASE)}}
+        if inc:
+            change["$inc"] = inc
+        result = jobs_collection.update_one({"_id": job_id, "lease_owner": self.owner}, change)
+        return result.matched_count == 1
+
+    def run_job(self, job: Dict[str, Any]):
+        job_id = job["_id"]
+        if not job.get("started_at"):
+            self._renew(job_id, {"started_at": datetime.utcnow()})
+        print(f"🧹 Running {job['type']} job {job_id}")
+        for index, step in enumerate(job["steps"]):
+            if step["done"]:
+                continue
+            if "archive_keys" in step:
+                deleted = cold_archive.forget(step["collection"], step["archive_keys"])
+                if not self._renew(job_id, {f"steps.{index}.done": True},
+                                   {f"steps.{index}.deleted": deleted, "deleted": deleted}):
+                    print(f"⚠️ Lost the lease on job {job_id}, stopping")
+                    return
+                continue
+            collection = db[step["collection"]]
+            criteria = json.loads(step["filter"])
+            while True:
+                ids = [doc["_id"] for doc in collection.find(criteria, {"_id": 1}).limit(JOB_BATCH_SIZE)]
+                if not ids:
+                    break
+                deleted = collection.delete_many({"_id": {"$in": ids}}).deleted_count
+                if not self._renew(job_id, {}, {f"steps.{index}.deleted": deleted, "deleted": deleted}):
+                    print(f"⚠️ Lost the lease on job {job_id}, stopping")
+                    return
+                if len(ids) < JOB_BATCH_SIZE:
+                    break
+                time.sleep(JOB_BATCH_DELAY)
+            self._renew(job_id, {f"steps.{index}.done": True})
+
+        now = datetime.utcnow()
+        jobs_collection.update_one({"_id": job_id, "lease_owner": self.owner}, {
+            "$set": {"status": "done", "finished_at": now, "updated_at": now},
+            "$unset": {"lease_owner": "", "lease_expires": ""},
+        })
+        print(f"✅ Job {job_id} finished")
+
+    def run_pending(self) -> int:
+        handled = 0
+        while True:
+            job = self._claim()
+            if not job:
+                return handled
+            try:
+                with use_organization(job.get("organization")):
+                    self.run_job(job)
+            except Exception as e:
+                print(f"❌ Job {job['_id']} failed: {e}")
+                jobs_collection.update_one({"_id": job["_id"], "lease_owner": self.owner}, {
+                    "$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()},
+                    "$unset": {"lease_owner": "", "lease_expires": ""},
+                })
+            handled += 1
+
+    def _run(self):
+        while True:
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"⚠️ Job polling failed: {e}")
+            self._wake.wait(JOB_POLL_INTERVAL)
+            self._wake.clear()
+
+
+job_worker = JobWorker()
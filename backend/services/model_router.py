@@ -0,0 +1,119 @@
+# model_router.py
+
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from services.resilience import CircuitBreaker, LatencyTracker
+
+# Preferred Gemini model names per tier, first available wins
+MODEL_TIERS = {
+    "fast": ["gemini-1.5-flash-latest", "gemini-1.5-flash"],
+    "large": ["gemini-1.5-pro-latest", "gemini-1.5-pro"],
+}
+
+REASONING_HINTS = (
+    "why", "explain", "analy", "compare", "plan", "prioriti", "summar", "strategy",
+    "recommend", "should i", "how should", "pros and cons", "trade-off", "tradeoff",
+    "review", "draft", "write", "step by step", "root cause"
+)
+MAX_FAST_CHARS = int(os.getenv("LLM_ROUTER_MAX_FAST_CHARS", "280"))
+ERROR_WINDOW = 20
+MAX_ERROR_RATE = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5"))
+
+
+class ModelTier:
+    def __init__(self, name: str, model):
+        self.name = name
+        self.model = model
+        self.model_name = getattr(model, "model_name", name)
+        self.breaker = CircuitBreaker(
+            f"gemini-{name}",
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+        )
+        self.latency = LatencyTracker()
+        self._outcomes = deque(maxlen=ERROR_WINDOW)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def record(self, ok: bool, seconds: Optional[float] = None):
+        with self._lock:
+            self._outcomes.append(0 if ok else 1)
+            self.requests += 1
+        if ok:
+            self.breaker.record_success()
+            if seconds is not None:
+                self.latency.record(seconds)
+        else:
+            self.breaker.record_failure()
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def healthy(self) -> bool:
+        if self.breaker.is_open():
+            return False
+        with self._lock:
+            enough = len(self._outcomes) >= 5
+        return not enough or self.error_rate() <= MAX_ERROR_RATE
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "requests": self.requests,
+            "error_rate": round(self.error_rate(), 2),
+            "healthy": self.healthy(),
+            "circuit_breaker": self.breaker.status(),
+            "latency": self.latency.status(),
+        }
+
+
+class ModelRouter:
+    """Sends simple requests to the fast model and reasoning-heavy ones to the large model.
+
+    Both models stay initialized; each keeps its own rolling latency, error rate and
+    circuit breaker, and an unhealthy preferred model fails over to the other one.
+    """
+
+    def __init__(self):
+        self.tiers: Dict[str, ModelTier] = {}
+        self.routed = {"fast": 0, "large": 0}
+
+    def register(self, tier: str, model):
+        self.tiers[tier] = ModelTier(tier, model)
+
+    def clear(self):
+        self.tiers = {}
+
+    @staticmethod
+    def classify(message: str, role: str) -> str:
+        text = message.lower().strip()
+        if len(text) > MAX_FAST_CHARS or text.count("?") > 1:
+            return "large"
+        if any(hint in text for hint in REASONING_HINTS):
+            return "large"
+        return "fast"
+
+    def candidates(self, message: str, role: str) -> List[ModelTier]:
+        """Tiers to try in order: the classified tier first, healthy tiers before unhealthy ones"""
+        preferred = self.classify(message, role)
+        order = [preferred] + [t for t in ("fast", "large") if t != preferred]
+        tiers = [self.tiers[t] for t in order if t in self.tiers]
+        if tiers:
+            self.routed[tiers[0].name] = self.routed.get(tiers[0].name, 0) + 1
+        return sorted(tiers, key=lambda t: not t.healthy())
+
+    def all_open(self) -> bool:
+        return bool(self.tiers) and all(t.breaker.is_open() for t in self.tiers.values())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "routed": dict(self.routed),
+            "models": {name: tier.status() for name, tier in self.tiers.items()},
+        }
+
+
+model_router = ModelRouter()
@@ -0,0 +1,360 @@
+# push.py
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+
+from db import router, tasks_collection, updates_collection
+from serialization import dumps
+from services.cache import LocalCache
+from services.digests import team_members, update_author
+from tenancy import current_organization, use_organization
+
+PUSH_QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "256"))
+PUSH_HEARTBEAT = float(os.getenv("PUSH_HEARTBEAT", "15"))
+PUSH_REPLAY_LIMIT = int(os.getenv("PUSH_REPLAY_LIMIT", "500"))
+# Each stream on the Flask /stream route holds a gunicorn thread; keep enough of the 32 free for
+# regular requests. push_server.py serves streams without threads and has its own, much larger cap
+PUSH_MAX_CONNECTIONS = int(os.getenv("PUSH_MAX_CONNECTIONS", "16"))
+# Streams end after this long and the browser reconnects with Last-Event-ID, so threads rotate
+PUSH_MAX_STREAM_SECONDS = float(os.getenv("PUSH_MAX_STREAM_SECONDS", "300"))
+_NO_ID = ObjectId(b"\x00" * 12)
+
+UPDATE_EVENT_FIELDS = ("employee_username", "employee_name", "content", "update_text", "timestamp", "extracted")
+TASK_EVENT_FIELDS = ("employee_username", "title", "status", "priority", "assigned_manager", "updated_at", "due_date")
+
+_COLLECTIONS = {"updates": updates_collection, "tasks": tasks_collection}
+# Field event ids are ordered by. Updates are pushed once, when submitted; the invalidation bus
+# also reports their later rewrites (extraction, merges), which map to the same id and are skipped
+EVENT_ORDER_FIELDS = {"updates": "timestamp", "tasks": "updated_at"}
+_EVENT_NAMES = {"updates": "update", "tasks": "task"}
+
+
+def event_id(collection_name: str, document: Dict[str, Any]) -> Optional[str]:
+    """Resume token: the event time plus _id, ordered across both collections"""
+    stamp = document.get(EVENT_ORDER_FIELDS[collection_name])
+    if not isinstance(stamp, datetime):
+        return None
+    return f"{stamp.isoformat()}~{document['_id']}"
+
+
+def parse_event_id(value: str) -> Tuple[datetime, ObjectId]:
+    """Raises ValueError for tokens this server didn't issue"""
+    stamp, _, oid = value.partition("~")
+    if not ObjectId.is_valid(oid):
+        raise ValueError(f"Invalid event id: {value}")
+    return datetime.fromisoformat(stamp), ObjectId(oid)
+
+
+class PushHubFull(Exception):
+    """Every stream slot in this process is taken"""
+
+
+class _Subscriber:
+    def __init__(self, manager_username: str, organization: Optional[str] = None):
+        self.manager_username = manager_username
+        self.organization = organization
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=PUSH_QUEUE_SIZE)
+        # Set when the client fell too far behind; it reconnects and catches up from the database
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Queue an event from the invalidation bus thread; False when the queue is full"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+
+class _AsyncSubscriber(_Subscriber):
+    """A subscriber whose frames are written by an asyncio event loop instead of a thread"""
+
+    def __init__(self, manager_username: str, organization: Optional[str], loop: asyncio.AbstractEventLoop):
+        super().__init__(manager_username, organization)
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=PUSH_QUEUE_SIZE)
+        self._loop = loop
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        if self.queue.full():
+            return False
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # Loop already closed; the stream is going away
+        return True
+
+    def _put(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class _Cursor:
+    """Where one connection stands: the id a reconnect resumes from, and what replay already sent"""
+
+    def __init__(self, last_event_id: Optional[str]):
+        started = datetime.utcnow()
+        # MongoDB keeps milliseconds, so round down or writes in this millisecond would sort before it
+        started = started.replace(microsecond=started.microsecond // 1000 * 1000)
+        self.resume_from = last_event_id or f"{started.isoformat()}~{_NO_ID}"
+        self.delivered: Optional[str] = None
+
+    def replayed(self, event: Dict[str, Any]):
+        self.delivered = self.resume_from = event["id"]
+
+    def accept(self, event: Dict[str, Any]) -> bool:
+        """Whether a live event should be sent; events can arrive out of order across collections"""
+        if self.delivered and parse_event_id(event["id"]) <= parse_event_id(self.delivered):
+            return False
+        if parse_event_id(event["id"]) > parse_event_id(self.resume_from):
+            self.resume_from = event["id"]
+        return True
+
+    def goodbye(self) -> str:
+        # An id-only frame sets the browser's Last-Event-ID without firing an event
+        return f"id: {self.resume_from}\n: reconnect\n\n"
+
+
+CONNECTED_FRAME = "retry: 3000\n: connected\n\n"
+KEEP_ALIVE_FRAME = ": keep-alive\n\n"
+
+
+class PushHub:
+    """In-process fan-out of new updates and task changes to connected managers.
+
+    Fed by the invalidation bus (change streams, or polling on standalone mongod).
+    Subscribers are plain bounded queues. stream() is for the Flask route, where
+    each open stream also holds a gthread worker thread, so the web process caps it
+    at PUSH_MAX_CONNECTIONS; astream() runs on push_server.py's event loop, where an
+    idle stream is just a queue and a socket. Resuming replays from
+    MongoDB with indexed range scans on updates.timestamp and tasks.updated_at,
+    which works no matter which worker handled the earlier connection.
+    """
+
+    def __init__(self, max_connections: int = PUSH_MAX_CONNECTIONS, max_lifetime: float = PUSH_MAX_STREAM_SECONDS):
+        self.max_connections = max_connections
+        self.max_lifetime = max_lifetime
+        self._subscribers: List[_Subscriber] = []
+        self._lock = threading.Lock()
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._teams = LocalCache("push_teams", maxsize=1024, ttl=float(os.getenv("PUSH_TEAM_TTL", "60")))
+        self.published = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def attach(self, bus):
+        for collection_name in _COLLECTIONS:
+            bus.subscribe(collection_name, self._on_change)
+
+    def _team(self, manager_username: str) -> Optional[set]:
+        members = self._teams.get_or_load(manager_username, lambda: team_members(manager_username) or "all")
+        return None if members == "all" else set(members)
+
+    def relevant(self, manager_username: str, collection_name: str, document: Dict[str, Any]) -> bool:
+        if collection_name == "tasks":
+            return document.get("assigned_manager") == manager_username
+        members = self._team(manager_username)
+        return members is None or update_author(document) in members
+
+    @staticmethod
+    def to_event(collection_name: str, document: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        token = event_id(collection_name, document)
+        if token is None:
+            return None
+        fields = UPDATE_EVENT_FIELDS if collection_name == "updates" else TASK_EVENT_FIELDS
+        data = {"_id": document["_id"], **{f: document[f] for f in fields if f in document}}
+        return {"id": token, "event": _EVENT_NAMES[collection_name], "collection": collection_name, "data": data}
+
+    def _on_change(self, change: Dict[str, Any]):
+        document = change.get("document")
+        if not document:
+            return
+        event = self.to_event(change["collection"], document)
+        if event is None:
+            return
+        with self._lock:
+            # Rewrites of an update keep its timestamp, so each update is pushed once
+            if event["id"] in self._recent:
+                return
+            self._recent[event["id"]] = None
+            if len(self._recent) > 4096:
+                self._recent.popitem(last=False)
+            subscribers = list(self._subscribers)
+        self.published += 1
+        source = router.route(change.get("organization"))
+        for subscriber in subscribers:
+            if subscriber.overflowed or router.route(subscriber.organization) != source:
+                continue
+            with use_organization(subscriber.organization):
+                if not self.relevant(subscriber.manager_username, change["collection"], document):
+                    continue
+            if not subscriber.offer(event):
+                subscriber.overflowed = True
+                self.dropped += 1
+
+    def replay(self, manager_username: str, last_event_id: str) -> List[Dict[str, Any]]:
+        """Events after last_event_id, oldest first, read back from MongoDB"""
+        stamp, oid = parse_event_id(last_event_id)
+        events = []
+        for collection_name, collection in _COLLECTIONS.items():
+            field = EVENT_ORDER_FIELDS[collection_name]
+            criteria: Dict[str, Any] = {"$or": [{field: {"$gt": stamp}}, {field: stamp, "_id": {"$gt": oid}}]}
+            if collection_name == "tasks":
+                criteria["assigned_manager"] = manager_username
+            for document in collection.find(criteria).sort([(field, 1), ("_id", 1)]).limit(PUSH_REPLAY_LIMIT):
+                if self.relevant(manager_username, collection_name, document):
+                    event = self.to_event(collection_name, document)
+                    if event:
+                        events.append((document[field], document["_id"], event))
+        events.sort(key=lambda item: (item[0], item[1]))
+        return [event for _, _, event in events[:PUSH_REPLAY_LIMIT]]
+
+    def _add(self, subscriber: _Subscriber):
+        # Subscribe before replaying so nothing written in between is missed
+        with self._lock:
+            if len(self._subscribers) >= self.max_connections:
+                self.rejected += 1
+                raise PushHubFull()
+            self._subscribers.append(subscriber)
+
+    def _detach(self, subscriber: _Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _replay_for(self, subscriber: _Subscriber, last_event_id: str) -> List[Dict[str, Any]]:
+        with use_organization(subscriber.organization):
+            return self.replay(subscriber.manager_username, last_event_id)
+
+    def stream(self, manager_username: str, last_event_id: Optional[str] = None) -> "_Stream":
+        """Server-sent event frames for one connection, until the client disconnects or
+        the stream reaches its lifetime; raises PushHubFull when no slot is free"""
+        # Bound now: the frames run after the view has returned
+        subscriber = _Subscriber(manager_username, current_organization())
+        self._add(subscriber)
+        return _Stream(self, subscriber, self._frames(subscriber, last_event_id))
+
+    def astream(self, manager_username: str, organization: Optional[str],
+                last_event_id: Optional[str] = None) -> "_AsyncStream":
+        """stream() for an asyncio server; call it from the event loop that iterates the frames"""
+        subscriber = _AsyncSubscriber(manager_username, organization, asyncio.get_running_loop())
+        self._add(subscriber)
+        return _AsyncStream(self, subscriber, self._aframes(subscriber, last_event_id))
+
+    def _frames(self, subscriber: _Subscriber, last_event_id: Optional[str]) -> Iterator[str]:
+        cursor = _Cursor(last_event_id)
+        deadline = time.monotonic() + self.max_lifetime
+        try:
+            yield CONNECTED_FRAME
+            if last_event_id:
+                for event in self._replay_for(subscriber, last_event_id):
+                    cursor.replayed(event)
+                    yield self.format(event)
+            while True:
+                if subscriber.overflowed:
+                    yield self.reset_frame()
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield cursor.goodbye()
+                    return
+                try:
+                    event = subscriber.queue.get(timeout=min(PUSH_HEARTBEAT, remaining))
+                except queue.Empty:
+                    yield KEEP_ALIVE_FRAME
+                    continue
+                if cursor.accept(event):
+                    yield self.format(event)
+        finally:
+            self._detach(subscriber)
+
+    async def _aframes(self, subscriber: _AsyncSubscriber, last_event_id: Optional[str]) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        cursor = _Cursor(last_event_id)
+        deadline = loop.time() + self.max_lifetime
+        try:
+            yield CONNECTED_FRAME
+            if last_event_id:
+                # The replay queries block, so they run on the loop's thread pool
+                replayed = await loop.run_in_executor(None, self._replay_for, subscriber, last_event_id)
+                for event in replayed:
+                    cursor.replayed(event)
+                    yield self.format(event)
+            while True:
+                if subscriber.overflowed:
+                    yield self.reset_frame()
+                    return
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    yield cursor.goodbye()
+                    return
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), min(PUSH_HEARTBEAT, remaining))
+                except asyncio.TimeoutError:
+                    yield KEEP_ALIVE_FRAME
+                    continue
+                if cursor.accept(event):
+                    yield self.format(event)
+        finally:
+            self._detach(subscriber)
+
+    def reset_frame(self) -> str:
+        return self.format({"event": "reset", "data": {"reason": "client fell behind, reconnect to resume"}})
+
+    @staticmethod
+    def format(event: Dict[str, Any]) -> str:
+        frame = ""
+        if event.get("id"):
+            frame += f"id: {event['id']}\n"
+        frame += f"event: {event['event']}\ndata: {dumps(event['data']).decode('utf-8')}\n\n"
+        return frame
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            connections = len(self._subscribers)
+        return {"connections": connections, "max_connections": self.max_connections,
+                "published": self.published, "dropped": self.dropped, "rejected": self.rejected}
+
+
+class _Stream:
+    """The response body for one connection; close() frees its slot even if no frame was sent"""
+
+    def __init__(self, hub: PushHub, subscriber: _Subscriber, frames: Iterator[str]):
+        self._hub = hub
+        self._subscriber = subscriber
+        self._frames = frames
+
+    def __iter__(self):
+        return self._frames
+
+    def close(self):
+        self._frames.close()
+        self._hub._detach(self._subscriber)
+
+
+class _AsyncStream:
+    """_Stream for astream(); aclose() frees the slot even if the frames were never started"""
+
+    def __init__(self, hub: PushHub, subscriber: _AsyncSubscriber, frames: AsyncIterator[str]):
+        self._hub = hub
+        self._subscriber = subscriber
+        self._frames = frames
+
+    def __aiter__(self):
+        return self._frames
+
+    async def aclose(self):
+        await self._frames.aclose()
+        self._hub._detach(self._subscriber)
+
+
+push_hub = PushHub()
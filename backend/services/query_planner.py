@@ -0,0 +1,105 @@
+# query_planner.py
+
+from typing import List, Dict, Any, Optional, Tuple
+
+from pymongo import TEXT
+
+
+class QueryPlan:
+    """Chosen index for a filter/sort combination plus what it doesn't cover"""
+
+    def __init__(self, index_name: Optional[str], keys: List[str], residual: List[str], sort_covered: bool,
+                 filters_bounded: bool = True):
+        self.index_name = index_name
+        self.keys = keys
+        self.residual = residual
+        self.sort_covered = sort_covered
+        # False when the index only serves the sort and every filter is checked across the whole index
+        self.filters_bounded = filters_bounded
+
+    @property
+    def is_collection_scan(self) -> bool:
+        return self.index_name is None
+
+    @property
+    def scans_everything(self) -> bool:
+        return self.is_collection_scan or not self.filters_bounded
+
+    @property
+    def warnings(self) -> List[str]:
+        if self.is_collection_scan:
+            return ["no declared index matches this filter combination; the query scans the whole collection"]
+        warnings = []
+        if not self.filters_bounded:
+            warnings.append(f"the {self.index_name} index only serves the sort; filters scan the entire index")
+        if self.residual:
+            warnings.append(f"filters on {', '.join(self.residual)} are applied after the {self.index_name} index scan")
+        if not self.sort_covered:
+            warnings.append("sort is not backed by the index and happens in memory")
+        return warnings
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index_name,
+            "keys": self.keys,
+            "residual_filters": self.residual,
+            "sort_covered": self.sort_covered,
+            "scans_everything": self.scans_everything,
+            "warnings": self.warnings,
+        }
+
+
+def _score_index(keys: List[str], equality: set, ranges: set, sort_field: Optional[str]) -> Tuple[tuple, List[str], bool]:
+    """Walk index keys in Equality-Sort-Range order and report how much of the query they serve"""
+    used: List[str] = []
+    eq_matched = 0
+    sort_covered = sort_field is None
+    range_matched = 0
+    position = 0
+
+    while position < len(keys) and keys[position] in equality:
+        used.append(keys[position])
+        eq_matched += 1
+        position += 1
+    if sort_field and position < len(keys) and keys[position] == sort_field:
+        sort_covered = True
+        if sort_field in ranges:
+            range_matched += 1
+        used.append(keys[position])
+        position += 1
+    if position < len(keys) and keys[position] in ranges and keys[position] not in used:
+        used.append(keys[position])
+        range_matched += 1
+
+    # Fields later in the index can still be checked against index keys without fetching documents
+    in_index = set(keys)
+    residual = sorted((equality | ranges) - set(used) - in_index)
+    usable = bool(used)
+    score = (usable, eq_matched + range_matched > 0, eq_matched, sort_covered, range_matched, -len(residual), -len(keys))
+    return score, residual, sort_covered
+
+
+def plan_query(indexes: List[Tuple[List[Tuple[str, Any]], Dict[str, Any]]], equality: List[str],
+               ranges: List[str], sort_field: Optional[str] = None) -> QueryPlan:
+    """Pick the declared index that best serves the query.
+
+    `indexes` are (keys, options) pairs as declared in db.INDEXES. A plan with no
+    index means MongoDB would have to scan the collection.
+    """
+    equality_set, range_set = set(equality), set(ranges)
+    best = None
+    for keys, options in indexes:
+        if any(direction == TEXT for _, direction in keys):
+            continue
+        key_names = [name for name, _ in keys]
+        score, residual, sort_covered = _score_index(key_names, equality_set, range_set, sort_field)
+        if not score[0]:
+            continue
+        if best is None or score > best[0]:
+            best = (score, options.get("name"), key_names, residual, sort_covered)
+
+    if best is None:
+        return QueryPlan(None, [], sorted(equality_set | range_set), sort_field is None)
+    score, name, key_names, residual, sort_covered = best
+    filters_bounded = score[1] or not (equality_set or range_set)
+    return QueryPlan(name, key_names, residual, sort_covered, filters_bounded)
@@ -0,0 +1,191 @@
+# resilience.py
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from services.admission import AdmissionRejected, admission
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Classic closed -> open -> half-open breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and callers
+    should skip the dependency. Once `reset_timeout` seconds pass, a single probe
+    call is let through (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.trips = 0
+
+    def is_open(self) -> bool:
+        """True while calls should be skipped (open and not yet due for a probe)"""
+        with self._lock:
+            if self._state == "open":
+                return time.monotonic() - self._opened_at < self.reset_timeout
+            return self._state == "half_open" and self._probe_in_flight
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = "half_open"
+            if self._state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != "closed":
+                print(f"✅ Circuit '{self.name}' closed again")
+            self._state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.trips += 1
+                    print(f"⚠️ Circuit '{self.name}' opened after {self._failures} consecutive failures")
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self._state == "open":
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self.trips,
+                "probe_in": round(retry_in, 1) if retry_in is not None else None,
+            }
+
+
+class LatencyTracker:
+    """Rolling window of call latencies (seconds)"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def __len__(self):
+        return len(self._samples)
+
+    def status(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": len(self),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+        }
+
+
+LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", "16"))
+# Timed-out calls still occupy a pool thread until the SDK returns; past this many, new calls are shed
+LLM_MAX_ABANDONED = int(os.getenv("LLM_MAX_ABANDONED", str(LLM_EXECUTOR_WORKERS // 2)))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_EXECUTOR_WORKERS, thread_name_prefix="llm-call")
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+def abandoned_calls() -> int:
+    """Calls the caller stopped waiting for that are still running in the pool"""
+    return _abandoned
+
+
+def _reclaim(_future):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+
+def _abandon(futures: Iterable):
+    global _abandoned
+    for future in futures:
+        with _abandoned_lock:
+            _abandoned += 1
+        future.add_done_callback(_reclaim)
+
+
+def call_with_deadline(fn: Callable[[], Any], timeout: float, hedge_after: Optional[float] = None) -> Any:
+    """Run fn with a deadline; optionally start a hedged duplicate if it's still running after hedge_after seconds.
+
+    The first successful result wins. Calls that miss the deadline (and losing hedges) keep
+    running in the background pool but the caller stops waiting for them. They're counted
+    until they finish, and once LLM_MAX_ABANDONED are outstanding new calls are rejected
+    with AdmissionRejected instead of queueing behind them.
+    """
+    if _abandoned >= LLM_MAX_ABANDONED:
+        admission.record("shed_abandoned")
+        raise AdmissionRejected("upstream calls still running after their deadline", timeout)
+
+    deadline = time.monotonic() + timeout
+    pending = {_executor.submit(fn)}
+    hedged = False
+    last_error = None
+
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait_for = remaining
+            if hedge_after is not None and not hedged:
+                wait_for = min(remaining, max(hedge_after - (timeout - remaining), 0))
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+
+            if hedge_after is not None and not hedged and time.monotonic() < deadline:
+                if (not done or not pending) and _abandoned < LLM_MAX_ABANDONED:
+                    # Still slow (or the first attempt failed): fire the hedge
+                    pending.add(_executor.submit(fn))
+                    hedged = True
+
+        if last_error is not None and not pending:
+            raise last_error
+        raise DeadlineExceeded(f"call exceeded {timeout:.1f}s deadline")
+    finally:
+        _abandon(future for future in pending if not future.done())
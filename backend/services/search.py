@@ -0,0 +1,86 @@
+# search.py
+
+import operator
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from db import tasks_collection, updates_collection
+
+MAX_PAGE_SIZE = 100
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO date/datetime query parameter, raising ValueError on bad input"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def parse_date_range(value_from: Optional[str], value_to: Optional[str]) -> Dict[str, datetime]:
+    """$gte/$lte criteria for from/to query parameters, raising ValueError on bad input.
+
+    A date-only `to` (2024-05-31) means the whole of that day, so it becomes
+    `$lt` the following midnight rather than `$lte` midnight.
+    """
+    criteria: Dict[str, datetime] = {}
+    date_from = parse_date(value_from)
+    if date_from:
+        criteria["$gte"] = date_from
+    date_to = parse_date(value_to)
+    if date_to:
+        if "T" in value_to or " " in value_to:
+            criteria["$lte"] = date_to
+        else:
+            criteria["$lt"] = date_to + timedelta(days=1)
+    return criteria
+
+
+_RANGE_OPERATORS = {"$gte": operator.ge, "$lte": operator.le, "$lt": operator.lt}
+
+
+def in_range(value: datetime, criteria: Dict[str, datetime]) -> bool:
+    """Apply parse_date_range criteria in Python, e.g. to archived documents"""
+    return all(_RANGE_OPERATORS[op](value, bound) for op, bound in criteria.items())
+
+
+def _search(collection, query: str, filters: Dict[str, Any], page: int, page_size: int) -> Dict[str, Any]:
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    criteria = {"$text": {"$search": query}, **filters}
+    projection = {"score": {"$meta": "textScore"}}
+
+    cursor = (collection.find(criteria, projection)
+              .sort([("score", {"$meta": "textScore"})])
+              .skip((page - 1) * page_size)
+              .limit(page_size))
+    results = list(cursor)
+    total = collection.count_documents(criteria)
+
+    return {
+        "results": results,
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "has_more": page * page_size < total,
+    }
+
+
+def search_updates(query: str, employee: Optional[str] = None, date_range: Optional[Dict[str, datetime]] = None,
+                   page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+    filters: Dict[str, Any] = {}
+    if employee:
+        # Chat-submitted updates carry employee_username, /submit-update ones only employee_name
+        filters["$or"] = [{"employee_username": employee}, {"employee_name": employee}]
+    if date_range:
+        filters["timestamp"] = date_range
+    return _search(updates_collection, query, filters, page, page_size)
+
+
+def search_tasks(query: str, employee: Optional[str] = None, date_range: Optional[Dict[str, datetime]] = None,
+                 page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+    filters: Dict[str, Any] = {}
+    if employee:
+        filters["employee_username"] = employee
+    if date_range:
+        filters["created_at"] = date_range
+    return _search(tasks_collection, query, filters, page, page_size)
@@ -0,0 +1,74 @@
+# sessions.py
+
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from db import db
+from services.cache import LocalCache
+
+# Shared database: a session is looked up before the request knows its organization
+sessions_collection = db["sessions"]
+
+SESSION_TTL_HOURS = float(os.getenv("SESSION_TTL_HOURS", "168"))
+# A logout in another process takes at most this long to reach this one
+_session_cache = LocalCache("sessions", maxsize=4096, ttl=float(os.getenv("SESSION_CACHE_TTL", "60")))
+
+
+def _token_id(token: str) -> str:
+    # Only a hash of the token is stored, so a leaked sessions collection can't be replayed
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def create_session(user: Dict[str, Any]) -> str:
+    """Start a session for a logged-in user; returns the bearer token.
+
+    The session carries the user's organization, which is what binds later
+    requests to a tenant database.
+    """
+    token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    sessions_collection.insert_one({
+        "_id": _token_id(token),
+        "email": user.get("email"),
+        "username": user.get("username"),
+        "organization": user.get("organization"),
+        "created_at": now,
+        "expires_at": now + timedelta(hours=SESSION_TTL_HOURS),
+    })
+    return token
+
+
+def get_session(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The live session for a bearer token, or None"""
+    if not token:
+        return None
+    key = _token_id(token)
+    session = _session_cache.get_or_load(key, lambda: sessions_collection.find_one({"_id": key}))
+    if not session or session["expires_at"] <= datetime.utcnow():
+        return None
+    return session
+
+
+def end_session(token: str) -> bool:
+    key = _token_id(token)
+    _session_cache.invalidate(key)
+    return sessions_collection.delete_one({"_id": key}).deleted_count == 1
+
+
+def request_session(request):
+    """Session for init_tenancy: None without a token, False for a token that isn't live"""
+    token = bearer_token(request)
+    if token is None:
+        return None
+    return get_session(token) or False
+
+
+def bearer_token(request) -> Optional[str]:
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        return header[len("Bearer "):].strip() or None
+    # EventSource can't set headers, so /stream passes the token in the query string
+    return request.args.get("access_token") or None
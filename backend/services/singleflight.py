@@ -0,0 +1,79 @@
+# singleflight.py
+
+import hashlib
+import re
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one upstream call.
+
+    The first caller for a key runs the function; callers arriving while it is in
+    flight block and receive the same result (or exception). Nothing is cached once
+    the call finishes. Coalescing is per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _Call] = {}
+        self.calls = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Key over whitespace/case-normalized parts"""
+        normalized = [re.sub(r"\s+", " ", (part or "").strip().lower()) for part in parts]
+        return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per in-flight key. Returns (result, shared) where shared means another caller's result was reused."""
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._inflight[key] = call
+                self.upstream_calls += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
+
+
+llm_flight = SingleFlight()
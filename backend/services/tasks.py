@@ -0,0 +1,47 @@
+# tasks.py
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from models.task import Task
+from services.analytics import record_change
+
+
+def create_task(task_data: Dict[str, Any]):
+    """Insert a task and count it in the analytics rollups"""
+    result = Task.create_task(task_data)
+    record_change(None, task_data)
+    return result
+
+
+def update_task_status(task_id, status: str, completion_date: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Change a task's status and move its completion in the rollups; returns the task as it
+    was before, or None if it doesn't exist or already had that status"""
+    if status == "completed":
+        # Stamped here rather than in the model so the rollups see the exact date that was stored
+        completion_date = completion_date or datetime.utcnow()
+    previous = Task.update_task_status(task_id, status, completion_date)
+    if previous:
+        current = {**previous, "status": status}
+        if status == "completed":
+            current["completion_date"] = completion_date
+        else:
+            current.pop("completion_date", None)
+        record_change(previous, current)
+    return previous
+
+
+def update_task(task_id, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Set fields on a task, moving its counts when the assignee, status or dates change"""
+    previous = Task.update_task(task_id, update_data)
+    if previous:
+        record_change(previous, {**previous, **update_data})
+    return previous
+
+
+def delete_task(task_id) -> Optional[Dict[str, Any]]:
+    """Delete a task and take it back out of the rollups"""
+    deleted = Task.delete_task(task_id)
+    if deleted:
+        record_change(deleted, None)
+    return deleted
@@ -0,0 +1,198 @@
+# usage.py
+
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from db import db
+from services.resilience import call_with_deadline
+
+usage_rollups_collection = db["usage_rollups"]
+
+# How a chat turn was answered
+BRANCHES = ("llm", "cached", "command", "rule_based")
+PHASES = ("db", "llm", "persist")
+# Budget for asking the model to count a turn's tokens when its response carries no usage
+COUNT_TOKENS_TIMEOUT = float(os.getenv("COUNT_TOKENS_TIMEOUT", "2"))
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text; used when the SDK reports no usage
+    return (len(text) + 3) // 4 if text else 0
+
+
+def count_tokens(model, prompt: str, text: str) -> Optional[Tuple[int, int]]:
+    """(prompt, response) token counts from the model's countTokens endpoint, or None if it fails.
+
+    google-generativeai 0.3.x responses have no usage_metadata, but GenerativeModel
+    already has count_tokens there.
+    """
+    try:
+        return call_with_deadline(lambda: (model.count_tokens(prompt).total_tokens,
+                                           model.count_tokens(text).total_tokens), COUNT_TOKENS_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ Token count failed: {e}")
+        return None
+
+
+def _model_key(model_name: str) -> str:
+    # Rollup counters are keyed by model; field names can't contain dots
+    return model_name.replace("models/", "").replace(".", "_")
+
+
+class TurnUsage:
+    """Branch, model, token counts and per-phase timings for one chat turn"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.branch = "rule_based"
+        self.handler: Optional[str] = None
+        self.model: Optional[str] = None
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.estimated = False
+        self.timings: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+
+    @contextmanager
+    def timed(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] += (time.perf_counter() - started) * 1000
+
+    def record_llm(self, model_name: str, usage_metadata, prompt: str, text: str, model=None):
+        """Take token counts from the Gemini response; without them ask `model` to count
+        the turn, and estimate only if that fails too"""
+        self.model = model_name
+        prompt_tokens = getattr(usage_metadata, "prompt_token_count", None)
+        response_tokens = getattr(usage_metadata, "candidates_token_count", None)
+        if (prompt_tokens is None or response_tokens is None) and model is not None:
+            prompt_tokens, response_tokens = count_tokens(model, prompt, text) or (None, None)
+        if prompt_tokens is None or response_tokens is None:
+            self.estimated = True
+            prompt_tokens, response_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        self.prompt_tokens, self.response_tokens = int(prompt_tokens), int(response_tokens)
+
+    def to_doc(self) -> Dict[str, Any]:
+        timings = {f"{phase}_ms": round(ms, 1) for phase, ms in self.timings.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+        document = {
+            "branch": self.branch,
+            "handler": self.handler,
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "total_tokens": self.prompt_tokens + self.response_tokens,
+            "tokens_estimated": self.estimated or None,
+            "timings": timings,
+        }
+        return {field: value for field, value in document.items() if value is not None}
+
+
+def record_turn(username: str, role: str, timestamp: datetime, usage: Dict[str, Any], persist_ms: float = 0.0):
+    """Fold one turn into its user's daily rollup; persist_ms adds the chat turn's own insert"""
+    day = datetime(timestamp.year, timestamp.month, timestamp.day)
+    timings = usage["timings"]
+    inc: Dict[str, Any] = {
+        "turns": 1,
+        f"branches.{usage['branch']}": 1,
+        "prompt_tokens": usage["prompt_tokens"],
+        "response_tokens": usage["response_tokens"],
+        "total_tokens": usage["total_tokens"],
+        "db_ms": timings["db_ms"],
+        "llm_ms": timings["llm_ms"],
+        "persist_ms": timings["persist_ms"] + persist_ms,
+        "total_ms": timings["total_ms"] + persist_ms,
+    }
+    if usage["branch"] == "llm":
+        inc["llm_calls"] = 1
+    if usage.get("model"):
+        inc[f"models.{_model_key(usage['model'])}"] = usage["total_tokens"]
+    try:
+        usage_rollups_collection.update_one(
+            {"_id": f"{username}|{day:%Y-%m-%d}"},
+            {"$inc": inc,
+             "$max": {"max_total_tokens": usage["total_tokens"], "max_total_ms": timings["total_ms"] + persist_ms},
+             "$set": {"username": username, "role": role, "day": day, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except Exception as e:
+        print(f"⚠️ Usage rollup failed: {e}")
+
+
+_SUMMED = ("turns", "llm_calls", "prompt_tokens", "response_tokens", "total_tokens",
+           "db_ms", "llm_ms", "persist_ms", "total_ms")
+
+
+def _empty() -> Dict[str, Any]:
+    return {**{field: 0 for field in _SUMMED}, "branches": {}, "models": {},
+            "max_total_tokens": 0, "max_total_ms": 0.0}
+
+
+def _add(totals: Dict[str, Any], rollup: Dict[str, Any]):
+    for field in _SUMMED:
+        totals[field] += rollup.get(field, 0)
+    for group in ("branches", "models"):
+        for name, count in (rollup.get(group) or {}).items():
+            totals[group][name] = totals[group].get(name, 0) + count
+    totals["max_total_tokens"] = max(totals["max_total_tokens"], rollup.get("max_total_tokens", 0))
+    totals["max_total_ms"] = max(totals["max_total_ms"], rollup.get("max_total_ms", 0.0))
+
+
+def _finish(totals: Dict[str, Any]) -> Dict[str, Any]:
+    turns = totals["turns"]
+    for field in ("db_ms", "llm_ms", "persist_ms", "total_ms"):
+        totals[field] = round(totals[field], 1)
+    totals["avg_total_ms"] = round(totals["total_ms"] / turns, 1) if turns else None
+    totals["avg_llm_ms"] = round(totals["llm_ms"] / totals["llm_calls"], 1) if totals["llm_calls"] else None
+    return totals
+
+
+def usage_report(date_from: datetime, date_to: datetime, usernames: Optional[List[str]] = None,
+                 role: Optional[str] = None) -> Dict[str, Any]:
+    """Tokens, turns and time per user per day, per role and overall, from one range query on the rollups"""
+    start = datetime(date_from.year, date_from.month, date_from.day)
+    end = datetime(date_to.year, date_to.month, date_to.day)
+    criteria: Dict[str, Any] = {"day": {"$gte": start, "$lte": end}}
+    if usernames is not None:
+        criteria["username"] = {"$in": usernames}
+    if role:
+        criteria["role"] = role
+
+    users: Dict[str, Dict[str, Any]] = {}
+    roles: Dict[str, Dict[str, Any]] = {}
+    summary = _empty()
+    for rollup in usage_rollups_collection.find(criteria, {"_id": 0, "updated_at": 0}).sort("day", 1):
+        user = users.setdefault(rollup["username"], {"role": rollup.get("role"), "totals": _empty(), "days": []})
+        day = _empty()
+        _add(day, rollup)
+        user["days"].append({"day": rollup["day"], **_finish(day)})
+        _add(user["totals"], rollup)
+        _add(roles.setdefault(rollup.get("role") or "unknown", _empty()), rollup)
+        _add(summary, rollup)
+
+    for user in users.values():
+        _finish(user["totals"])
+    return {
+        "from": start,
+        "to": end,
+        "summary": _finish(summary),
+        "roles": {name: _finish(totals) for name, totals in sorted(roles.items())},
+        "users": dict(sorted(users.items(), key=lambda item: -item[1]["totals"]["total_tokens"])),
+    }
+
+
+def expensive_turns(chat_collection, date_from: datetime, date_to: datetime, limit: int = 10,
+                    usernames: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """The chat turns that used the most tokens in the range, for finding costly prompts"""
+    criteria: Dict[str, Any] = {
+        "usage.total_tokens": {"$gt": 0},
+        "timestamp": {"$gte": date_from, "$lt": date_to + timedelta(days=1)},
+    }
+    if usernames is not None:
+        criteria["username"] = {"$in": usernames}
+    projection = {"_id": 0, "username": 1, "user_message": 1, "timestamp": 1, "usage": 1}
+    return list(chat_collection.find(criteria, projection).sort("usage.total_tokens", -1).limit(limit))
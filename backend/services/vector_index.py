@@ -0,0 +1,367 @@
+# vector_index.py
+
+import fcntl
+import json
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "vector_index")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "been", "but", "by", "did", "do", "does", "for",
+    "from", "has", "have", "he", "her", "his", "i", "in", "is", "it", "its", "me", "my", "of",
+    "on", "or", "our", "she", "so", "that", "the", "their", "them", "there", "they", "this",
+    "to", "was", "we", "were", "what", "when", "which", "who", "whom", "why", "will", "with",
+    "you", "your", "anyone", "anybody", "someone", "any", "all", "about", "currently"
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(token: str) -> str:
+    """Very light suffix stripping so 'blocked', 'blocker' and 'blocking' share a feature"""
+    for suffix in ("ations", "ation", "ing", "ers", "er", "ed", "es", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    words = [_stem(w) for w in TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+    # Word bigrams keep short phrases like "payment integration" together
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class UpdateVectorIndex:
+    """Offline hashed TF-IDF index over employee updates, persisted as memory-mapped arrays.
+
+    Layout of the index directory:
+      vectors.f32  - (capacity, dim) float32 rows, L2-normalised TF-IDF vectors
+      df.i64       - (dim,) document frequency per hashed feature
+      docs.jsonl   - one line per row: update id, employee, timestamp
+      meta.json    - dim, count, capacity, docs.jsonl size and the sync watermark
+    Writers take an flock on index.lock, so several gunicorn workers can share one directory;
+    readers reload when meta.json changes. meta.json is written last, so rows and docs.jsonl
+    lines past its count (from a writer that crashed mid-batch) are ignored and overwritten.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None, dim: Optional[int] = None):
+        self.index_dir = index_dir or os.getenv("VECTOR_INDEX_DIR", DEFAULT_INDEX_DIR)
+        self.dim = dim or int(os.getenv("VECTOR_INDEX_DIM", "1024"))
+        self._lock = threading.RLock()
+        self._loaded_mtime = None
+        self._vectors = None
+        self._df = None
+        self._count = 0
+        self._docs_size = 0
+        self._capacity = 0
+        self._last_synced_id = None
+        self._docs: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+
+    # --- storage -------------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._path("index.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open_arrays(self, capacity: int):
+        vectors_path = self._path("vectors.f32")
+        needed = capacity * self.dim * 4
+        if not os.path.exists(vectors_path) or os.path.getsize(vectors_path) < needed:
+            with open(vectors_path, "ab") as f:
+                f.truncate(needed)
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+        df_path = self._path("df.i64")
+        if not os.path.exists(df_path):
+            with open(df_path, "wb") as f:
+                f.truncate(self.dim * 8)
+        self._df = np.memmap(df_path, dtype=np.int64, mode="r+", shape=(self.dim,))
+        self._capacity = capacity
+
+    def _load(self):
+        """(Re)load the index from disk if another process has changed it"""
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            if self._vectors is None:
+                os.makedirs(self.index_dir, exist_ok=True)
+                self._open_arrays(1024)
+            return
+
+        mtime = os.path.getmtime(meta_path)
+        if self._vectors is not None and mtime == self._loaded_mtime:
+            return
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("dim") != self.dim:
+            print(f"⚠️ Vector index dim {meta.get('dim')} != {self.dim}, using the on-disk value")
+            self.dim = meta["dim"]
+
+        self._open_arrays(meta["capacity"])
+        self._count = meta["count"]
+        self._last_synced_id = meta.get("last_synced_id")
+        self._docs = []
+        docs_path = self._path("docs.jsonl")
+        if os.path.exists(docs_path):
+            with open(docs_path, "rb") as f:
+                data = f.read(meta["docs_size"]) if "docs_size" in meta else f.read()
+            self._docs = [json.loads(line) for line in data.splitlines() if line.strip()]
+        self._docs = self._docs[:self._count]
+        self._docs_size = meta.get("docs_size", sum(len(json.dumps(d)) + 1 for d in self._docs))
+        self._rows = {d["id"]: row for row, d in enumerate(self._docs)}
+        self._loaded_mtime = mtime
+
+    def _write_meta(self):
+        self._vectors.flush()
+        self._df.flush()
+        meta = {
+            "dim": self.dim,
+            "count": self._count,
+            "docs_size": self._docs_size,
+            "capacity": self._capacity,
+            "last_synced_id": self._last_synced_id,
+        }
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+        self._loaded_mtime = os.path.getmtime(self._path("meta.json"))
+
+    def _grow(self):
+        self._vectors.flush()
+        self._vectors = None
+        self._open_arrays(self._capacity * 2)
+
+    # --- embedding -----------------------------------------------------------
+
+    def _hashed_tf(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            h = zlib.crc32(token.encode("utf-8"))
+            # Signed hashing keeps collisions from only ever adding weight
+            vec[h % self.dim] += 1.0 if (h >> 31) & 1 == 0 else -1.0
+        nz = vec != 0
+        vec[nz] = np.sign(vec[nz]) * (1.0 + np.log(np.abs(vec[nz])))
+        return vec
+
+    def _idf(self) -> np.ndarray:
+        n = max(self._count, 1)
+        return np.log((1.0 + n) / (1.0 + self._df.astype(np.float32))) + 1.0
+
+    def _embed(self, text: str) -> np.ndarray:
+        vec = self._hashed_tf(text) * self._idf()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    # --- public API ----------------------------------------------------------
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return self._count
+
+    def add(self, update_id, update: Dict[str, Any]) -> bool:
+        """Index a single update document. Returns False if it was already indexed or has no text."""
+        return self.add_many([(update_id, update)]) == 1
+
+    def add_many(self, updates: List[Tuple[Any, Dict[str, Any]]], last_synced_id: Optional[str] = None) -> int:
+        """Index a batch of (id, update) pairs under one lock and one meta.json write; returns how many were added"""
+        with self._lock, self._file_lock():
+            self._load()
+            lines = []
+            for update_id, update in updates:
+                text = update.get("content") or update.get("update_text") or ""
+                doc_id = str(update_id)
+                if not text.strip() or doc_id in self._rows:
+                    continue
+                if self._count + len(lines) >= self._capacity:
+                    self._grow()
+
+                row = self._count + len(lines)
+                tf = self._hashed_tf(text)
+                self._df[tf != 0] += 1
+                vec = tf * self._idf()
+                norm = np.linalg.norm(vec)
+                self._vectors[row] = vec / norm if norm > 0 else vec
+
+                timestamp = update.get("timestamp")
+                doc = {
+                    "id": doc_id,
+                    "employee_username": update.get("employee_username") or update.get("employee_name"),
+                    "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+                }
+                lines.append(doc)
+                self._rows[doc_id] = row
+
+            if lines:
+                payload = "".join(json.dumps(doc) + "\n" for doc in lines).encode("utf-8")
+                # Drop lines a crashed writer appended past the committed size before appending ours
+                with open(self._path("docs.jsonl"), "ab") as f:
+                    f.truncate(self._docs_size)
+                    f.write(payload)
+                self._docs.extend(lines)
+                self._docs_size += len(payload)
+                self._count += len(lines)
+            if last_synced_id:
+                self._last_synced_id = last_synced_id
+            if lines or last_synced_id:
+                self._write_meta()
+            return len(lines)
+
+    def replace(self, update_id, update: Dict[str, Any]) -> bool:
+        """Re-embed an indexed update whose text changed; returns False if it isn't indexed"""
+        text = update.get("content") or update.get("update_text") or ""
+        with self._lock, self._file_lock():
+            self._load()
+            row = self._rows.get(str(update_id))
+            if row is None or not text.strip():
+                return False
+            # Features are non-zero in the stored row exactly where they were in its term frequencies
+            self._df[np.asarray(self._vectors[row]) != 0] -= 1
+            tf = self._hashed_tf(text)
+            self._df[tf != 0] += 1
+            vec = tf * self._idf()
+            norm = np.linalg.norm(vec)
+            self._vectors[row] = vec / norm if norm > 0 else vec
+            self._write_meta()
+            return True
+
+    def sync(self, collection, batch_size: int = 500) -> int:
+        """Index updates newer than the sync watermark, one add_many per batch"""
+        with self._lock:
+            self._load()
+            query = {}
+            if self._last_synced_id:
+                from bson import ObjectId
+                query = {"_id": {"$gt": ObjectId(self._last_synced_id)}}
+
+        added = 0
+        batch = []
+        projection = {"content": 1, "update_text": 1, "employee_username": 1, "employee_name": 1, "timestamp": 1}
+        for update in collection.find(query, projection).sort("_id", 1).batch_size(batch_size):
+            batch.append((update["_id"], update))
+            if len(batch) >= batch_size:
+                added += self.add_many(batch, last_synced_id=str(batch[-1][0]))
+                batch = []
+        if batch:
+            added += self.add_many(batch, last_synced_id=str(batch[-1][0]))
+        return added
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.05) -> List[Tuple[Dict[str, Any], float]]:
+        """Return the top-k (doc, score) pairs by cosine similarity"""
+        with self._lock:
+            self._load()
+            if self._count == 0:
+                return []
+            q = self._embed(query)
+            if not q.any():
+                return []
+            scores = np.asarray(self._vectors[:self._count] @ q)
+            k = min(k, self._count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._docs[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+update_index = UpdateVectorIndex()
+_tenant_indexes: Dict[Tuple[str, str], UpdateVectorIndex] = {}
+_tenant_lock = threading.Lock()
+
+
+class IndexSyncWorker:
+    """Background thread that indexes new updates, keeping sync off the request path.
+
+    notify() wakes it right after an insert and notify_rewrite() after an update's
+    text changes in place; it also polls every VECTOR_INDEX_SYNC_INTERVAL seconds
+    for updates written by other processes.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or float(os.getenv("VECTOR_INDEX_SYNC_INTERVAL", "30"))
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._rewritten: Dict[Optional[str], set] = {}
+        self.indexed = 0
+        self.reindexed = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="vector-index-sync", daemon=True)
+            self._thread.start()
+            print("✅ Vector index sync worker started")
+
+    def notify(self):
+        self._wake.set()
+
+    def notify_rewrite(self, update_id):
+        from tenancy import current_organization
+
+        with self._lock:
+            self._rewritten.setdefault(current_organization(), set()).add(update_id)
+        self._wake.set()
+
+    def run_once(self) -> int:
+        """Index the current organization's new updates and re-embed rewritten ones; returns how many were added"""
+        from db import updates_collection
+        from tenancy import current_organization
+
+        index = current_update_index()
+        added = index.sync(updates_collection)
+        self.indexed += added
+        with self._lock:
+            rewritten = self._rewritten.pop(current_organization(), set())
+        if rewritten:
+            for update in updates_collection.find({"_id": {"$in": list(rewritten)}}, {"content": 1, "update_text": 1}):
+                self.reindexed += index.replace(update["_id"], update)
+        return added
+
+    def _run(self):
+        from db import router
+
+        while True:
+            try:
+                for _ in router.each():
+                    self.run_once()
+            except Exception as e:
+                print(f"⚠️ Vector index sync failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+def current_update_index() -> UpdateVectorIndex:
+    """The index for the current organization's database; each routed tenant gets its own directory"""
+    from db import router
+    from tenancy import current_organization
+
+    route = router.route(current_organization())
+    if route == router.default_route:
+        return update_index
+    with _tenant_lock:
+        index = _tenant_indexes.get(route)
+        if index is None:
+            index = _tenant_indexes[route] = UpdateVectorIndex(os.path.join(update_index.index_dir, route[1]))
+        return index
+
+
+index_sync_worker = IndexSyncWorker()
@@ -0,0 +1,220 @@
+"""Per-organization database routing.
+
+The organization of the current request (or background task) lives in a
+contextvar. db.py hands out collection proxies that resolve it on every call,
+so models, services and blueprints keep using `tasks_collection`, `db["..."]`
+and friends unchanged.
+
+Routes live in the shared database's `tenants` collection:
+    {"_id": "<organization>", "db": "<database name>", "uri": "<optional cluster URI>"}
+TENANT_ROUTES (JSON, same shape keyed by organization) overrides it from the
+environment. Organizations without a route, and requests with no organization,
+use the shared database, so a single-tenant install behaves exactly as before.
+Clients are pooled per URI: tenants placed on the same cluster share one
+MongoClient and its connection pool.
+
+The users directory, login sessions, the tenant routes and the job queue stay
+in the shared database (SHARED_COLLECTIONS); everything else is per tenant.
+
+A request's organization comes only from its login session (the bearer token
+issued by /users/login), never from usernames or headers the client sends.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+SHARED_COLLECTIONS = ("users", "sessions", "tenants", "jobs")
+TENANT_ROUTE_TTL = float(os.getenv("TENANT_ROUTE_TTL", "60"))
+
+_organization: ContextVar[Optional[str]] = ContextVar("organization", default=None)
+
+
+def current_organization() -> Optional[str]:
+    return _organization.get()
+
+
+@contextmanager
+def use_organization(organization: Optional[str]):
+    """Run a block (e.g. one unit of background work) against an organization's database"""
+    token = _organization.set(organization or None)
+    try:
+        yield
+    finally:
+        _organization.reset(token)
+
+
+class ClientPool:
+    """One client per cluster URI, shared by every tenant placed on that cluster"""
+
+    def __init__(self, factory: Callable[[str], Any], default_uri: str, default_client):
+        self._factory = factory
+        self._clients: Dict[str, Any] = {default_uri: default_client}
+        self._lock = threading.Lock()
+
+    def get(self, uri: str):
+        with self._lock:
+            client = self._clients.get(uri)
+            if client is None:
+                client = self._clients[uri] = self._factory(uri)
+                print(f"🔌 Opened client for tenant cluster {uri.split('@')[-1]}")
+            return client
+
+    def __len__(self):
+        return len(self._clients)
+
+
+class TenantRouter:
+    def __init__(self, pool: ClientPool, default_uri: str, default_db_name: str,
+                 prepare: Optional[Callable[[Any, bool], None]] = None):
+        self.pool = pool
+        self.default_route = (default_uri, default_db_name)
+        self.shared = pool.get(default_uri)[default_db_name]
+        self._prepare = prepare
+        self._prepared = {self.default_route}
+        self._static = self._load_static_routes()
+        self._routes: Dict[str, Tuple[float, Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_static_routes() -> Dict[str, Dict[str, str]]:
+        raw = os.getenv("TENANT_ROUTES")
+        if not raw:
+            return {}
+        try:
+            return json.loads(raw)
+        except ValueError as e:
+            print(f"⚠️ Ignoring invalid TENANT_ROUTES: {e}")
+            return {}
+
+    def _to_route(self, entry: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        if not entry or not entry.get("db"):
+            return self.default_route
+        return entry.get("uri") or self.default_route[0], entry["db"]
+
+    def route(self, organization: Optional[str]) -> Tuple[str, str]:
+        """(cluster URI, database name) for an organization"""
+        if not organization:
+            return self.default_route
+        if organization in self._static:
+            return self._to_route(self._static[organization])
+        now = time.monotonic()
+        with self._lock:
+            cached = self._routes.get(organization)
+            if cached and cached[0] > now:
+                return cached[1]
+        route = self._to_route(self.shared["tenants"].find_one({"_id": organization}))
+        with self._lock:
+            self._routes[organization] = (now + TENANT_ROUTE_TTL, route)
+        return route
+
+    def database(self, organization: Optional[str] = None):
+        route = self.route(organization if organization is not None else current_organization())
+        database = self.pool.get(route[0])[route[1]]
+        if route not in self._prepared:
+            with self._lock:
+                first = route not in self._prepared
+                self._prepared.add(route)
+            if first and self._prepare:
+                self._prepare(database, False)
+        return database
+
+    def organizations(self) -> List[Optional[str]]:
+        """One organization per distinct tenant database (None for the shared one), for background workers"""
+        seen = {self.default_route}
+        organizations: List[Optional[str]] = [None]
+        entries = [(org, entry) for org, entry in self._static.items()]
+        entries += [(doc["_id"], doc) for doc in self.shared["tenants"].find({}, {"db": 1, "uri": 1})]
+        for organization, entry in entries:
+            route = self._to_route(entry)
+            if route not in seen:
+                seen.add(route)
+                organizations.append(organization)
+        return organizations
+
+    def serves(self, organization: Optional[str]) -> bool:
+        """Whether an organization's data lives in the current context's database"""
+        return self.route(organization) == self.route(current_organization())
+
+    def each(self) -> Iterator[Optional[str]]:
+        """Enter each tenant database in turn: `for org in router.each(): run_once()`"""
+        for organization in self.organizations():
+            with use_organization(organization):
+                yield organization
+
+
+class TenantCollection:
+    """Collection proxy that resolves to the current organization's database on each call"""
+
+    def __init__(self, router: TenantRouter, name: str):
+        self._router = router
+        self.name = name
+
+    def _target(self):
+        return self._router.database()[self.name]
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._target(), attribute)
+
+    def __getitem__(self, name: str):
+        return self._target()[name]
+
+    def __repr__(self):
+        return f"TenantCollection({self.name!r})"
+
+
+class TenantDatabase:
+    """Database proxy: shared collections resolve to the shared database, the rest per organization"""
+
+    def __init__(self, router: TenantRouter):
+        self._router = router
+
+    def __getitem__(self, name: str):
+        if name in SHARED_COLLECTIONS:
+            return self._router.shared[name]
+        return TenantCollection(self._router, name)
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._router.database(), attribute)
+
+    def __repr__(self):
+        return "TenantDatabase()"
+
+
+def init_tenancy(app, resolve_session: Callable[[Any], Any], public_endpoints: Tuple[str, ...] = ()):
+    """Bind each request to the organization of its login session.
+
+    resolve_session returns the session for a request's bearer token: None when
+    the request has no token, False when the token is unknown or expired (a 401,
+    except on public_endpoints such as login). Requests without a session use
+    the shared database.
+    """
+    from flask import g, request
+    from serialization import jsonify
+
+    @app.before_request
+    def bind_organization():
+        if request.method == "OPTIONS":
+            return None
+        session = resolve_session(request)
+        if session is False and request.endpoint in public_endpoints:
+            session = None
+        if session is False:
+            return jsonify({"success": False, "error": "Session expired or invalid, please log in again"}), 401
+        g.session = session
+        g.organization_token = _organization.set(session.get("organization") if session else None)
+        return None
+
+    @app.teardown_request
+    def release_organization(exc=None):
+        token = g.pop("organization_token", None)
+        if token is not None:
+            try:
+                _organization.reset(token)
+            except ValueError:
+                # Torn down from another context (e.g. after a streamed response)
+                _organization.set(None)
@@ -0,0 +1,111 @@
+"""Shared fixtures: the app on the in-memory (mongomock) storage backend, with no Gemini key.
+
+Configuration is read at import time, so the environment is set here before
+anything from the backend is imported.
+
+Tests marked `mongod` use server features mongomock doesn't implement (array
+filters, $text, raw BSON results). They run when TEST_MONGODB_URI points at a
+throwaway mongod, which then backs the whole suite; every document in its
+non-system databases is deleted between tests.
+"""
+
+import os
+import sys
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="rise-ai-tests-")
+TEST_MONGODB_URI = os.getenv("TEST_MONGODB_URI")
+if TEST_MONGODB_URI:
+    os.environ["STORAGE_BACKEND"] = "mongo"
+    os.environ["MONGODB_URI"] = TEST_MONGODB_URI
+else:
+    os.environ["STORAGE_BACKEND"] = "memory"
+os.environ.pop("GEMINI_API_KEY", None)
+os.environ.setdefault("VECTOR_INDEX_DIR", os.path.join(_scratch, "vector_index"))
+os.environ.setdefault("ADMISSION_DB_PATH", os.path.join(_scratch, "admission.sqlite3"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hashlib  # noqa: E402
+
+import pytest  # noqa: E402
+
+import db  # noqa: E402
+import services.analytics  # noqa: E402
+from services.archive import archive_worker  # noqa: E402
+from services.digests import digest_worker  # noqa: E402
+from services.extraction import extraction_worker  # noqa: E402
+from services.invalidation import invalidation_bus  # noqa: E402
+from services.jobs import job_worker  # noqa: E402
+from services.vector_index import index_sync_worker  # noqa: E402
+
+# Background workers don't run; tests call run_once() and friends when they need them
+for _worker in (digest_worker, extraction_worker, job_worker, archive_worker, index_sync_worker, invalidation_bus):
+    _worker.start = lambda: None
+services.analytics.start_backfill = lambda: None
+
+from app import app as flask_app  # noqa: E402
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_MONGODB_URI:
+        return
+    skip = pytest.mark.skip(reason="needs a real mongod: set TEST_MONGODB_URI")
+    for item in items:
+        if "mongod" in item.keywords:
+            item.add_marker(skip)
+
+
+def _reset_storage():
+    from services.cache import user_cache
+    from services.digests import digest_worker
+    from services.idempotency import idempotency_store
+    from services.sessions import _session_cache
+
+    for name in db.client.list_database_names():
+        if name in ("admin", "config", "local"):
+            continue
+        database = db.client[name]
+        for collection in database.list_collection_names():
+            database[collection].delete_many({})
+    user_cache.clear()
+    idempotency_store._cache.clear()
+    _session_cache.clear()
+    with digest_worker._queue.mutex:
+        digest_worker._queue.queue.clear()
+    db.router._routes.clear()
+
+
+@pytest.fixture
+def app():
+    _reset_storage()
+    yield flask_app
+    _reset_storage()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def users(app):
+    """An employee, a second employee and a manager; alice can log in with password 'pw'"""
+    db.users_collection.insert_many([
+        {"username": "alice", "email": "alice@example.com", "role": "employee", "full_name": "Alice Smith",
+         "password_hash": hashlib.sha256(b"pw").hexdigest()},
+        {"username": "bob", "email": "bob@example.com", "role": "employee", "full_name": "Bob Jones"},
+        {"username": "mgr", "email": "mgr@example.com", "role": "manager", "full_name": "Morgan Lee",
+         "password_hash": hashlib.sha256(b"pw").hexdigest()},
+    ])
+    return ["alice", "bob", "mgr"]
+
+
+@pytest.fixture
+def auth(users):
+    """Authorization headers for a logged-in user: client.get(..., headers=auth("mgr"))"""
+    from services.sessions import create_session
+
+    def headers(username):
+        user = db.users_collection.find_one({"username": username})
+        return {"Authorization": f"Bearer {create_session(user)}"}
+    return headers
@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from services.admission import AdmissionController, AdmissionRejected
+
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_RATE_PER_MINUTE", "60")
+    monkeypatch.setenv("LLM_BURST", "2")
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("LLM_MAX_QUEUE", "1")
+    monkeypatch.setenv("LLM_QUEUE_TIMEOUT", "0.3")
+    return AdmissionController(str(tmp_path / "admission.sqlite3"))
+
+
+def test_each_user_gets_their_own_burst(controller):
+    assert controller.try_consume("alice") == 0
+    assert controller.try_consume("alice") == 0
+    retry_after = controller.try_consume("alice")
+    assert 0 < retry_after <= 1
+    assert controller.try_consume("bob") == 0
+    assert controller.metrics()["shed_rate_limited"] == 1
+
+
+def test_calls_past_the_cap_queue_then_shed(controller):
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with controller.admit("alice"):
+            holding.set()
+            release.wait(2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait()
+
+    # One waiter fits in the queue and times out; with the queue full the next is shed at once
+    waiter_error = []
+    waiter = threading.Thread(target=lambda: waiter_error.append(pytest.raises(AdmissionRejected, controller._acquire_slot)))
+    waiter.start()
+    time.sleep(0.1)
+    with pytest.raises(AdmissionRejected) as shed:
+        controller._acquire_slot()
+    assert shed.value.reason == "overloaded"
+    waiter.join()
+    assert waiter_error[0].value.reason == "queue timeout"
+
+    release.set()
+    holder.join()
+    with controller.admit("bob"):
+        assert controller.metrics()["active_llm_calls"] == 1
+    assert controller.metrics()["active_llm_calls"] == 0
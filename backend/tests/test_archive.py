@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import db
+import services.archive as archive
+from services.agent import chat_history_collection
+from services.jobs import job_worker
+
+
+@pytest.fixture
+def cold(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive.cold_archive, "archive_dir", str(tmp_path))
+    return archive.cold_archive
+
+
+def _archive_old(cold, collection_name, documents):
+    db.db[collection_name].insert_many(documents)
+    cold.archive_collection(collection_name, datetime.utcnow() - timedelta(days=90))
+
+
+def test_archival_is_opt_in_and_needs_a_durable_dir(tmp_path, monkeypatch):
+    worker = archive.ArchiveWorker(archive.ColdArchive(str(tmp_path)))
+    monkeypatch.setattr(archive, "ARCHIVE_AFTER_DAYS", 0)
+    worker.start()
+    assert worker._thread is None
+
+    monkeypatch.setattr(archive, "ARCHIVE_AFTER_DAYS", 90)
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", None)
+    with pytest.raises(RuntimeError):
+        worker.start()
+
+
+def test_cleared_chat_history_stays_cleared_in_the_archive(client, users, cold):
+    old = datetime.utcnow() - timedelta(days=200)
+    _archive_old(cold, "chat_sessions", [
+        {"username": email, "user_message": f"old {i}", "ai_response": "ok", "timestamp": old + timedelta(minutes=i)}
+        for i in range(3) for email in ("alice@example.com", "bob@example.com")])
+    assert chat_history_collection.count_documents({}) == 0
+    assert len(client.get("/chat/history/alice@example.com").get_json()["history"]) == 3
+
+    assert client.delete("/chat/history/alice@example.com").status_code == 202
+    job_worker.run_pending()
+
+    assert client.get("/chat/history/alice@example.com").get_json()["history"] == []
+    assert len(client.get("/chat/history/bob@example.com").get_json()["history"]) == 3
+
+
+def test_purged_users_updates_are_removed_from_the_archive(client, auth, cold):
+    old = datetime.utcnow() - timedelta(days=200)
+    _archive_old(cold, "updates", [
+        {"employee_username": "alice", "employee_name": "Alice Smith", "content": "Archived alice update", "timestamp": old},
+        {"employee_username": "bob", "employee_name": "Bob Jones", "content": "Archived bob update", "timestamp": old},
+    ])
+    since = (old - timedelta(days=1)).date().isoformat()
+    assert len(client.get(f"/get-updates?from={since}").get_json()) == 2
+
+    assert client.delete("/users/alice", headers=auth("mgr")).status_code == 202
+    job_worker.run_pending()
+
+    updates = client.get(f"/get-updates?from={since}").get_json()
+    assert [u["employee_username"] for u in updates] == ["bob"]
+    assert cold.status()["collections"]["updates"]["documents"] == 1
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+import db
+from services.agent import chat_history_collection, encode_chat_cursor
+
+
+def _turns(count, username="alice@example.com"):
+    start = datetime(2024, 5, 1, 9, 0)
+    turns = [{"username": username, "user_message": f"message {i}", "ai_response": "ok",
+              "timestamp": start + timedelta(minutes=i)} for i in range(count)]
+    chat_history_collection.insert_many(turns)
+    return turns
+
+
+def test_pages_backwards_and_syncs_forwards(client, users):
+    turns = _turns(5)
+    page = client.get("/chat/history/alice@example.com?limit=2").get_json()
+    assert [t["user_message"] for t in page["history"]] == ["message 4", "message 3"]
+    assert page["has_more"]
+
+    newer = client.get(f"/chat/history/alice@example.com?since={encode_chat_cursor(turns[2])}").get_json()
+    assert [t["user_message"] for t in newer["history"]] == ["message 3", "message 4"]
+
+
+def test_a_malformed_cursor_is_a_400(client, users):
+    _turns(1)
+    for cursor in ("2024-05-01T09:00:00~not-an-id", "2024-05-01T09:00:00~", "yesterday~0123"):
+        response = client.get("/chat/history/alice@example.com", query_string={"since": cursor})
+        assert response.status_code == 400, cursor
+        assert response.get_json()["success"] is False
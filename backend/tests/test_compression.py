@@ -0,0 +1,29 @@
+import gzip
+
+from flask import Response
+
+from compression import compress_response
+
+
+def test_large_json_is_compressed(client, users):
+    for i in range(30):
+        client.post("/submit-update", json={"employee_name": "alice", "update_text": f"Worked on ticket {i} all day"})
+    response = client.get("/get-updates", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data).startswith(b"[")
+
+
+def test_not_modified_varies_on_encoding(client, users):
+    client.post("/submit-update", json={"employee_name": "alice", "update_text": "Worked on the export"})
+    etag = client.get("/get-updates", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    response = client.get("/get-updates", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_event_streams_are_not_compressed(app):
+    frames = (f"data: {'x' * 400}\n\n" for _ in range(3))
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        response = compress_response(Response(frames, mimetype="text/event-stream"))
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import db
+from routes.chat_routes import ai_agent
+from services.dedup import NearDuplicateDetector
+from services.digests import digest_worker, get_digest, refresh_author_digests, refresh_digest
+from services.vector_index import index_sync_worker, update_index
+
+STANDUP = "Yesterday I finished the payment retries, today I am writing the refund tests, no blockers"
+
+
+def _insert(content, timestamp, username="alice"):
+    update = {"employee_username": username, "content": content, "timestamp": timestamp, "updated_at": timestamp}
+    return db.updates_collection.insert_one(update).inserted_id
+
+
+def test_yesterdays_standup_is_not_a_duplicate(app):
+    detector = NearDuplicateDetector(db.updates_collection, window_hours=72)
+    now = datetime(2024, 5, 2, 9, 0)
+    _insert(STANDUP, now - timedelta(hours=20))
+    assert detector.check("alice", STANDUP, now=now) is None
+
+    update_id = _insert(STANDUP, now - timedelta(hours=1))
+    assert detector.check("alice", STANDUP, now=now)["update_id"] == str(update_id)
+
+
+def test_the_newest_updates_are_compared_when_there_are_many(app):
+    detector = NearDuplicateDetector(db.updates_collection, max_recent=5)
+    now = datetime(2024, 5, 2, 18, 0)
+    for i in range(10):
+        _insert(f"Routine update number {i} about unrelated chores", datetime(2024, 5, 2, 8, i))
+    newest = _insert(STANDUP, datetime(2024, 5, 2, 17, 0))
+    assert detector.check("alice", STANDUP, now=now)["update_id"] == str(newest)
+
+
+def test_a_merge_refreshes_the_digest_and_the_search_index(users):
+    now = datetime.utcnow()
+    update_id = _insert("Migrating the billing cron jobs to the scheduler", now)
+    refresh_digest("mgr")
+    index_sync_worker.run_once()
+
+    resend = "Migrating the billing cron jobs to terraform instead"
+    ai_agent._handle_duplicate_update({"update_id": str(update_id), "similarity": 0.9, "timestamp": now},
+                                      resend, "alice", "Alice Smith")
+
+    # What the worker threads would do with the queued work
+    organization, handler, payload = digest_worker._queue.get_nowait()
+    assert handler is refresh_author_digests
+    handler(payload)
+    assert get_digest("mgr")["recent"][0]["content"] == resend
+
+    index_sync_worker.run_once()
+    assert index_sync_worker.reindexed >= 1
+    hits = update_index.search("terraform")
+    assert hits and hits[0][0]["id"] == str(update_id)
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+
+import db
+from services.digests import apply_update, claim_refresh, digests_collection, get_digest, refresh_digest
+
+
+def _insert(username, content):
+    update = {"employee_username": username, "content": content, "timestamp": datetime.utcnow()}
+    db.updates_collection.insert_one(update)
+    return update
+
+
+def _counts(digest):
+    return digest["total_updates"], {e["username"]: e["count"] for e in digest["employees"]}
+
+
+@pytest.mark.mongod  # apply_update uses array filters
+def test_updates_in_the_rebuild_are_not_applied_again(users):
+    first = _insert("alice", "Worked on the payment integration")
+    refresh_digest("mgr")
+    # The worker drains its queue after a rebuild already counted the update
+    apply_update(first)
+    assert _counts(get_digest("mgr")) == (1, {"alice": 1})
+
+
+@pytest.mark.mongod  # apply_update uses array filters
+def test_each_update_is_applied_once(users):
+    refresh_digest("mgr")
+    second = _insert("bob", "Blocked on the staging database")
+    apply_update(second)
+    apply_update(second)
+    digest = get_digest("mgr")
+    assert _counts(digest) == (1, {"bob": 1})
+    assert [b["employee_username"] for b in digest["blockers"]] == ["bob"]
+
+
+@pytest.mark.mongod  # apply_update uses array filters
+def test_rebuild_keeps_updates_that_arrive_while_building(users, monkeypatch):
+    _insert("alice", "Wrote the migration")
+    import services.digests as digests
+
+    build = digests.build_digest
+
+    def slow_build(manager_username):
+        digest = build(manager_username)
+        # Inserted and applied to the old document after the rebuild read the updates
+        apply_update(_insert("bob", "Reviewed the migration"))
+        return digest
+
+    monkeypatch.setattr(digests, "build_digest", slow_build)
+    digest = refresh_digest("mgr")
+    assert _counts(digest) == (2, {"alice": 1, "bob": 1})
+
+
+def test_one_process_claims_each_refresh(app):
+    assert claim_refresh(300)
+    assert not claim_refresh(300)
+    digests_collection.update_one({"_id": "__refresh__"}, {"$set": {"next_refresh_at": datetime(2000, 1, 1)}})
+    assert claim_refresh(300)
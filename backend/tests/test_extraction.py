@@ -0,0 +1,78 @@
+import json
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import db
+from services.extraction import extract_rule_based, extraction_worker, open_blockers
+from services.model_router import ModelRouter
+
+
+def test_rule_based_extraction_sorts_clauses():
+    fields = extract_rule_based("Worked on the login bug. Progress: 80% done. Blocked by the API keys from ops. "
+                                "Tomorrow I will write tests.")
+    assert fields["blockers"] == ["Blocked by the API keys from ops."]
+    assert fields["plans"] and fields["progress"] and fields["tasks_worked_on"]
+    assert extract_rule_based("Fixed the flaky test today, no blockers. Next: deploy.")["blockers"] == []
+
+
+def test_extraction_keeps_client_fields(client, users):
+    client.post("/submit-update", json={"employee_name": "alice", "update_text": "Stuck waiting on the ops team",
+                                        "blockers": "ops access", "progress": 40})
+    before = db.updates_collection.find_one({})
+    time.sleep(0.005)
+    assert extraction_worker.run_once() == 1
+
+    update = db.updates_collection.find_one({})
+    assert update["blockers"] == "ops access" and update["progress"] == 40
+    assert update["extracted"]["blockers"] == ["Stuck waiting on the ops team"]
+    assert update["extracted"]["has_blockers"] is True
+    assert update["extracted"]["method"] == "rules"
+    assert update["extraction_status"] == "done"
+    assert update["updated_at"] > before["updated_at"]
+
+
+def test_open_blockers_reads_extracted_fields(client, users):
+    client.post("/submit-update", json={"employee_name": "alice", "update_text": "Blocked on the staging database"})
+    client.post("/submit-update", json={"employee_name": "bob", "update_text": "Blocked on review"})
+    extraction_worker.run_once()
+    client.post("/submit-update", json={"employee_name": "bob", "update_text": "Merged the fix, no blockers"})
+    extraction_worker.run_once()
+
+    blocked = open_blockers("mgr")
+    assert [(b["employee_username"], b["blockers"]) for b in blocked] == [("alice", ["Blocked on the staging database"])]
+
+
+class _FakeModel:
+    model_name = "fake-flash"
+
+    def __init__(self):
+        self.seen = []
+
+    def generate_content(self, prompt):
+        items = json.loads(prompt.split("Updates:\n", 1)[1])
+        self.seen += [item["id"] for item in items]
+        text = json.dumps([{"id": item["id"], "tasks_worked_on": [item["text"]]} for item in items])
+        return SimpleNamespace(text=text)
+
+
+def test_history_is_backfilled_with_rules_only(client, users, monkeypatch):
+    model = _FakeModel()
+    router = ModelRouter()
+    router.register("fast", model)
+    monkeypatch.setattr("services.extraction.model_router", router)
+    monkeypatch.setattr("services.extraction.EXTRACTION_BACKFILL_BATCH", 2)
+    # Stored before extraction shipped: no extraction_status
+    db.updates_collection.insert_many([{"employee_username": "bob", "content": f"Old update {i}",
+                                        "timestamp": datetime(2024, 1, 1, 9, i)} for i in range(3)])
+    client.post("/submit-update", json={"employee_name": "alice", "update_text": "Wrote the release notes"})
+
+    assert extraction_worker.run_once() == 3
+    new = db.updates_collection.find_one({"update_text": "Wrote the release notes"})
+    assert model.seen == [str(new["_id"])]
+    assert new["extracted"]["method"] == "llm"
+    assert db.updates_collection.count_documents({"extracted.method": "rules"}) == 2
+    assert db.updates_collection.count_documents({"extraction_status": None}) == 1
+
+    assert extraction_worker.run_once() == 1
+    assert model.seen == [str(new["_id"])]
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+import db
+
+
+def test_tasks_return_only_the_requested_fields(client, users):
+    client.post("/submit-task", json={"employee_username": "alice", "title": "Write docs",
+                                      "description": "Document the API", "priority": "high"})
+    assert client.get("/tasks?fields=title,priority").get_json() == [{"title": "Write docs", "priority": "high"}]
+
+    with_id = client.get("/tasks/alice?fields=title,_id").get_json()
+    assert set(with_id[0]) == {"title", "_id"}
+
+
+def test_unknown_fields_are_a_400(client, users):
+    assert client.get("/tasks?fields=title,password_hash").status_code == 400
+    assert client.get("/get-updates?fields=nope").status_code == 400
+    assert client.get("/chat/history/alice@example.com?fields=secret").status_code == 400
+
+
+def test_updates_and_history_honour_fields(client, users):
+    client.post("/submit-update", json={"employee_name": "alice", "update_text": "Sparse fieldsets"})
+    assert client.get("/get-updates?fields=employee_name").get_json() == [{"employee_name": "alice"}]
+
+    db.chat_history_collection.insert_one({"username": "alice@example.com", "user_message": "hi",
+                                           "ai_response": "hello", "timestamp": datetime.utcnow()})
+    history = client.get("/chat/history/alice@example.com?fields=user_message").get_json()["history"]
+    assert history == [{"user_message": "hi"}]
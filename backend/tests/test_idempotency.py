@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+import db
+from services.idempotency import IdempotencyInProgress, IdempotencyStore, idempotency_collection
+from services.sessions import create_session
+
+
+def _auth(email):
+    user = db.users_collection.find_one({"email": email})
+    return {"Authorization": f"Bearer {create_session(user)}"}
+
+
+def test_keys_are_scoped_to_the_caller(client, users):
+    key = {"Idempotency-Key": "retry-1"}
+    alice, bob = _auth("alice@example.com"), _auth("bob@example.com")
+    alice_update = {"employee_name": "alice", "update_text": "Alice's update"}
+
+    assert client.post("/submit-update", json=alice_update, headers={**alice, **key}).status_code == 201
+    replay = client.post("/submit-update", json=alice_update, headers={**alice, **key})
+    assert replay.headers.get("Idempotent-Replayed") == "true"
+
+    # Same key and path from another user runs on its own instead of replaying (or 422ing on) alice's
+    response = client.post("/submit-update", json={"employee_name": "bob", "update_text": "Bob's update"},
+                           headers={**bob, **key})
+    assert response.status_code == 201 and "Idempotent-Replayed" not in response.headers
+    assert db.updates_collection.count_documents({}) == 2
+
+
+def test_a_slow_request_keeps_its_claim(app):
+    first = IdempotencyStore(idempotency_collection, lease=0.3)
+    # Another process: it polls the claim rather than waiting on first's in-process event
+    other = IdempotencyStore(idempotency_collection, wait=0.3, lease=0.3)
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(1.0)
+        return {"status": 201, "body": b"{}", "headers": []}
+
+    runner = threading.Thread(target=first.run, args=("k", "fp", slow))
+    runner.start()
+    started.wait()
+    time.sleep(0.4)
+    with pytest.raises(IdempotencyInProgress):
+        other.run("k", "fp", lambda: {"status": 201, "body": b"again", "headers": []})
+    runner.join()
+    assert other.executed == 0
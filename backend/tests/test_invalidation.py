@@ -0,0 +1,85 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import db
+from services.cache import LocalCache, find_user_by_email, user_cache
+from services.invalidation import InvalidationBus
+
+
+def _bus_with_user_cache():
+    bus = InvalidationBus(poll_interval=0.02)
+    bus.register_cache("users", user_cache, key_fn=lambda user: [user.get("email")])
+    return bus
+
+
+def test_email_change_drops_the_old_key(users):
+    alice = find_user_by_email("alice@example.com")
+    find_user_by_email("bob@example.com")
+    db.users_collection.update_one({"_id": alice["_id"]}, {"$set": {"email": "alice@new.example.com"}})
+    changed = db.users_collection.find_one({"_id": alice["_id"]})
+
+    _bus_with_user_cache().publish({"collection": "users", "organization": None, "operation": "update",
+                                    "document_key": alice["_id"], "document": changed})
+    assert find_user_by_email("alice@example.com") is None
+    assert user_cache.get("bob@example.com") is not None
+
+
+def test_delete_drops_only_that_document(users):
+    bob = find_user_by_email("bob@example.com")
+    find_user_by_email("alice@example.com")
+    _bus_with_user_cache().publish({"collection": "users", "organization": None, "operation": "delete",
+                                    "document_key": bob["_id"], "document": None})
+    assert user_cache.get("bob@example.com") is None
+    assert user_cache.get("alice@example.com") is not None
+
+
+def test_polling_reports_deletes(users):
+    bus = InvalidationBus(poll_interval=0.02)
+    changes = []
+    bus.subscribe("users", changes.append)
+    thread = threading.Thread(target=bus._poll, args=(db.users_collection, None, "users"), daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.05)
+        db.users_collection.delete_one({"username": "bob"})
+        deadline = time.monotonic() + 2
+        while not any(c["operation"] == "delete" for c in changes) and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        bus.stop()
+    assert any(c["operation"] == "delete" and c["document_key"] is None for c in changes)
+
+
+def test_polling_sees_edits_and_backdated_updates(users):
+    update_id = db.updates_collection.insert_one({"employee_username": "alice", "content": "First draft",
+                                                  "timestamp": datetime.utcnow() - timedelta(days=1),
+                                                  "updated_at": datetime.utcnow() - timedelta(days=1)}).inserted_id
+    bus = InvalidationBus(poll_interval=0.02)
+    changes = []
+    bus.subscribe("updates", changes.append)
+    thread = threading.Thread(target=bus._poll, args=(db.updates_collection, None, "updates"), daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.05)
+        now = datetime.utcnow()
+        db.updates_collection.update_one({"_id": update_id}, {"$set": {"content": "Edited", "updated_at": now}})
+        db.updates_collection.insert_one({"employee_username": "bob", "content": "Backfilled",
+                                          "timestamp": now - timedelta(days=3), "updated_at": now})
+        deadline = time.monotonic() + 2
+        while len(changes) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        bus.stop()
+    assert sorted(c["document"]["content"] for c in changes) == ["Backfilled", "Edited"]
+
+
+def test_cache_document_index_follows_eviction():
+    cache = LocalCache("test", maxsize=2, id_fn=lambda value: value["_id"])
+    cache.set("a", {"_id": 1})
+    cache.set("b", {"_id": 2})
+    cache.set("c", {"_id": 3})
+    cache.set("b", {"_id": 4})
+    cache.invalidate_document(2)
+    assert cache.get("b") == {"_id": 4}
+    assert cache._keys_by_id == {3: {"c"}, 4: {"b"}}
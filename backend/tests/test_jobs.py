@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import db
+from services.jobs import clear_chat_job, get_job, job_worker
+from services.usage import usage_rollups_collection
+from tenancy import use_organization
+
+
+def _update(**fields):
+    return {"content": "Daily update", "timestamp": datetime.utcnow(), **fields}
+
+
+def test_deleting_a_user_purges_everything_filed_under_them(client, auth):
+    client.post("/submit-update", json={"employee_name": "Alice Smith", "update_text": "Mine"}, headers=auth("alice"))
+    db.updates_collection.insert_many([
+        _update(employee_username="bob", employee_name="Bob Jones"),
+        # Display names aren't identities: another Alice Smith, and a legacy update with no submitter
+        _update(employee_username="asmith2", employee_name="Alice Smith"),
+        _update(employee_name="alice"),
+    ])
+    db.db["task_rollups"].insert_many([
+        {"_id": "alice|2024-05-01", "employee_username": "alice", "created": 2},
+        {"_id": "alice.smith|2024-05-01", "employee_username": "alice.smith", "created": 1},
+    ])
+    usage_rollups_collection.insert_many([
+        {"_id": "alice@example.com|2024-05-01", "username": "alice@example.com", "turns": 3},
+        {"_id": "bob@example.com|2024-05-01", "username": "bob@example.com", "turns": 1},
+    ])
+    assert db.updates_collection.find_one({"update_text": "Mine"})["employee_username"] == "alice"
+
+    response = client.delete("/users/alice", headers=auth("mgr"))
+    job_worker.run_pending()
+
+    job = get_job(response.get_json()["job_id"])
+    assert job["status"] == "done"
+    assert sorted(u.get("employee_username") or "-" for u in db.updates_collection.find()) == ["-", "asmith2", "bob"]
+    assert [r["_id"] for r in db.db["task_rollups"].find()] == ["alice.smith|2024-05-01"]
+    assert [r["_id"] for r in usage_rollups_collection.find()] == ["bob@example.com|2024-05-01"]
+
+
+def test_the_submitter_comes_from_the_session_not_the_body(client, auth):
+    update = {"employee_name": "Alice Smith", "employee_username": "alice", "update_text": "Spoofed"}
+    client.post("/submit-update", json=update, headers=auth("bob"))
+    client.post("/submit-update", json={**update, "update_text": "Anonymous"})
+    assert {u["update_text"]: u["employee_username"] for u in db.updates_collection.find()} == {
+        "Spoofed": "bob", "Anonymous": None}
+
+
+def test_purges_resume_after_a_lost_lease(client, auth):
+    db.updates_collection.insert_many([_update(employee_username="alice") for _ in range(3)])
+    job_id = client.delete("/users/alice", headers=auth("mgr")).get_json()["job_id"]
+    # A worker that died mid-job leaves it running with a lapsed lease
+    db.db["jobs"].update_one({"_id": get_job(job_id)["_id"]},
+                             {"$set": {"status": "running", "lease_owner": "gone", "lease_expires": datetime(2000, 1, 1)}})
+    assert job_worker.run_pending() == 1
+    assert get_job(job_id)["status"] == "done"
+    assert db.updates_collection.count_documents({}) == 0
+
+
+def test_only_managers_or_the_user_themselves_can_delete_an_account(client, auth):
+    assert client.delete("/users/alice").status_code == 401
+    assert client.delete("/users/alice", headers=auth("bob")).status_code == 403
+    db.users_collection.update_one({"username": "bob"}, {"$set": {"organization": "other"}})
+    assert client.delete("/users/bob", headers=auth("mgr")).status_code == 403
+    assert db.db["jobs"].count_documents({}) == 0
+    assert db.users_collection.count_documents({}) == 3
+
+    assert client.delete("/users/alice", headers=auth("alice")).status_code == 202
+
+
+def test_jobs_are_only_visible_to_their_own_organization(client, auth):
+    db.users_collection.update_one({"username": "alice"}, {"$set": {"organization": "acme"}})
+    with use_organization("acme"):
+        job_id = str(clear_chat_job("alice@example.com")["_id"])
+
+    assert client.get(f"/jobs/{job_id}", headers=auth("mgr")).status_code == 404
+    assert client.get("/jobs", headers=auth("mgr")).get_json()["jobs"] == []
+    assert client.get(f"/jobs/{job_id}", headers=auth("alice")).get_json()["job_id"] == job_id
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import pytest
+
+import db
+from routes.chat_routes import ai_agent
+from services.vector_index import index_sync_worker
+
+
+@pytest.fixture
+def team(users):
+    db.updates_collection.insert_many([
+        {"employee_username": "bob", "employee_name": "Bob Jones", "content": "Wiring the invoice exports",
+         "timestamp": datetime.utcnow()},
+        {"employee_username": "alice", "employee_name": "Alice Smith",
+         "content": "Blocked on the payment gateway sandbox credentials", "timestamp": datetime.utcnow()},
+    ])
+    db.tasks_collection.insert_one({"employee_username": "bob", "title": "Invoice exports", "status": "in_progress",
+                                    "assigned_manager": "mgr", "created_at": datetime.utcnow()})
+    index_sync_worker.run_once()
+
+
+def _ask(message):
+    return ai_agent.process_message(message, "mgr@example.com")
+
+
+@pytest.mark.parametrize("message", [
+    "Show me what bob is working on",
+    "What is bob working on?",
+    "show me bob's updates",
+    "updates from bob",
+    "what did bob do yesterday",
+    "how is bob doing",
+    "status of bob",
+])
+def test_questions_about_one_employee_get_their_summary(team, message):
+    assert _ask(message).startswith("Recent updates from **bob**")
+
+
+def test_team_wide_intents_are_unchanged(team):
+    summary = _ask("Show me recent updates")
+    assert summary.startswith("Recent updates from your team") and "Wiring the invoice exports" in summary
+    assert "blockers" in _ask("any open blockers?").lower()
+
+
+def test_questions_about_the_work_search_the_index(team):
+    assert _ask("Who is blocked on the payment gateway?").startswith("Updates most relevant to your question")
+    assert _ask("Has anyone mentioned invoice exports?").startswith("Updates most relevant to your question")
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from services.model_router import ModelRouter
+
+
+def _router():
+    router = ModelRouter()
+    router.register("fast", SimpleNamespace(model_name="flash"))
+    router.register("large", SimpleNamespace(model_name="pro"))
+    return router
+
+
+def test_simple_questions_go_to_the_fast_model():
+    assert ModelRouter.classify("What is Bob working on?", "manager") == "fast"
+    assert ModelRouter.classify("Why is the release late?", "manager") == "large"
+    assert ModelRouter.classify("Who is blocked? Who is idle?", "manager") == "large"
+    assert ModelRouter.classify("status " * 60, "employee") == "large"
+
+
+def test_an_unhealthy_tier_fails_over_to_the_other():
+    router = _router()
+    assert [t.model_name for t in router.candidates("List my tasks", "employee")] == ["flash", "pro"]
+
+    for _ in range(5):
+        router.tiers["fast"].record(False)
+    assert not router.tiers["fast"].healthy()
+    assert [t.model_name for t in router.candidates("List my tasks", "employee")] == ["pro", "flash"]
+    # Routing counts the tier the request was classified for, not the one that served it
+    assert router.status()["routed"] == {"fast": 2, "large": 0}
+    assert not router.all_open()
+
+
+def test_error_rate_alone_marks_a_tier_unhealthy():
+    router = _router()
+    tier = router.tiers["large"]
+    for ok in (True, False, True, False, False, True, False):
+        tier.record(ok, 0.2)
+    assert not tier.breaker.is_open()
+    assert tier.error_rate() > 0.5 and not tier.healthy()
+    assert tier.status()["latency"]["samples"] == 3
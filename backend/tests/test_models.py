@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import bson
+import pytest
+from bson.raw_bson import RawBSONDocument
+
+import db
+from models.task import Task
+from models.user import User
+
+
+def test_models_use_slots_and_leave_none_fields_out():
+    task = Task("alice", "Ship it", "Release 2.0")
+    assert not hasattr(task, "__dict__")
+    with pytest.raises(AttributeError):
+        task.colour = "red"
+
+    document = task.to_doc()
+    assert "due_date" not in document and "completion_date" not in document and "_id" not in document
+    assert document["title"] == "Ship it"
+
+
+def test_raw_documents_are_decoded_on_first_access():
+    raw = RawBSONDocument(bson.encode({"_id": 7, "title": "Ship it", "status": "pending", "extra": 1}))
+    task = Task.from_raw(raw)
+    assert not task.hydrated
+
+    assert task.title == "Ship it"
+    assert task.hydrated
+    assert task._id == 7
+    assert task.due_date is None
+    assert task.get("priority", "medium") == "medium"
+    with pytest.raises(AttributeError):
+        task.extra
+    with pytest.raises(AttributeError):
+        task.get("titel")
+
+
+def test_unknown_fields_raise_on_built_models_too():
+    task = Task("alice", "Ship it", "Release 2.0")
+    assert task._id is None
+    with pytest.raises(AttributeError):
+        task.titel
+    with pytest.raises(AttributeError):
+        task.get("extra", "default")
+    assert not hasattr(task, "to_dict")
+
+
+def test_plain_dicts_load_eagerly():
+    user = User.from_raw({"username": "bob", "email": "bob@example.com", "role": "employee"})
+    assert user.hydrated
+    assert user.to_doc(include_id=False) == {"username": "bob", "email": "bob@example.com", "role": "employee"}
+
+
+def test_find_returns_models_for_the_selected_fields(app):
+    db.tasks_collection.insert_many([
+        {"employee_username": "alice", "title": "First", "status": "pending", "created_at": datetime(2024, 1, 1)},
+        {"employee_username": "alice", "title": "Second", "status": "completed", "created_at": datetime(2024, 1, 2)},
+        {"employee_username": "bob", "title": "Other", "status": "pending", "created_at": datetime(2024, 1, 3)},
+    ])
+    tasks = Task.find({"employee_username": "alice"}, {"title": 1, "status": 1}, sort=[("created_at", 1)])
+    assert [(t.title, t.status) for t in tasks] == [("First", "pending"), ("Second", "completed")]
+    assert tasks[0].created_at is None
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+import db
+from services.push import PushHub, parse_event_id, push_hub
+
+
+def test_streams_past_the_cap_get_a_503(client, auth, monkeypatch):
+    monkeypatch.setattr(push_hub, "max_connections", 1)
+    headers = auth("mgr")
+    first = client.get("/stream", headers=headers, buffered=False)
+    assert first.status_code == 200
+
+    second = client.get("/stream", headers=headers)
+    assert second.status_code == 503
+    assert second.headers["Retry-After"]
+
+    # Closing the response frees the slot even though no frame was read
+    first.close()
+    assert push_hub.status()["connections"] == 0
+    third = client.get("/stream", headers=headers, buffered=False)
+    assert third.status_code == 200
+    third.close()
+
+
+def test_streams_follow_the_session_not_a_query_parameter(client, auth):
+    assert client.get("/stream?username=mgr@example.com").status_code == 401
+    assert client.get("/stream?username=mgr@example.com", headers=auth("alice")).status_code == 403
+    token = auth("mgr")["Authorization"].split()[1]
+    response = client.get(f"/stream?access_token={token}", buffered=False)
+    assert response.status_code == 200
+    response.close()
+
+
+def test_a_stream_ends_with_a_resume_id_at_its_lifetime(users):
+    hub = PushHub(max_connections=4, max_lifetime=0)
+    started = datetime.utcnow().replace(microsecond=0)
+    frames = list(hub.stream("mgr"))
+    assert frames[-1].startswith("id: ")
+    stamp, oid = parse_event_id(frames[-1].split("\n")[0][len("id: "):])
+    assert stamp >= started and oid == ObjectId(b"\x00" * 12)
+    assert hub.status()["connections"] == 0
+
+    # Reconnecting with that id replays what was written in between
+    db.updates_collection.insert_one({"employee_username": "alice", "content": "Wrote the SSE docs",
+                                      "timestamp": datetime.utcnow()})
+    resumed = list(hub.stream("mgr", frames[-1].split("\n")[0][len("id: "):]))
+    assert any("event: update" in frame for frame in resumed)
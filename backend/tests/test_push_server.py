@@ -0,0 +1,79 @@
+import asyncio
+import socket
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import db
+import push_server
+
+
+@pytest.fixture
+def server(users):
+    loop = asyncio.new_event_loop()
+    listener = loop.run_until_complete(push_server.serve("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield listener.sockets[0].getsockname()[1]
+
+    async def shutdown():
+        listener.close()
+        # Let handlers for connections the test already closed finish before the loop goes away
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if pending:
+            await asyncio.wait(pending, timeout=5)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(2)
+    loop.close()
+
+
+def _open(port, path, headers=None):
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    lines = [f"GET {path} HTTP/1.1", "Host: localhost"] + [f"{k}: {v}" for k, v in (headers or {}).items()]
+    sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode())
+    return sock
+
+
+def _read_until(sock, marker):
+    data = b""
+    while marker not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode()
+
+
+def _wait_for(predicate):
+    deadline = time.monotonic() + 5
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_only_logged_in_managers_can_subscribe(server, auth):
+    assert _read_until(_open(server, "/stream"), b"\r\n\r\n").startswith("HTTP/1.1 401")
+    token = auth("alice")["Authorization"].split()[1]
+    assert _read_until(_open(server, f"/stream?access_token={token}"), b"\r\n\r\n").startswith("HTTP/1.1 403")
+
+
+def test_idle_streams_do_not_hold_threads(server, auth):
+    threads = threading.active_count()
+    streams = [_open(server, "/stream", auth("mgr")) for _ in range(200)]
+    for sock in streams:
+        assert "connected" in _read_until(sock, b": connected")
+    assert push_server.hub.status()["connections"] == 200
+    assert threading.active_count() - threads < 20
+
+    update = {"_id": db.updates_collection.insert_one({}).inserted_id, "employee_username": "alice",
+              "content": "Shipped the push server", "timestamp": datetime.utcnow()}
+    push_server.hub._on_change({"collection": "updates", "document": update, "organization": None})
+    assert "Shipped the push server" in _read_until(streams[-1], b"Shipped")
+
+    for sock in streams:
+        sock.close()
+    assert _wait_for(lambda: push_server.hub.status()["connections"] == 0)
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+import db
+
+
+def _seed_tasks():
+    base = datetime(2024, 5, 1)
+    db.tasks_collection.insert_many([
+        {"employee_username": "alice" if i % 2 else "bob", "title": f"Task {i}", "description": "d",
+         "status": "pending", "priority": "high", "created_at": base + timedelta(hours=i),
+         "updated_at": base + timedelta(hours=i)}
+        for i in range(6)
+    ])
+
+
+def test_query_tasks_uses_the_planned_index(client, users):
+    _seed_tasks()
+    body = client.get("/query-tasks?employee=alice&page_size=2").get_json()
+    assert body["plan"]["index"] == "tasks_employee_created_summary"
+    assert [t["title"] for t in body["tasks"]] == ["Task 5", "Task 3"]
+    assert body["total"] == 3
+
+
+def test_query_tasks_falls_back_when_the_index_is_missing(client, users):
+    _seed_tasks()
+    db.tasks_collection.drop_index("tasks_employee_created_summary")
+    try:
+        response = client.get("/query-tasks?employee=alice")
+        assert response.status_code == 200
+        assert response.get_json()["total"] == 3
+    finally:
+        db.ensure_indexes()
+
+
+def test_superseded_indexes_are_dropped(app):
+    db.tasks_collection.create_index([("employee_username", 1), ("created_at", -1)], name="tasks_employee_created")
+    db.ensure_indexes()
+    assert "tasks_employee_created" not in db.tasks_collection.index_information()
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from services import resilience
+from services.admission import AdmissionRejected
+from services.resilience import CircuitBreaker, DeadlineExceeded, LatencyTracker, call_with_deadline
+
+
+def test_breaker_opens_after_the_threshold_and_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open() and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe while half-open
+    breaker.record_failure()
+    assert breaker.status()["state"] == "open" and breaker.trips == 2
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.status() == {"state": "closed", "consecutive_failures": 0, "trips": 2, "probe_in": None}
+
+
+def test_deadline_stops_waiting_for_a_slow_call():
+    release = threading.Event()
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(lambda: release.wait(2), timeout=0.1)
+    assert time.monotonic() - started < 0.5
+    release.set()
+
+
+def test_hedge_answers_when_the_first_attempt_stalls():
+    release = threading.Event()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            release.wait(2)
+            return "slow"
+        return "hedged"
+
+    assert call_with_deadline(flaky, timeout=1, hedge_after=0.05) == "hedged"
+    assert len(attempts) == 2
+    release.set()
+
+
+def test_a_failed_attempt_is_retried_by_the_hedge_and_errors_surface_otherwise():
+    attempts = []
+
+    def fails_once():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("boom")
+        return "ok"
+
+    assert call_with_deadline(fails_once, timeout=1, hedge_after=0.5) == "ok"
+    with pytest.raises(ValueError):
+        call_with_deadline(lambda: (_ for _ in ()).throw(ValueError("boom")), timeout=1)
+
+
+def _wait_for_abandoned(count, timeout=2):
+    stop = time.monotonic() + timeout
+    while resilience.abandoned_calls() != count and time.monotonic() < stop:
+        time.sleep(0.01)
+    return resilience.abandoned_calls()
+
+
+def test_calls_past_their_deadline_are_bounded_and_new_calls_are_shed(monkeypatch):
+    monkeypatch.setattr(resilience, "LLM_MAX_ABANDONED", 1)
+    assert _wait_for_abandoned(0) == 0
+    release = threading.Event()
+
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline(lambda: release.wait(2), timeout=0.05)
+    assert resilience.abandoned_calls() == 1
+
+    # The pool thread is still busy, so the next call is rejected rather than queued behind it
+    ran = []
+    with pytest.raises(AdmissionRejected):
+        call_with_deadline(lambda: ran.append(1), timeout=1)
+    assert ran == []
+
+    release.set()
+    assert _wait_for_abandoned(0) == 0
+    assert call_with_deadline(lambda: "ok", timeout=1) == "ok"
+
+
+def test_latency_percentiles():
+    tracker = LatencyTracker(window=100)
+    assert tracker.status() == {"samples": 0, "p50_ms": None, "p95_ms": None}
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.status() == {"samples": 100, "p50_ms": 51, "p95_ms": 96}
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+import db
+from services.search import parse_date_range
+
+
+def test_date_only_to_covers_the_whole_day():
+    assert parse_date_range("2024-05-01", "2024-05-31") == {"$gte": datetime(2024, 5, 1), "$lt": datetime(2024, 6, 1)}
+    assert parse_date_range(None, "2024-05-31T12:00:00Z") == {"$lte": datetime(2024, 5, 31, 12)}
+    assert parse_date_range(None, None) == {}
+    with pytest.raises(ValueError):
+        parse_date_range("yesterday", None)
+
+
+@pytest.fixture
+def dated(users):
+    db.updates_collection.insert_many([
+        {"employee_username": "alice", "content": "payment integration work", "timestamp": datetime(2024, 5, 30, 9)},
+        {"employee_username": "alice", "content": "payment integration done", "timestamp": datetime(2024, 5, 31, 17)},
+        {"employee_username": "alice", "content": "payment integration deployed", "timestamp": datetime(2024, 6, 1, 8)},
+    ])
+    db.tasks_collection.insert_many([
+        {"employee_username": "alice", "title": "Payment webhook", "description": "d", "status": "pending",
+         "priority": "high", "created_at": datetime(2024, 5, 31, 17), "updated_at": datetime(2024, 5, 31, 17)},
+        {"employee_username": "alice", "title": "Payment retries", "description": "d", "status": "pending",
+         "priority": "high", "created_at": datetime(2024, 6, 1, 8), "updated_at": datetime(2024, 6, 1, 8)},
+    ])
+
+
+@pytest.mark.mongod  # $text search
+def test_search_includes_the_last_day(client, dated):
+    body = client.get("/search?q=payment&from=2024-05-30&to=2024-05-31").get_json()
+    assert body["total"] == 2
+    assert client.get("/search?q=payment&type=tasks&to=2024-05-31").get_json()["total"] == 1
+
+
+def test_query_tasks_includes_the_last_day(client, dated):
+    body = client.get("/query-tasks?employee=alice&created_to=2024-05-31").get_json()
+    assert [task["title"] for task in body["tasks"]] == ["Payment webhook"]
+
+
+def test_get_updates_includes_the_last_day(client, dated):
+    updates = client.get("/get-updates?from=2024-05-31&to=2024-05-31").get_json()
+    assert [u["content"] for u in updates] == ["payment integration done"]
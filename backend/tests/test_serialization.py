@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import date, datetime, timezone
+
+from bson import ObjectId
+
+import serialization
+from models.task import Task
+
+
+def _payload():
+    return {"_id": ObjectId("65f000000000000000000001"), "at": datetime(2024, 5, 31, 17, 30, 0, 250000),
+            "aware": datetime(2024, 5, 31, 17, 30, tzinfo=timezone.utc), "day": date(2024, 5, 31)}
+
+
+EXPECTED = {"_id": "65f000000000000000000001", "at": "2024-05-31T17:30:00.250000+00:00",
+            "aware": "2024-05-31T17:30:00+00:00", "day": "2024-05-31"}
+
+
+def test_naive_datetimes_are_marked_utc():
+    assert json.loads(serialization.dumps(_payload())) == EXPECTED
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(serialization.dumps(_payload())) == EXPECTED
+
+
+def test_round_trips_through_date_filters(client, users):
+    client.post("/submit-update", json={"employee_name": "alice", "update_text": "Worked on exports"})
+    stamp = client.get("/get-updates").get_json()[0]["timestamp"]
+    assert stamp.endswith("+00:00")
+    assert len(client.get("/get-updates", query_string={"from": stamp}).get_json()) == 1
+
+
+def test_models_encode_without_importing_the_database():
+    task = Task("alice", "Ship it", "Release 2.0")
+    assert json.loads(serialization.dumps({"task": task}))["task"]["title"] == "Ship it"
+
+    # The serializer (and its benchmark) must load without db.py and a MongoDB connection
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    check = "import sys, serialization; sys.exit('db' in sys.modules or 'models' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", check], cwd=backend, timeout=60).returncode == 0
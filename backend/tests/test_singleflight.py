@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow_answer():
+        calls.append(1)
+        release.wait(2)
+        return "answer"
+
+    key = flight.make_key("What did Bob do?", "manager", "gemini")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(key, slow_answer))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["coalesced"] < 4:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {result for result, _ in results} == {"answer"}
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_waiters_get_the_leaders_error_and_nothing_is_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(2)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def waiter():
+        try:
+            flight.do("k", lambda: "unused")
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=lambda: pytest.raises(RuntimeError, flight.do, "k", failing))
+    leader.start()
+    while flight.stats()["in_flight"] == 0:
+        pass
+    follower = threading.Thread(target=waiter)
+    follower.start()
+    while flight.stats()["coalesced"] == 0:
+        pass
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert errors == ["upstream down"]
+    assert flight.do("k", lambda: "fresh") == ("fresh", False)
+
+
+def test_keys_ignore_case_and_whitespace_but_not_the_role():
+    assert SingleFlight.make_key("What  did Bob do?", "manager") == SingleFlight.make_key(" what did bob do? ", "Manager")
+    assert SingleFlight.make_key("What did Bob do?", "manager") != SingleFlight.make_key("What did Bob do?", "employee")
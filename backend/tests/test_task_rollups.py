@@ -0,0 +1,93 @@
+import threading
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+import db
+from services import analytics, tasks as task_service
+from services.analytics import rollups_collection
+
+
+def _totals():
+    totals = {}
+    for rollup in rollups_collection.find({"_id": {"$ne": "__backfill__"}}):
+        counts = totals.setdefault(rollup["employee_username"], {"created": 0, "completed": 0})
+        counts["created"] += rollup.get("created", 0)
+        counts["completed"] += rollup.get("completed", 0)
+    return {employee: counts for employee, counts in totals.items() if any(counts.values())}
+
+
+def _task_id(client, employee="alice"):
+    assert client.post("/submit-task", json={"employee_username": employee, "title": "Ship it",
+                                             "description": "Ship the release"}).status_code == 201
+    return str(db.tasks_collection.find_one({"employee_username": employee})["_id"])
+
+
+def test_status_route_counts_completions_once_and_404s_when_unchanged(client, users):
+    task_id = _task_id(client)
+    assert _totals() == {"alice": {"created": 1, "completed": 0}}
+
+    assert client.put(f"/tasks/{task_id}/status", json={"status": "completed"}).status_code == 200
+    completed_at = db.tasks_collection.find_one()["completion_date"]
+    assert client.put(f"/tasks/{task_id}/status", json={"status": "completed"}).status_code == 404
+    assert db.tasks_collection.find_one()["completion_date"] == completed_at
+    assert _totals() == {"alice": {"created": 1, "completed": 1}}
+
+    assert client.put(f"/tasks/{task_id}/status", json={"status": "in_progress"}).status_code == 200
+    assert _totals() == {"alice": {"created": 1, "completed": 0}}
+    assert client.put(f"/tasks/{ObjectId()}/status", json={"status": "completed"}).status_code == 404
+
+
+def test_edits_and_deletes_move_the_counts(client, users):
+    task_id = _task_id(client)
+    task_service.update_task_status(task_id, "completed")
+
+    task_service.update_task(task_id, {"employee_username": "bob"})
+    assert _totals() == {"bob": {"created": 1, "completed": 1}}
+
+    # A title edit leaves the rollups alone
+    before = list(rollups_collection.find())
+    task_service.update_task(task_id, {"title": "Ship it today"})
+    assert [r.get("updated_at") for r in rollups_collection.find()] == [r.get("updated_at") for r in before]
+
+    earlier = datetime.utcnow() - timedelta(days=3)
+    task_service.update_task(task_id, {"completion_date": earlier})
+    day = datetime(earlier.year, earlier.month, earlier.day)
+    assert rollups_collection.find_one({"employee_username": "bob", "day": day})["completed"] == 1
+
+    task_service.delete_task(task_id)
+    assert _totals() == {}
+
+
+def test_backfill_runs_once_from_the_pinned_cutoff_and_resumes_a_lapsed_lease(client, users):
+    earlier = datetime.utcnow() - timedelta(days=2)
+    db.tasks_collection.insert_many([
+        {"employee_username": "alice", "title": "Old", "created_at": earlier},
+        {"employee_username": "bob", "title": "Old", "created_at": earlier, "status": "completed",
+         "completion_date": earlier + timedelta(hours=3)},
+    ])
+    cutoff = analytics.pin_backfill_cutoff()
+    assert analytics.pin_backfill_cutoff() == cutoff  # a later process gets the same cutoff
+
+    # Created after the cutoff, so only the hook counts it
+    _task_id(client)
+
+    # A process took the lease, folded in bob's day, then died
+    dead = analytics.claim_backfill("dead-worker")
+    assert dead["cutoff"] == cutoff and analytics.claim_backfill("other") is None
+    day = datetime(earlier.year, earlier.month, earlier.day)
+    rollups_collection.update_one({"_id": f"bob|{day:%Y-%m-%d}"},
+                                  {"$inc": {"created": 1, "completed": 1},
+                                   "$set": {"employee_username": "bob", "day": day, "backfilled": True}}, upsert=True)
+    assert analytics.rebuild_rollups("live-worker") == 0  # lease still held
+    rollups_collection.update_one({"_id": "__backfill__"}, {"$set": {"lease_expires": datetime.utcnow() - timedelta(seconds=1)}})
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(analytics.rebuild_rollups())) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(results) == [0, 0, 0, 2]
+    assert _totals() == {"alice": {"created": 2, "completed": 0}, "bob": {"created": 1, "completed": 1}}
+    assert analytics.claim_backfill("late-worker") is None
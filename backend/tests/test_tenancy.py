@@ -0,0 +1,53 @@
+import hashlib
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def acme(app):
+    """An organization routed to its own database, with one employee who can log in"""
+    db.router.shared["tenants"].insert_one({"_id": "acme", "db": "acme_db"})
+    db.users_collection.insert_one({"username": "carol", "email": "carol@acme.test", "role": "manager",
+                                    "full_name": "Carol Diaz", "organization": "acme",
+                                    "password_hash": hashlib.sha256(b"pw").hexdigest()})
+    return db.router.pool.get(db.router.default_route[0])["acme_db"]
+
+
+def _login(client, email="carol@acme.test"):
+    response = client.post("/users/login", json={"email": email, "password": "pw"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+
+def test_the_session_not_the_request_picks_the_database(client, acme):
+    update = {"employee_name": "carol", "update_text": "Routed by session"}
+    client.post("/submit-update", json=update, headers=_login(client))
+    assert acme["updates"].count_documents({}) == 1
+
+    # Naming an acme user or sending the old header no longer reaches acme's database
+    client.post("/submit-update", json=update, headers={"X-Organization": "acme"})
+    assert acme["updates"].count_documents({}) == 1
+    assert db.router.shared["updates"].count_documents({}) == 1
+
+
+def test_unknown_or_ended_sessions_are_rejected(client, acme):
+    assert client.get("/tasks", headers={"Authorization": "Bearer nope"}).status_code == 401
+    headers = _login(client)
+    assert client.get("/tasks", headers=headers).status_code == 200
+    client.post("/users/logout", headers=headers)
+    assert client.get("/tasks", headers=headers).status_code == 401
+    # A stale token doesn't stand in the way of logging in again
+    assert client.post("/users/login", json={"email": "carol@acme.test", "password": "pw"},
+                       headers=headers).status_code == 200
+
+
+def test_registration_only_joins_the_callers_organization(client, acme):
+    new_user = {"username": "dave", "password": "pw", "full_name": "Dave", "email": "dave@acme.test", "role": "employee"}
+    assert client.post("/users/register", json={**new_user, "organization": "acme"}).status_code == 403
+
+    headers = _login(client)
+    assert client.post("/users/register", json={**new_user, "organization": "globex"}, headers=headers).status_code == 403
+    assert client.post("/users/register", json=new_user, headers=headers).status_code == 201
+    assert db.users_collection.find_one({"username": "dave"})["organization"] == "acme"
@@ -0,0 +1,17 @@
+import time
+
+from services.extraction import extraction_worker
+
+
+def test_get_updates_etag_changes_when_extraction_rewrites(client, users):
+    client.post("/submit-update", json={"employee_name": "alice", "update_text": "Blocked on the Stripe keys"})
+    first = client.get("/get-updates")
+    etag = first.headers["ETag"]
+    assert client.get("/get-updates", headers={"If-None-Match": etag}).status_code == 304
+
+    # Stored datetimes have millisecond precision
+    time.sleep(0.005)
+    extraction_worker.run_once()
+    second = client.get("/get-updates", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.get_json()[0]["extraction_status"] == "done"
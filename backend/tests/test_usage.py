@@ -0,0 +1,53 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from services.usage import TurnUsage, record_turn, usage_report
+
+
+class _Model:
+    """Stands in for a google-generativeai 0.3.x GenerativeModel"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def count_tokens(self, contents):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return SimpleNamespace(total_tokens=len(contents.split()))
+
+
+def test_counts_come_from_the_response_when_it_has_them():
+    usage = TurnUsage()
+    model = _Model()
+    metadata = SimpleNamespace(prompt_token_count=120, candidates_token_count=30)
+    usage.record_llm("models/gemini-1.5-flash", metadata, "prompt", "answer", model=model)
+    assert (usage.prompt_tokens, usage.response_tokens, usage.estimated) == (120, 30, False)
+    assert model.calls == 0
+
+
+def test_the_model_counts_when_the_response_has_no_usage():
+    usage = TurnUsage()
+    usage.record_llm("models/gemini-pro", None, "how is the team doing", "all good", model=_Model())
+    assert (usage.prompt_tokens, usage.response_tokens, usage.estimated) == (5, 2, False)
+
+
+def test_estimates_are_the_last_resort_and_flagged():
+    usage = TurnUsage()
+    usage.record_llm("models/gemini-pro", None, "x" * 40, "y" * 8, model=_Model(fail=True))
+    assert (usage.prompt_tokens, usage.response_tokens, usage.estimated) == (10, 2, True)
+    assert usage.to_doc()["tokens_estimated"] is True
+
+
+def test_turns_roll_up_per_user_and_day(app):
+    for tokens in (100, 300):
+        usage = TurnUsage()
+        usage.branch = "llm"
+        usage.record_llm("models/gemini-pro", SimpleNamespace(prompt_token_count=tokens, candidates_token_count=0),
+                         "", "")
+        record_turn("alice@example.com", "employee", datetime(2024, 5, 1, 9), usage.to_doc())
+    report = usage_report(datetime(2024, 5, 1), datetime(2024, 5, 1))
+    assert report["summary"]["total_tokens"] == 400
+    assert report["users"]["alice@example.com"]["totals"]["llm_calls"] == 2
+    assert report["summary"]["models"] == {"gemini-pro": 400}
@@ -0,0 +1,63 @@
+import json
+import os
+from datetime import datetime
+
+from bson import ObjectId
+
+import db
+from services.vector_index import UpdateVectorIndex, index_sync_worker, update_index
+
+
+def _update(content, username="alice"):
+    return {"_id": ObjectId(), "employee_username": username, "content": content, "timestamp": datetime(2024, 5, 1)}
+
+
+def test_add_many_indexes_a_batch_with_one_meta_write(tmp_path, monkeypatch):
+    index = UpdateVectorIndex(str(tmp_path), dim=256)
+    writes = []
+    write_meta = index._write_meta
+    monkeypatch.setattr(index, "_write_meta", lambda: (writes.append(1), write_meta()))
+
+    updates = [_update("Blocked on the payment integration"), _update("Shipped the login redesign", "bob"),
+               _update("   ")]
+    assert index.add_many([(u["_id"], u) for u in updates]) == 2
+    assert len(writes) == 1
+    assert index.add_many([(updates[0]["_id"], updates[0])]) == 0
+
+    hits = index.search("payment blocked")
+    assert hits[0][0]["id"] == str(updates[0]["_id"])
+    assert len(UpdateVectorIndex(str(tmp_path), dim=256)) == 2
+
+
+def test_rows_past_a_crashed_write_are_ignored_and_overwritten(tmp_path):
+    index = UpdateVectorIndex(str(tmp_path), dim=256)
+    first = _update("Reviewing the database migration")
+    index.add(first["_id"], first)
+    # A writer that died after appending to docs.jsonl but before committing meta.json
+    with open(os.path.join(str(tmp_path), "docs.jsonl"), "a") as f:
+        f.write(json.dumps({"id": "orphan", "employee_username": "ghost", "timestamp": None}) + "\n")
+
+    reopened = UpdateVectorIndex(str(tmp_path), dim=256)
+    second = _update("Fixing the memory leak crash", "bob")
+    reopened.add(second["_id"], second)
+
+    fresh = UpdateVectorIndex(str(tmp_path), dim=256)
+    assert len(fresh) == 2
+    assert [doc["id"] for doc in fresh._docs] == [str(first["_id"]), str(second["_id"])]
+    assert fresh.search("memory leak")[0][0]["employee_username"] == "bob"
+
+
+def test_sync_batches_and_keeps_a_watermark(tmp_path, app):
+    index = UpdateVectorIndex(str(tmp_path), dim=256)
+    db.updates_collection.insert_many([_update(f"Worked on feature {i} for the billing export") for i in range(7)])
+    assert index.sync(db.updates_collection, batch_size=3) == 7
+    assert index.sync(db.updates_collection, batch_size=3) == 0
+    db.updates_collection.insert_one(_update("Deployed the docker pipeline"))
+    assert index.sync(db.updates_collection) == 1
+
+
+def test_submitted_updates_are_indexed_by_the_worker(client):
+    response = client.post("/submit-update", json={"employee_name": "alice", "update_text": "Stuck on kubernetes ingress"})
+    assert response.status_code == 201
+    index_sync_worker.run_once()
+    assert any(doc["employee_username"] == "alice" for doc, _ in update_index.search("kubernetes ingress"))
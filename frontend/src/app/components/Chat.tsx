@@ -1,6 +1,7 @@
 "use client";
 import React, { useState, useEffect, useRef } from "react";
 import { chatService, ChatMessage } from "../../services/chatService";
+import { authHeaders, handleUnauthorized } from "../../utils/api";
 
 const Chatbot = () => {
   const [inputValue, setInputValue] = useState("");
@@ -96,6 +97,7 @@ const Chatbot = () => {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          ...authHeaders(),
         },
         mode: "cors", // Explicit CORS mode
         body: JSON.stringify({
@@ -105,6 +107,11 @@ const Chatbot = () => {
         }),
       });
 
+      if (response.status === 401) {
+        handleUnauthorized();
+        return;
+      }
+
       if (!response.ok) {
         throw new Error(`HTTP error! Status: ${response.status}`);
       }
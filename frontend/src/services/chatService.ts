@@ -7,6 +7,16 @@ export type ChatMessage = {
   timestamp: string;
 };
 
+export type ChatHistoryResponse = {
+  success: boolean;
+  history: ChatMessage[];
+  // Pass back as `since` to fetch only newer turns
+  watermark: string | null;
+  // Pass back as `before` to page further into the past
+  before: string | null;
+  has_more: boolean;
+};
+
 export type ChatResponse = {
   success: boolean;
   response: string;
@@ -31,12 +41,21 @@ export const chatService = {
     });
   },
   
-  getChatHistory: async (username: string, limit: number = 10) => {
-    return fetchApi<{ success: boolean, history: ChatMessage[] }>(`/chat/history/${username}?limit=${limit}`);
+  // Latest turns (newest first), or older turns when `before` is a cursor from a previous page
+  getChatHistory: async (username: string, limit: number = 10, before?: string | null) => {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (before) params.set('before', before);
+    return fetchApi<ChatHistoryResponse>(`/chat/history/${username}?${params}`);
+  },
+
+  // Only turns newer than `since` (oldest first); keep the returned watermark for the next poll
+  syncChatHistory: async (username: string, since: string, limit: number = 50) => {
+    const params = new URLSearchParams({ limit: String(limit), since });
+    return fetchApi<ChatHistoryResponse>(`/chat/history/${username}?${params}`);
   },
   
   clearChatHistory: async (username: string) => {
-    return fetchApi<{ success: boolean, message: string }>(`/chat/history/${username}`, {
+    return fetchApi<{ success: boolean, message: string, job_id: string }>(`/chat/history/${username}`, {
       method: 'DELETE',
     });
   },
@@ -47,6 +47,8 @@ export const userService = {
   },
   
   logout: () => {
+    // Ends the session server-side; fetchApi reads the token before it is removed below
+    fetchApi('/users/logout', { method: 'POST' });
     localStorage.removeItem('token');
     localStorage.removeItem('user');
   }
@@ -1,20 +1,46 @@
 
 
+// The login page; also where an expired or unknown session sends the user
+const LOGIN_PATH = '/';
+
+// Forget a session the backend no longer accepts (expired, logged out, or issued before sessions
+// were stored server-side) and go back to login, instead of failing every request with 401
+export const handleUnauthorized = () => {
+  if (typeof window === 'undefined') return;
+  localStorage.removeItem('token');
+  localStorage.removeItem('user');
+  if (window.location.pathname !== LOGIN_PATH) {
+    window.location.assign(LOGIN_PATH);
+  }
+};
+
+export const authHeaders = (): Record<string, string> => {
+  const token = typeof window !== 'undefined' ? localStorage.getItem('token') : null;
+  return token ? { 'Authorization': `Bearer ${token}` } : {};
+};
+
 export const fetchApi = async <T>(url: string, options: RequestInit = {}): Promise<{ success: boolean; data?: T; error?: string }> => {
   try {
     // Get API URL from environment or fallback to localhost
     const baseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000';
     console.log(`API call to: ${baseUrl}${url}`);
     
+    // The session token selects the organization's data on the backend
     const response = await fetch(`${baseUrl}${url}`, {
       ...options,
       headers: {
         'Content-Type': 'application/json',
+        ...authHeaders(),
         ...options.headers,
       },
       credentials: 'include',
     });
 
+    // A 401 from login just means wrong credentials; anywhere else the session is gone
+    if (response.status === 401 && url !== '/users/login') {
+      handleUnauthorized();
+    }
+
     if (!response.ok) {
       throw new Error(`API error: ${response.status}`);
     }